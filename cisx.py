@@ -4,13 +4,59 @@
 ################################################################################
 
 
-import getopt
 import sys
+
+
+# A request to a running server is sent before the parser and report modules
+# are imported, so the client starts as fast as a thin client can.
+if __name__ == '__main__':
+    from cisxp import client
+    client_args = client.get_client_args(sys.argv[1:])
+    if client_args != None:
+        sys.exit(client.send_request(*client_args))
+
+
+import collections
+import concurrent.futures
+import getopt
+import multiprocessing
 import os
+import re
+import threading
+import time
 
 
+from cisxp import accesslistmatcher
+from cisxp import accesslistwriter
+from cisxp import adjacencywriter
+from cisxp import chunkparser
 from cisxp import ciscoparser
+from cisxp import client
+from cisxp import configstream
+from cisxp import externalsort
+from cisxp import groupwriter
+from cisxp import hostfilter
+from cisxp import interfacewriter
+from cisxp import iptools
+from cisxp import memprofile
+from cisxp import metrics
+from cisxp import natcollisionwriter
+from cisxp import natjsonwriter
+from cisxp import natoverlapwriter
+from cisxp import natstream
+from cisxp import nattranslationwriter
 from cisxp import natwriter
+from cisxp import objectwriter
+from cisxp import partition
+from cisxp import routewriter
+from cisxp import server
+from cisxp import snapshot
+from cisxp import sqlitewriter
+from cisxp import supervisor
+from cisxp import trace
+from cisxp import unusedobjectwriter
+from cisxp import whereusedwriter
+from cisxp import writerthread
 
 
 ################################################################################
@@ -19,24 +65,169 @@ from cisxp import natwriter
 class CISX():
     import conf                            # import default values
 
+    usage = '''usage: cisx.py [options]
+  --nat [FILE]          write nat rules to FILE
+  --columns COLS        write only the comma separated nat columns COLS, such
+                        as "hostname,inside src addr,mapped src addr"; other
+                        columns are not computed
+  --nat-jsonl [FILE]    write nat rules to FILE as json lines, one record per
+                        rule with nested interfaces, objects and services
+  --stream              write nat rules while each file is parsed, keeping only
+                        the objects later rules may reference in memory
+  --interfaces [FILE]   write interfaces and their addresses to FILE
+  --objects [FILE]      write name, network and service objects to FILE
+  --groups [FILE]       write object group members to FILE
+  --where-used NAMES    write the nat rules, objects, object groups, access
+                        lists and routes using each of the comma separated
+                        objects NAMES
+  --unused [FILE]       write the objects no nat rule, object, object group,
+                        access list or route uses to FILE
+  --acl-match FLOWS     write the first matching access-list rule of each
+                        device for each flow in FLOWS, one
+                        "src dest protocol [src-port] [dest-port]" per line
+  --route-lookup ADDR   write the route resolving ADDR in each vrf of each
+                        device, ADDR may be a file of addresses, one per
+                        line
+  --nat-translate FLOWS translate each flow in FLOWS with the nat rules of
+                        each device, one "src dest protocol [src-port]
+                        [dest-port] [ingress] [egress]" per line, '-' for
+                        unknown fields
+  --nat-overlaps [FILE] write overlapping and shadowed nat rules to FILE
+  --nat-collisions [FILE]
+                        write mapped nat addresses published by more than
+                        one device to FILE
+  --adjacency [FILE]    write the pairs of devices sharing an interface subnet
+                        to FILE, as an edge list
+  --snapshot FILE       write a columnar snapshot of the parsed devices to FILE
+  --sqlite DB           write devices, interfaces, objects, group members and
+                        nat rules to tables of the sqlite database DB
+  --from-snapshot FILE  write nat rules from the snapshot FILE instead of
+                        parsing the configuration directory
+  --partition MODE[:SIZE]
+                        split each per device report into several files:
+                        "hostname" for one file per hostname, "hash:N" for N
+                        hostname buckets, "rows:N" or "bytes:N[K|M|G]" for a
+                        new file every N rows or bytes
+  --manifest            write a json manifest of the partitioned files
+  --sort-by COLS        sort the rows of each per device report by the comma
+                        separated columns COLS, address columns by address;
+                        not with --partition or the --stream nat report
+  --sort-memory SIZE    rows held in memory while sorting before they are
+                        spilled to temporary files, such as 64M
+  --metrics-json FILE   write counters and phase durations of the run to FILE
+  --metrics-prom FILE   write the run metrics to FILE in the prometheus text
+                        format, for the node exporter textfile collector
+  --trace FILE          write a chrome trace event timeline of the parse and
+                        report spans of every process to FILE
+  --memprofile [FILE]   write tracemalloc snapshots taken after each file is
+                        parsed and its nat rows rendered and written to FILE,
+                        with the top allocation sites and the instances of
+                        each device model class
+  --file-timeout SECS   parse each file in a supervised worker process and
+                        give up on files taking more than SECS seconds
+  --file-memory SIZE    parse each file in a supervised worker process and
+                        give up on files needing more than SIZE bytes, such
+                        as 2G
+  --writer-queue N      write the reports in a background thread fed through
+                        a queue of at most N parsed devices, and report the
+                        queue depth and the time parsing and writing
+                        waited; cannot be combined with --jobs
+  --host PATTERN        parse only the devices whose hostname matches the glob
+                        PATTERN, or the regular expression /PATTERN/; files
+                        are read up to their hostname line to decide; may be
+                        given more than once
+  --src DIR             parse the configuration files in DIR, '-' to parse a
+                        stream of concatenated configurations from stdin,
+                        one device at a time as it arrives
+  --jobs N              parse N files at once in worker processes
+  --split-size SIZE     parse files larger than SIZE, such as 16M, in chunks
+                        of about SIZE characters using --jobs worker
+                        processes
+  --serve SOCKET        serve parsed devices on the unix socket SOCKET,
+                        reparsing files only when they change
+  --client SOCKET       send --request to the server listening on SOCKET
+  --request REQUEST     request sent by --client, one of "load [DIR]",
+                        "parse FILE", "devices", "nat [HOSTNAME]",
+                        "lookup ADDR", "stats" or "shutdown"'''
+
     def __init__(self):
         self.opts = {
             'nat_file' : self.conf.NAT_CSV_FILE,
+            'nat_jsonl_file' : self.conf.NAT_JSONL_FILE,
+            'interface_file' : self.conf.INTERFACE_CSV_FILE,
+            'object_file' : self.conf.OBJECT_CSV_FILE,
+            'group_file' : self.conf.GROUP_CSV_FILE,
+            'acl_match_file' : self.conf.ACL_MATCH_CSV_FILE,
+            'route_lookup_file' : self.conf.ROUTE_LOOKUP_CSV_FILE,
+            'nat_translate_file' : self.conf.NAT_TRANSLATE_CSV_FILE,
+            'nat_overlap_file' : self.conf.NAT_OVERLAP_CSV_FILE,
+            'nat_collision_file' : self.conf.NAT_COLLISION_CSV_FILE,
+            'adjacency_file' : self.conf.ADJACENCY_CSV_FILE,
+            'where_used_file' : self.conf.WHERE_USED_CSV_FILE,
+            'unused_file' : self.conf.UNUSED_CSV_FILE,
             'src_dir'  : self.conf.CONFIGURATION_DIRECTORY,
             'error_log' : self.conf.ERROR_LOG,
+            'jobs' : 1,
+            'sort_memory' : self.conf.SORT_MEMORY_LIMIT,
+            'memprofile_file' : self.conf.MEMORY_PROFILE_FILE,
         }
+        self.errors = []
+        self.supervisor = None
+        self.host_filter = None     # hostfilter.HostFilter() of --host
 
     def run(self, args):
         self.get_opts(args)  # populate options dict
-        if 'write_nat' in self.opts:
-            self.write_nat()
+        metrics.registry.reset()
+        trace.tracer.enabled = 'trace_file' in self.opts
+        if 'memprofile' in self.opts:
+            memprofile.profiler.start()
+        success = False
+        try:
+            if 'write_nat' in self.opts and 'snapshot_src' in self.opts:
+                self.write_nat_from_snapshot()
+            elif 'stream' in self.opts and ('write_nat' in self.opts
+                                            or 'write_nat_jsonl' in self.opts):
+                self.write_nat_streaming()
+            self.write_reports()
+            success = True
+        finally:
+            self.write_metrics(success)
+            if 'trace_file' in self.opts:
+                trace.tracer.write(self.opts['trace_file'])
+            if 'memprofile' in self.opts:
+                self.write_memory_profile()
+        if 'serve_socket' in self.opts:
+            self.serve()
+        if 'client_socket' in self.opts:
+            self.send_request()
+
+    def write_memory_profile(self):
+        memprofile.profiler.stop()
+        memprofile.profiler.write(self.opts['memprofile_file'])
+        memprofile.profiler.print_summary()
+
+    # Writes the metrics of the run to the requested metrics files.
+    def write_metrics(self, success):
+        metrics.registry.finish(success)
+        if 'metrics_json' in self.opts:
+            metrics.registry.write_json(self.opts['metrics_json'])
+        if 'metrics_prom' in self.opts:
+            metrics.registry.write_prometheus(self.opts['metrics_prom'])
 
     def print_usage(self):
         print(self.usage)
 
     def get_opts(self, args):
         shortopts = ''
-        longopts = ['nat']
+        longopts = ['nat', 'columns=', 'nat-jsonl', 'stream', 'interfaces',
+                    'objects', 'groups', 'where-used=', 'unused', 'acl-match=',
+                    'route-lookup=', 'nat-translate=', 'nat-overlaps',
+                    'nat-collisions', 'adjacency', 'snapshot=',
+                    'from-snapshot=', 'serve=', 'client=', 'request=',
+                    'partition=', 'manifest', 'host=', 'src=', 'jobs=',
+                    'sort-by=', 'sort-memory=', 'split-size=', 'metrics-json=',
+                    'metrics-prom=', 'trace=', 'memprofile', 'file-timeout=',
+                    'file-memory=', 'sqlite=', 'writer-queue=']
         while len(args) > 0:
             try:
                 optlist, args = getopt.getopt(args[1:], shortopts, longopts)
@@ -53,39 +244,697 @@ class CISX():
                     self.print_usage()
                     sys.exit(1)
                 self.set_opt(optlist[-1][0], args[0])
+        self.check_opts()
+
+    # Exits with a usage error for options that cannot be combined.
+    def check_opts(self):
+        if 'sort_by' in self.opts:
+            if 'partition' in self.opts:
+                print('--sort-by cannot be combined with --partition.')
+                self.print_usage()
+                sys.exit(1)
+            if 'stream' in self.opts and ('write_nat' in self.opts
+                                          and 'snapshot_src' not in self.opts):
+                print('--sort-by cannot be combined with --stream.')
+                self.print_usage()
+                sys.exit(1)
+        if 'writer_queue' in self.opts and self.opts['jobs'] > 1:
+            print('--writer-queue cannot be combined with --jobs.')
+            self.print_usage()
+            sys.exit(1)
 
     def set_opt(self, opt, arg):
         if opt == '--nat':
             self.opts['write_nat'] = True
             if arg != '':
                 self.opts['nat_file'] = arg
+        elif opt == '--columns':
+            self.opts['columns'] = arg.split(',')
+            try:
+                natwriter.NATWriter(None, self.opts['columns'])
+            except ValueError as err:
+                print(err)
+                self.print_usage()
+                sys.exit(1)
+        elif opt == '--nat-jsonl':
+            self.opts['write_nat_jsonl'] = True
+            if arg != '':
+                self.opts['nat_jsonl_file'] = arg
+        elif opt == '--stream':
+            self.opts['stream'] = True
+        elif opt == '--interfaces':
+            self.opts['write_interfaces'] = True
+            if arg != '':
+                self.opts['interface_file'] = arg
+        elif opt == '--objects':
+            self.opts['write_objects'] = True
+            if arg != '':
+                self.opts['object_file'] = arg
+        elif opt == '--groups':
+            self.opts['write_groups'] = True
+            if arg != '':
+                self.opts['group_file'] = arg
+        elif opt == '--where-used':
+            self.opts['where_used'] = arg.split(',')
+        elif opt == '--unused':
+            self.opts['write_unused'] = True
+            if arg != '':
+                self.opts['unused_file'] = arg
+        elif opt == '--acl-match':
+            self.opts['flows_file'] = arg
+        elif opt == '--route-lookup':
+            self.opts['route_addrs'] = arg
+        elif opt == '--nat-translate':
+            self.opts['nat_flows_file'] = arg
+        elif opt == '--nat-overlaps':
+            self.opts['write_nat_overlaps'] = True
+            if arg != '':
+                self.opts['nat_overlap_file'] = arg
+        elif opt == '--nat-collisions':
+            self.opts['write_nat_collisions'] = True
+            if arg != '':
+                self.opts['nat_collision_file'] = arg
+        elif opt == '--adjacency':
+            self.opts['write_adjacency'] = True
+            if arg != '':
+                self.opts['adjacency_file'] = arg
+        elif opt == '--snapshot':
+            self.opts['snapshot_file'] = arg
+        elif opt == '--sqlite':
+            self.opts['sqlite_file'] = arg
+        elif opt == '--from-snapshot':
+            self.opts['snapshot_src'] = arg
+        elif opt == '--partition':
+            try:
+                self.opts['partition'] = partition.parse_partition(arg)
+            except ValueError as err:
+                print(err)
+                self.print_usage()
+                sys.exit(1)
+        elif opt == '--manifest':
+            self.opts['manifest'] = True
+        elif opt == '--sort-by':
+            self.opts['sort_by'] = arg.split(',')
+        elif opt == '--sort-memory':
+            self.opts['sort_memory'] = partition.parse_size(arg)
+        elif opt == '--host':
+            if self.host_filter == None:
+                self.host_filter = hostfilter.HostFilter()
+            try:
+                self.host_filter.add_pattern(arg)
+            except re.error as err:
+                print(f'Invalid host pattern "{arg}": {err}')
+                self.print_usage()
+                sys.exit(1)
+        elif opt == '--src':
+            self.opts['src_dir'] = arg
+        elif opt == '--split-size':
+            self.opts['split_size'] = partition.parse_size(arg)
+        elif opt == '--jobs':
+            self.opts['jobs'] = int(arg)
+        elif opt == '--writer-queue':
+            self.opts['writer_queue'] = int(arg)
+        elif opt == '--file-timeout':
+            self.opts['file_timeout'] = float(arg)
+        elif opt == '--file-memory':
+            self.opts['file_memory'] = partition.parse_size(arg)
+        elif opt == '--metrics-json':
+            self.opts['metrics_json'] = arg
+        elif opt == '--metrics-prom':
+            self.opts['metrics_prom'] = arg
+        elif opt == '--trace':
+            self.opts['trace_file'] = arg
+        elif opt == '--memprofile':
+            self.opts['memprofile'] = True
+            if arg != '':
+                self.opts['memprofile_file'] = arg
+        elif opt == '--serve':
+            self.opts['serve_socket'] = arg
+        elif opt == '--client':
+            self.opts['client_socket'] = arg
+        elif opt == '--request':
+            self.opts['request'] = arg
+
+    # Parses each configuration file in the source directory and yields the
+    # resulting devices. Parsing errors are collected in errors. With more
+    # than one job the files are parsed by a pool of worker processes and the
+    # devices are yielded in the order they finish. Files larger than the
+    # split size are parsed first, each split over the pool. With a file time
+    # or memory budget the other files are parsed by supervised workers and
+    # files over budget are skipped. A source directory of '-' parses the
+    # configurations streamed to stdin instead. With a host filter, files of
+    # other hosts are skipped before they are parsed, and devices whose
+    # hostname was not found near the start of their file once parsed.
+    def parse_devices(self):
+        for device in self.parse_files():
+            if (self.host_filter != None
+                and not self.host_filter.match(device.hostname)):
+                metrics.registry.add('files_skipped')
+                continue
+            yield device
 
-    def write_nat(self):
+    def parse_files(self):
         src_dir = self.opts['src_dir']
-        files = os.listdir(src_dir)
-        nat_file = open(self.opts['nat_file'], 'w')
-        writer = natwriter.NATWriter(nat_file)
-        writer.write_headers()
-        errors = []
+        if src_dir == '-':
+            yield from self.parse_stream()
+            return
 
-        for file in files:
-            if file.startswith('.'):
-                continue
-            fullname = os.path.join(src_dir, file)
+        files = [os.path.join(src_dir, file) for file in os.listdir(src_dir)
+                 if not file.startswith('.')]
+        files = [file for file in files if self.is_selected(file)]
+
+        if 'split_size' in self.opts:
+            split_size = self.opts['split_size']
+            large = [file for file in files
+                     if os.path.getsize(file) > split_size]
+            files = [file for file in files if file not in large]
+            with self.pool() as pool:
+                for fullname in large:
+                    start = time.perf_counter()
+                    device, errors, lines, skipped = chunkparser.parse_split(
+                        fullname, split_size, pool)
+                    self.errors.extend(errors)
+                    record_parse(fullname, lines,
+                                 time.perf_counter() - start, skipped)
+                    yield device
+
+        if 'file_timeout' in self.opts or 'file_memory' in self.opts:
+            self.supervisor = supervisor.Supervisor(
+                parse_file, self.opts['jobs'], self.opts.get('file_timeout'),
+                self.opts.get('file_memory'))
+            for device, errors, stats, events in self.supervisor.parse(files):
+                self.errors.extend(errors)
+                record_parse(*stats)
+                trace.tracer.extend(events)
+                yield device
+            for failure in self.supervisor.failures:
+                metrics.registry.add('files_failed', 1,
+                                     ('reason', failure.reason))
+            return
+
+        if self.opts['jobs'] > 1:
+            with self.pool() as pool:
+                for device, errors, stats, events in pool.imap_unordered(
+                        parse_file, files):
+                    self.errors.extend(errors)
+                    record_parse(*stats)
+                    trace.tracer.extend(events)
+                    yield device
+            return
+
+        for fullname in files:
             try:
+                start = time.perf_counter()
                 parser = ciscoparser.CiscoParser()
                 device = parser.parse(fullname)
-                errors.extend(parser.errors)
-                writer.write(device)
+                self.errors.extend(parser.errors)
             except Exception as e:
-                for error in errors:
-                    print(error)
+                self.print_errors()
                 parser.print_line()
                 raise e
+            record_parse(fullname, parser.lines_read,
+                         time.perf_counter() - start, parser.bytes_skipped())
+            yield device
 
-        nat_file.close()
-        for error in errors:
+    # Parses the configurations streamed to stdin and yields a device for
+    # each, as soon as its last line is read. Devices are parsed one at a
+    # time in the main process whatever the number of jobs. With a host
+    # filter, parsing a device stops at its hostname line if it is not
+    # selected.
+    def parse_stream(self):
+        stream = configstream.ConfigStream(sys.stdin,
+                                           select=self.get_host_select())
+        for section in stream.sections():
+            try:
+                start = time.perf_counter()
+                parser = ciscoparser.CiscoParser()
+                parser.file = section
+                parser.filename = section.name
+                device = parser.parse()
+                self.errors.extend(parser.errors)
+            except Exception as e:
+                self.print_errors()
+                parser.print_line()
+                raise e
+            record_parse(section.name, parser.lines_read,
+                         time.perf_counter() - start, size=section.size)
+            if section.skipped:
+                metrics.registry.add('files_skipped')
+                continue
+            yield device
+
+    # Returns the match function of the host filter, or None.
+    def get_host_select(self):
+        return self.host_filter.match if self.host_filter != None else None
+
+    # Returns True if the given configuration file is of a host selected by
+    # the host filter, reading it only up to its hostname line.
+    def is_selected(self, filename):
+        if self.host_filter == None or self.host_filter.match_file(filename):
+            return True
+        metrics.registry.add('files_skipped')
+        return False
+
+    # Returns a pool of jobs worker processes, tracing when the main process
+    # does.
+    def pool(self):
+        return multiprocessing.Pool(self.opts['jobs'], trace.init_worker,
+                                    (trace.tracer.enabled,))
+
+    def print_errors(self):
+        for error in self.errors:
+            metrics.registry.add('errors', 1,
+                                 ('type', metrics.get_error_type(error)))
             print(error)
+        self.errors = []
+
+    # Prints the bytes of show tech-support captures that were not parsed.
+    def print_skipped(self):
+        skipped = metrics.registry.get('bytes_skipped')
+        if skipped > 0:
+            files = metrics.registry.get('files_extracted')
+            print(f'Read the running config of {files} show tech-support '
+                  f'captures, skipped {skipped} bytes')
+
+    # Parses every device once and passes it to each requested report, so
+    # adding reports does not add parsing time. Each report is a
+    # (file, add device, finish) tuple; finish is called after the last device
+    # and may be None, file is closed at the end and may be None.
+    def write_reports(self):
+        reports = []
+        if ('write_nat' in self.opts and 'snapshot_src' not in self.opts
+            and 'stream' not in self.opts):
+            reports.append(self.nat_report())
+        if 'write_nat_jsonl' in self.opts and 'stream' not in self.opts:
+            reports.append(self.nat_jsonl_report())
+        if 'write_interfaces' in self.opts:
+            reports.append(self.interface_report())
+        if 'write_objects' in self.opts:
+            reports.append(self.object_report())
+        if 'write_groups' in self.opts:
+            reports.append(self.group_report())
+        if 'where_used' in self.opts:
+            reports.append(self.where_used_report())
+        if 'write_unused' in self.opts:
+            reports.append(self.unused_report())
+        if 'flows_file' in self.opts:
+            reports.append(self.acl_match_report())
+        if 'route_addrs' in self.opts:
+            reports.append(self.route_lookup_report())
+        if 'nat_flows_file' in self.opts:
+            reports.append(self.nat_translation_report())
+        if 'write_nat_overlaps' in self.opts:
+            reports.append(self.nat_overlap_report())
+        if 'write_nat_collisions' in self.opts:
+            reports.append(self.nat_collision_report())
+        if 'write_adjacency' in self.opts:
+            reports.append(self.adjacency_report())
+        if 'snapshot_file' in self.opts:
+            reports.append(self.snapshot_report())
+        if 'sqlite_file' in self.opts:
+            reports.append(self.sqlite_report())
+        if len(reports) == 0:
+            return
+
+        reports = [(file, traced(metrics.registry.timed('report', add_device)),
+                    finish) for file, add_device, finish in reports]
+        with trace.tracer.span('write reports'):
+            if self.opts['jobs'] > 1:
+                self.add_devices_concurrently(reports)
+            elif 'writer_queue' in self.opts:
+                self.add_devices_in_background(reports)
+            else:
+                for device in self.parse_devices():
+                    for _file, add_device, _finish in reports:
+                        add_device(device)
+
+        with metrics.registry.phase('finish'), trace.tracer.span('finish'):
+            for file, _add_device, finish in reports:
+                if finish != None:
+                    finish()
+                if file != None:
+                    file.close()
+        self.print_errors()
+        self.print_skipped()
+        if self.supervisor != None:
+            self.supervisor.print_summary()
+
+    # Passes the devices to the reports from a pool of threads, one task per
+    # device and report, so the rows of one device are written while the next
+    # devices are parsed. Reports writing a single file are serialized;
+    # partitioned reports write different shards at the same time. At most a
+    # few tasks per job are pending so parsed devices do not pile up.
+    def add_devices_concurrently(self, reports):
+        jobs = self.opts['jobs']
+        pending = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+            for device in self.parse_devices():
+                for _file, add_device, _finish in reports:
+                    pending.append(executor.submit(add_device, device))
+                while len(pending) > jobs * 4:
+                    pending.popleft().result()
+            while len(pending) > 0:
+                pending.popleft().result()
+
+    # Passes the devices to the reports in a writer thread, so the rows of one
+    # device are formatted and written while the next file is parsed. The
+    # queue between them holds at most the writer queue option of devices.
+    def add_devices_in_background(self, reports):
+        def add_device(device):
+            for _file, add, _finish in reports:
+                add(device)
+
+        writer = writerthread.WriterThread(add_device,
+                                           self.opts['writer_queue'])
+        try:
+            for device in self.parse_devices():
+                writer.put(device)
+        finally:
+            writer.close()
+
+        metrics.registry.add_phase('writer stall', writer.stall_seconds)
+        metrics.registry.add_phase('writer idle', writer.idle_seconds)
+        metrics.registry.set_gauge('writer_queue_max_depth', writer.max_depth)
+        metrics.registry.set_gauge('writer_queue_mean_depth',
+                                   writer.mean_depth())
+        print(f'Writer queue: {writer.items} devices, max depth '
+              f'{writer.max_depth}, mean depth {writer.mean_depth():.1f}, '
+              f'parse stalled {writer.stall_seconds:.2f} s, writer idle '
+              f'{writer.idle_seconds:.2f} s')
+
+    # Returns a report of a writer that writes the rows of each device as it
+    # is added. With the partition option the rows are split over several
+    # files by a PartitionedOutput; with the sort option they are written
+    # once all devices are added by a SortedOutput.
+    def device_report(self, writer_class, filename, *args):
+        if 'partition' in self.opts:
+            mode, size = self.opts['partition']
+            output = partition.PartitionedOutput(
+                filename, writer_class, args, mode, size,
+                self.opts.get('manifest', False))
+            return (None, output.write, output.close)
+        writer = writer_class(None, *args)
+        if 'sort_by' in self.opts:
+            self.check_sort_cols(writer, filename)
+        report_file = open(filename, 'w')
+        writer.file = report_file
+        if 'sort_by' in self.opts:
+            output = externalsort.SortedOutput(report_file, writer,
+                                               self.opts['sort_by'],
+                                               self.opts['sort_memory'])
+            return (report_file, serialized(output.write), output.close)
+        writer.write_headers()
+        return (report_file, serialized(writer.write), None)
+
+    # Exits with a usage error if a sort column is not a column of the given
+    # writer of the given report file.
+    def check_sort_cols(self, writer, filename):
+        for col in self.opts['sort_by']:
+            try:
+                externalsort.get_col(writer, col)
+            except ValueError as err:
+                print(f'--sort-by: {err} {filename} has no such column.')
+                self.print_usage()
+                sys.exit(1)
+
+    def nat_report(self):
+        return self.device_report(natwriter.NATWriter, self.opts['nat_file'],
+                                  self.opts.get('columns'))
+
+    # Returns a report writing the nat rules of each device as json lines.
+    # Records are buffered in batches and the last batch is flushed when the
+    # report finishes.
+    def nat_jsonl_report(self):
+        jsonl_file = open(self.opts['nat_jsonl_file'], 'w')
+        writer = natjsonwriter.NATJSONWriter(jsonl_file)
+        return (jsonl_file, serialized(writer.write), writer.flush)
+
+    def interface_report(self):
+        return self.device_report(interfacewriter.InterfaceWriter,
+                                  self.opts['interface_file'])
+
+    def object_report(self):
+        return self.device_report(objectwriter.ObjectWriter,
+                                  self.opts['object_file'])
+
+    def group_report(self):
+        return self.device_report(groupwriter.GroupWriter,
+                                  self.opts['group_file'])
+
+    # Writes nat rules from the snapshot file without parsing, sorted with
+    # the sort option.
+    def write_nat_from_snapshot(self):
+        cols = self.opts.get('columns')
+        if 'sort_by' in self.opts:
+            writer = natwriter.NATWriter(None, cols)
+            self.check_sort_cols(writer, self.opts['nat_file'])
+        nat_file = open(self.opts['nat_file'], 'w')
+        reader = snapshot.Snapshot(self.opts['snapshot_src'])
+        if 'sort_by' in self.opts:
+            writer.file = nat_file
+            output = externalsort.SortedOutput(nat_file, writer,
+                                               self.opts['sort_by'],
+                                               self.opts['sort_memory'])
+            output.add_rows(reader.nat_rows())
+            output.close()
+        else:
+            reader.write_nat(nat_file, cols=cols)
+        reader.close()
+        nat_file.close()
+
+    # Writes nat rules as they are parsed, one file at a time, without
+    # building complete devices, to the nat csv file, the nat json lines file
+    # or both.
+    def write_nat_streaming(self):
+        files = []
+        emitters = []
+        if 'write_nat' in self.opts:
+            nat_file = open(self.opts['nat_file'], 'w')
+            writer = natwriter.NATWriter(nat_file, self.opts.get('columns'))
+            writer.write_headers()
+            files.append(nat_file)
+            emitters.append(writer.write_nat)
+        if 'write_nat_jsonl' in self.opts:
+            jsonl_file = open(self.opts['nat_jsonl_file'], 'w')
+            jsonl_writer = natjsonwriter.NATJSONWriter(jsonl_file)
+            files.append(jsonl_file)
+            emitters.append(jsonl_writer.write_nat)
+
+        def emit(device, nat, object):
+            if (self.host_filter != None
+                and not self.host_filter.match(device.hostname)):
+                return
+            for emitter in emitters:
+                emitter(device, nat, object)
+
+        for fullname, section in self.stream_sources():
+            start = time.perf_counter()
+            parser = natstream.NATStreamParser(emit)
+            if section != None:
+                parser.file = section
+                parser.filename = fullname
+            else:
+                parser.open(fullname)
+            try:
+                with trace.tracer.span('stream', file=fullname):
+                    parser.parse()
+                self.errors.extend(parser.errors)
+            except Exception as e:
+                self.print_errors()
+                parser.print_line()
+                raise e
+            parser.close()
+            record_parse(fullname, parser.lines_read,
+                         time.perf_counter() - start, parser.bytes_skipped(),
+                         section.size if section != None else None)
+
+        if 'write_nat_jsonl' in self.opts:
+            jsonl_writer.flush()
+        for file in files:
+            file.close()
+        self.print_errors()
+        self.print_skipped()
+
+    # Yields the (filename, None) of each configuration file of the source
+    # directory, or the (name, section) of each device section of stdin when
+    # it is '-'.
+    def stream_sources(self):
+        src_dir = self.opts['src_dir']
+        if src_dir == '-':
+            stream = configstream.ConfigStream(
+                sys.stdin, select=self.get_host_select())
+            for section in stream.sections():
+                yield (section.name, section)
+            return
+        for file in os.listdir(src_dir):
+            fullname = os.path.join(src_dir, file)
+            if file.startswith('.') or not self.is_selected(fullname):
+                continue
+            yield (fullname, None)
+
+    def where_used_report(self):
+        return self.device_report(whereusedwriter.WhereUsedWriter,
+                                  self.opts['where_used_file'],
+                                  self.opts['where_used'])
+
+    def unused_report(self):
+        return self.device_report(unusedobjectwriter.UnusedObjectWriter,
+                                  self.opts['unused_file'])
+
+    def acl_match_report(self):
+        flows = accesslistmatcher.read_flows(self.opts['flows_file'],
+                                            self.errors)
+        return self.device_report(accesslistwriter.AccessListWriter,
+                                  self.opts['acl_match_file'], flows)
+
+    # Returns a report of the routes resolving the route lookup address, or
+    # each address listed in the route lookup file, on every device. Invalid
+    # lines of the file are reported and skipped.
+    def route_lookup_report(self):
+        addrs = self.opts['route_addrs']
+        if os.path.isfile(addrs):
+            addrs = self.read_route_addrs(addrs)
+        elif iptools.is_host_addr(addrs):
+            addrs = [addrs]
+        else:
+            print(f'--route-lookup: Invalid address "{addrs}".')
+            self.print_usage()
+            sys.exit(1)
+        return self.device_report(routewriter.RouteWriter,
+                                  self.opts['route_lookup_file'], addrs)
+
+    # Returns the addresses listed in the given route lookup file, one per
+    # line.
+    def read_route_addrs(self, filename):
+        addrs = []
+        with open(filename, 'r') as addrs_file:
+            for line_number, line in enumerate(addrs_file, 1):
+                addr = line.strip()
+                if addr == '':
+                    continue
+                if not iptools.is_host_addr(addr):
+                    self.errors.append(f'{filename}:{line_number}:\n'
+                                       f'  Invalid address "{addr}".\n'
+                                       f'  {addr}')
+                    continue
+                addrs.append(addr)
+        return addrs
+
+    # Returns a report translating the flows of the nat flows file with the
+    # nat rules of every device. All devices are added first so the flows are
+    # read only once.
+    def nat_translation_report(self):
+        translate_file = open(self.opts['nat_translate_file'], 'w')
+        writer = nattranslationwriter.NATTranslationWriter(translate_file)
+        writer.write_headers()
+
+        def finish():
+            with open(self.opts['nat_flows_file'], 'r') as flows_file:
+                writer.write_flows(flows_file, self.errors)
+
+        return (translate_file, serialized(writer.add_device), finish)
+
+    def nat_overlap_report(self):
+        return self.device_report(natoverlapwriter.NATOverlapWriter,
+                                  self.opts['nat_overlap_file'])
+
+    def nat_collision_report(self):
+        collision_file = open(self.opts['nat_collision_file'], 'w')
+        writer = natcollisionwriter.NATCollisionWriter(collision_file)
+        return (collision_file, serialized(writer.add_device), writer.write)
+
+    def adjacency_report(self):
+        adjacency_file = open(self.opts['adjacency_file'], 'w')
+        writer = adjacencywriter.AdjacencyWriter(adjacency_file)
+        return (adjacency_file, serialized(writer.add_device), writer.write)
+
+    def snapshot_report(self):
+        writer = snapshot.SnapshotWriter(self.opts['snapshot_file'])
+        return (None, serialized(writer.write), writer.close)
+
+    def sqlite_report(self):
+        writer = sqlitewriter.SQLiteWriter(self.opts['sqlite_file'])
+        return (None, serialized(writer.write), writer.close)
+
+    # Serves requests on the unix socket until a shutdown request or an
+    # interrupt. The configuration directory is parsed up front when it
+    # exists so the first requests find the devices warm.
+    def serve(self):
+        try:
+            fleet_server = server.CISXServer(self.opts['serve_socket'],
+                                             self.opts['src_dir'])
+        except OSError as e:
+            print(e)
+            sys.exit(1)
+        if os.path.isdir(self.opts['src_dir']):
+            fleet_server.state.load(self.opts['src_dir'])
+        try:
+            fleet_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        fleet_server.server_close()
+
+    # Sends the request option to the server and prints its result.
+    def send_request(self):
+        status = client.send_request(self.opts['client_socket'],
+                                     self.opts.get('request', 'stats'))
+        if status != 0:
+            sys.exit(status)
+
+
+################################################################################
+
+
+# Parses a single configuration file in a worker process and returns the
+# (device, errors, (filename, lines read, seconds, bytes skipped), trace
+# events). The
+# position of the parser is added to any exception so the failing line is
+# known in the main process.
+def parse_file(filename):
+    start = time.perf_counter()
+    parser = ciscoparser.CiscoParser()
+    try:
+        device = parser.parse(filename)
+    except Exception as e:
+        raise RuntimeError(f'{parser.filename}:{parser.line_number}: '
+                           f'{parser.line}: {e!r}') from e
+    parser.close()
+    return (device, parser.errors,
+            (filename, parser.lines_read, time.perf_counter() - start,
+             parser.bytes_skipped()),
+            trace.tracer.take())
+
+# Adds a parsed file to the run metrics and memory profile. Workers return
+# their parse times, so with several jobs the parse phase sums the time of
+# every worker. size is the size of the file unless given, as for a stream,
+# and skipped the bytes of it that were not read.
+def record_parse(filename, lines, seconds, skipped=0, size=None):
+    if size == None:
+        size = os.path.getsize(filename)
+    metrics.registry.add('files_parsed')
+    metrics.registry.add('bytes_read', size - skipped)
+    if skipped > 0:
+        metrics.registry.add('files_extracted')
+        metrics.registry.add('bytes_skipped', skipped)
+    metrics.registry.add('lines_read', lines)
+    metrics.registry.add_phase('parse', seconds)
+    memprofile.profiler.checkpoint('parse', filename)
+
+# Returns a function adding a device to a report inside a trace span.
+def traced(add_device):
+    def call(device):
+        with trace.tracer.span('report', hostname=device.hostname):
+            return add_device(device)
+    return call
+
+# Returns a function calling the given function under a lock, for writers
+# that may be given devices from several threads.
+def serialized(function):
+    lock = threading.Lock()
+    def call(*args):
+        with lock:
+            return function(*args)
+    return call
 
 
 ################################################################################
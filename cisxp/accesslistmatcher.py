@@ -0,0 +1,152 @@
+################################################################################
+# accesslistmatcher.py
+################################################################################
+
+
+from cisxp import device
+from cisxp import intervalindex
+from cisxp import iptools
+
+
+################################################################################
+
+
+# Finds the first matching rule of each access list for a batch of flows.
+# Entries are indexed by protocol and source address with an IntervalIndex so
+# only the entries whose source range contains the flow source are checked.
+class AccessListMatcher():
+    def __init__(self, access_lists):
+        self.access_lists = list(access_lists)
+        self.indexes = {}    # maps (access list index, protocol) to index
+        self.cache = {}      # maps flow to its match results
+        self.cache_hits = 0
+
+    # Returns the index of the entries of the given access list that match
+    # the given protocol number, building it on first use.
+    def get_index(self, acl_index, protocol):
+        key = (acl_index, protocol)
+        index = self.indexes.get(key)
+        if index == None:
+            access_list = self.access_lists[acl_index]
+            index = intervalindex.IntervalIndex()
+            for entry in range(len(access_list)):
+                entry_protocol = access_list.protocol[entry]
+                if (entry_protocol == protocol
+                    or entry_protocol == device.AccessList.ANY_PROTOCOL):
+                    index.add(access_list.src_start[entry],
+                              access_list.src_end[entry], entry)
+            index.build()
+            self.indexes[key] = index
+        return index
+
+    # Returns the first entry of the given access list that matches the given
+    # flow or None if no entry matches.
+    def match_entry(self, acl_index, src, dest, protocol, src_port,
+                    dest_port):
+        access_list = self.access_lists[acl_index]
+        dest_start, dest_end = access_list.dest_start, access_list.dest_end
+        src_port_start = access_list.src_port_start
+        src_port_end = access_list.src_port_end
+        dest_port_start = access_list.dest_port_start
+        dest_port_end = access_list.dest_port_end
+        for entry in self.get_index(acl_index, protocol).lookup(src):
+            if (dest_start[entry] <= dest <= dest_end[entry]
+                and src_port_start[entry] <= src_port <= src_port_end[entry]
+                and dest_port_start[entry] <= dest_port
+                    <= dest_port_end[entry]):
+                return entry
+        return None
+
+    # Returns a list with the first matching entry, or None, of every access
+    # list for the given flow. Addresses are integers or address strings and
+    # the protocol is a number or protocol name. Raises ValueError for an
+    # address, protocol or port that is not valid.
+    def match_flow(self, src, dest, protocol, src_port=0, dest_port=0):
+        flow = (src, dest, protocol, src_port, dest_port)
+        matches = self.cache.get(flow)
+        if matches != None:
+            self.cache_hits += 1
+            return matches
+        if isinstance(src, str):
+            src = to_addr(src)
+        if isinstance(dest, str):
+            dest = to_addr(dest)
+        if isinstance(protocol, str):
+            protocol = to_value(iptools.protocol_to_int, 'protocol', protocol)
+        src_port = to_value(iptools.port_to_int, 'port', src_port)
+        dest_port = to_value(iptools.port_to_int, 'port', dest_port)
+        matches = [self.match_entry(i, src, dest, protocol, src_port,
+                                    dest_port)
+                   for i in range(len(self.access_lists))]
+        self.cache[flow] = matches
+        return matches
+
+    # Returns a list of match results, one for each (src, dest, protocol,
+    # src port, dest port) flow in flows.
+    def match(self, flows):
+        return [self.match_flow(*flow) for flow in flows]
+
+    # Returns the (access list, rule index, permit) of the given entry.
+    def get_rule(self, acl_index, entry):
+        access_list = self.access_lists[acl_index]
+        return (access_list, access_list.rule[entry],
+                access_list.permit[entry] == 1)
+
+
+################################################################################
+
+
+# Returns a list of (src, dest, protocol, src port, dest port) flows read from
+# the given file. Each line holds the fields separated by whitespace or commas,
+# ports are optional, and blank lines and lines beginning with '#' are skipped.
+# Lines with missing fields or an invalid address, protocol or port are
+# skipped and reported in errors.
+def read_flows(filename, errors):
+    flows = []
+    with open(filename, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            fields = line.replace(',', ' ').split()
+            if len(fields) == 0 or fields[0].startswith('#'):
+                continue
+            if len(fields) < 3:
+                msg = 'Missing fields.'
+            else:
+                fields.extend(['0'] * (5 - len(fields)))
+                msg = check_flow(*fields[:5])
+            if msg != None:
+                errors.append(f'{filename}:{line_number}:\n  {msg}\n'
+                              f'  {line.strip()}')
+                continue
+            flows.append(tuple(fields[:5]))
+    return flows
+
+# Returns the error message of the first invalid field of the given flow or
+# None if it is valid.
+def check_flow(src, dest, protocol, src_port, dest_port):
+    for addr in (src, dest):
+        if not iptools.is_host_addr(addr):
+            return f'Invalid address "{addr}".'
+    if iptools.protocol_to_int(protocol) == None:
+        return f'Unknown protocol "{protocol}".'
+    for port in (src_port, dest_port):
+        if iptools.port_to_int(port) == None:
+            return f'Unknown port "{port}".'
+    return None
+
+# Returns the integer value of the given address string. Raises ValueError if
+# it is not a valid address.
+def to_addr(addr):
+    if not iptools.is_host_addr(addr):
+        raise ValueError(f'Invalid address "{addr}".')
+    return iptools.addr_to_int(addr)
+
+# Returns the number of the given protocol or port name or number string
+# using the given conversion function. Raises ValueError if it is not known.
+def to_value(convert, kind, value):
+    result = convert(value)
+    if result == None:
+        raise ValueError(f'Unknown {kind} "{value}".')
+    return result
+
+
+################################################################################
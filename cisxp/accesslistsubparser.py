@@ -0,0 +1,256 @@
+################################################################################
+# accesslistsubparser.py
+################################################################################
+
+
+from cisxp import device
+from cisxp import iptools
+
+
+################################################################################
+
+
+# Parses an extended access-list line and expands it into entries of the
+# AccessList rule table. Object and object-group references are resolved to
+# address and port ranges when the line is read, so entries hold only
+# integers.
+class AccessListSubparser():
+    ANY_ADDR = (0, 0xffffffff)
+    ANY_PORT = (0, 0xffff)
+    PORT_OPS = ('eq', 'neq', 'lt', 'gt', 'range')
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.tokens = None
+        self.index = 0         # index of the next token to read
+        self.access_list = None
+        self.role = None       # clause being read, for object references
+
+    def parse(self):
+        self.tokens = self.parser.tokens
+        if len(self.tokens) < 3 or 'extended' not in self.tokens[2:4]:
+            return None        # remarks, standard and webtype lists
+        access_list = self.get_or_add_access_list(self.tokens[1])
+        self.access_list = access_list
+        self.index = self.tokens.index('extended') + 1
+
+        action = self.next_token()
+        if action not in ('permit', 'deny'):
+            self.parser.error(f'Unknown access-list action "{action}".')
+            return access_list
+        self.role = 'service'
+        services = self.get_services()
+        self.role = 'src'
+        src = self.get_addrs()
+        src_ports = self.get_ports()
+        self.role = 'dest'
+        dest = self.get_addrs()
+        dest_ports = self.get_ports()
+        if services == None or src == None or dest == None:
+            return access_list
+
+        rule = access_list.add_rule(self.parser.line.strip())
+        if 'inactive' in self.tokens[self.index:]:
+            return access_list
+        self.add_entries(access_list, rule, action == 'permit', services, src,
+                         src_ports, dest, dest_ports)
+        return access_list
+
+    # Adds an entry for every combination of service, source and destination
+    # range. Port ranges given after the addresses override the ports of the
+    # services.
+    def add_entries(self, access_list, rule, permit, services, src, src_ports,
+                    dest, dest_ports):
+        for protocol, service_src_ports, service_dest_ports in services:
+            if src_ports != None:
+                service_src_ports = src_ports
+            if dest_ports != None:
+                service_dest_ports = dest_ports
+            for src_range in src:
+                for dest_range in dest:
+                    for src_port in service_src_ports:
+                        for dest_port in service_dest_ports:
+                            access_list.add_entry(rule, permit, protocol,
+                                                  src_range, dest_range,
+                                                  src_port, dest_port)
+
+    # Returns an existing access list within device or creates a new one if
+    # one does not already exist.
+    def get_or_add_access_list(self, name):
+        access_list = self.parser.device.get_access_list(name)
+        if access_list == None:
+            access_list = device.AccessList(name)
+            self.parser.device.add_access_list(access_list)
+        return access_list
+
+    # Returns the next token or None if there are no tokens left.
+    def next_token(self):
+        if self.index >= len(self.tokens):
+            return None
+        self.index += 1
+        return self.tokens[self.index - 1]
+
+    # Returns the next token without consuming it.
+    def peek_token(self):
+        if self.index >= len(self.tokens):
+            return None
+        return self.tokens[self.index]
+
+    # Returns a list of (protocol, src port ranges, dest port ranges) tuples
+    # from the protocol clause or None if it cannot be resolved.
+    def get_services(self):
+        token = self.next_token()
+        if token in ('object', 'object-group'):
+            name = self.next_token()
+            object = self.parser.device.get_object(name)
+            if object == None:
+                self.parser.error(f'Service object "{name}" not found.')
+                return None
+            self.add_reference(object)
+            return self.get_object_services(object, set())
+        protocol = self.get_protocol(token)
+        if protocol == None:
+            return None
+        return [(protocol, [self.ANY_PORT], [self.ANY_PORT])]
+
+    # Returns a list of (protocol, src port ranges, dest port ranges) tuples
+    # for the given service object or service/protocol object group.
+    def get_object_services(self, object, seen):
+        if not isinstance(object, device.Object) or id(object) in seen:
+            return []
+        seen.add(id(object))
+        if object.type in (device.ObjectType.SERVICE_GROUP,
+                           device.ObjectType.PROTOCOL_GROUP):
+            services = []
+            for item in object.items:
+                services.extend(self.get_object_services(item, seen))
+            return services
+
+        if object.protocol == 'tcp-udp':
+            protocols = [iptools.protocol_numbers['tcp'],
+                         iptools.protocol_numbers['udp']]
+        else:
+            protocol = self.get_protocol(object.protocol)
+            if protocol == None:
+                return []
+            protocols = [protocol]
+        src_ports = self.get_port_ranges(object.src_op, object.src_port)
+        dest_ports = self.get_port_ranges(object.dest_op, object.dest_port)
+        return [(protocol, src_ports, dest_ports) for protocol in protocols]
+
+    # Returns the protocol number of the given protocol name or None if it is
+    # not known.
+    def get_protocol(self, name):
+        if name in ('ip', None):
+            return device.AccessList.ANY_PROTOCOL
+        protocol = iptools.protocol_to_int(name)
+        if protocol == None:
+            self.parser.error(f'Unknown protocol "{name}".')
+        return protocol
+
+    # Returns a list of address ranges from the next address clause or None if
+    # the clause cannot be resolved.
+    def get_addrs(self):
+        token = self.next_token()
+        if token in ('any', 'any4'):
+            return [self.ANY_ADDR]
+        elif token == 'any6':
+            return []
+        elif token == 'host':
+            return self.get_addr_ranges(self.next_token(), 32)
+        elif token in ('object', 'object-group'):
+            name = self.next_token()
+            object = self.parser.device.get_object(name)
+            if object == None:
+                self.parser.error(f'Network object "{name}" not found.')
+                return None
+            self.add_reference(object)
+            return object.ranges()
+        elif token == 'interface':
+            return self.get_interface_addrs(self.next_token())
+        elif (iptools.is_addr(token)
+              or self.parser.device.get_object(token) != None):
+            mask = self.next_token()
+            if not iptools.is_addr(mask):
+                return []                         # ipv6 prefix length
+            return self.get_addr_ranges(token, iptools.mask_to_cidr(mask))
+        self.parser.error(f'Unknown access-list address "{token}".')
+        return None
+
+    # Returns the range of the given address or name object with the given
+    # cidr. ipv6 addresses return no ranges.
+    def get_addr_ranges(self, addr, cidr):
+        object = self.parser.device.get_object(addr)
+        if object != None:
+            self.add_reference(object)
+            addr = object
+        range = device.Addr(addr, cidr).range()
+        return [range] if range != None else []
+
+    # Records the use of the given object by the access list.
+    def add_reference(self, object):
+        self.parser.device.add_reference(object, device.Reference(
+            device.Reference.ACCESS_LIST, self.access_list,
+            self.access_list.name, self.role))
+
+    # Returns the host ranges of the primary address of the named interface.
+    def get_interface_addrs(self, name):
+        interface = self.parser.device.get_interface_by_custom_name(name)
+        if interface == None or interface.primary_addr() == None:
+            self.parser.error(f'Interface "{name}" not found.')
+            return None
+        return [iptools.cidr_to_range(interface.primary_addr().addr, 32)]
+
+    # Returns a list of port ranges from the next port clause or None if the
+    # next token does not begin a port clause.
+    def get_ports(self):
+        token = self.peek_token()
+        if token in self.PORT_OPS:
+            self.next_token()
+            port = self.next_token()
+            if token == 'range':
+                port = [port, self.next_token()]
+            return self.get_port_ranges(token, port)
+        elif token == 'object-group' and self.index + 1 < len(self.tokens):
+            object = self.parser.device.get_object(
+                self.tokens[self.index + 1])
+            if (object == None
+                or object.type != device.ObjectType.SERVICE_GROUP):
+                return None    # a network object-group, not a port group
+            self.add_reference(object)
+            self.index += 2
+            ports = []
+            for _protocol, _src_ports, dest_ports in \
+                    self.get_object_services(object, set()):
+                ports.extend(dest_ports)
+            return ports
+        return None
+
+    # Returns a list of port ranges from the given port operator and port or
+    # [start, end] port list.
+    def get_port_ranges(self, op, port):
+        if op == None:
+            return [self.ANY_PORT]
+        if op == 'range':
+            start, end = port
+            start, end = iptools.port_to_int(start), iptools.port_to_int(end)
+        else:
+            start = end = iptools.port_to_int(port)
+        if start == None or end == None:
+            self.parser.error(f'Unknown port "{port}".')
+            return []
+        if op == 'lt':
+            return [(0, start - 1)] if start > 0 else []
+        elif op == 'gt':
+            return [(start + 1, 0xffff)] if start < 0xffff else []
+        elif op == 'neq':
+            ranges = []
+            if start > 0:
+                ranges.append((0, start - 1))
+            if start < 0xffff:
+                ranges.append((start + 1, 0xffff))
+            return ranges
+        return [(start, end)]
+
+
+################################################################################
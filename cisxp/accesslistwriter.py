@@ -0,0 +1,89 @@
+################################################################################
+# accesslistwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import accesslistmatcher
+from cisxp import csvwriter
+from cisxp import metrics
+
+
+################################################################################
+
+
+# Writes the first matching rule of each access list of a device for every
+# flow in a batch of flows.
+class AccessListWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout, flows=None):
+        super().__init__(file)
+        self.flows = flows if flows != None else []
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'access list',
+            'src',
+            'dest',
+            'protocol',
+            'src port',
+            'dest port',
+            'line',
+            'action',
+            'rule',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'    : 'Hostname',
+            'access list' : 'Access List',
+            'src'         : 'Src',
+            'dest'        : 'Dest',
+            'protocol'    : 'Protocol',
+            'src port'    : 'Src Port',
+            'dest port'   : 'Dest Port',
+            'line'        : 'Line',
+            'action'      : 'Action',
+            'rule'        : 'Rule',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        if len(self.device.access_lists) == 0:
+            return
+        matcher = accesslistmatcher.AccessListMatcher(self.device.access_lists)
+        for flow, matches in zip(self.flows, matcher.match(self.flows)):
+            for acl_index, entry in enumerate(matches):
+                self.add_match_row(matcher, flow, acl_index, entry)
+        metrics.registry.add('cache_hits', matcher.cache_hits,
+                             ('cache', 'acl match'))
+
+    def add_match_row(self, matcher, flow, acl_index, entry):
+        src, dest, protocol, src_port, dest_port = flow
+        self.row = {
+            'hostname'    : self.device.hostname,
+            'access list' : matcher.access_lists[acl_index].name,
+            'src'         : src,
+            'dest'        : dest,
+            'protocol'    : protocol,
+            'src port'    : src_port,
+            'dest port'   : dest_port,
+        }
+        if entry != None:
+            access_list, rule, permit = matcher.get_rule(acl_index, entry)
+            self.row.update({
+                'line'   : rule + 1,
+                'action' : 'permit' if permit else 'deny',
+                'rule'   : access_list.lines[rule],
+            })
+        self.rows.append(self.row)
+
+
+################################################################################
@@ -0,0 +1,59 @@
+################################################################################
+# adjacency.py
+################################################################################
+
+
+from cisxp import intervalindex
+
+
+################################################################################
+
+
+# The subnet of an interface address of a device.
+class Subnet():
+    def __init__(self, hostname, interface, addr, start, end):
+        self.hostname = hostname
+        self.interface = interface  # device.Interface()
+        self.addr = addr            # device.Addr() of the interface
+        self.start = start
+        self.end = end
+
+    # Returns the name of the vrf of the interface, or None.
+    def vrf(self):
+        return getattr(self.interface.vrf, 'name', self.interface.vrf)
+
+
+################################################################################
+
+
+# Finds the devices of a fleet that share interface subnets. The subnets of
+# every device are swept once with intervalindex.overlapping_pairs(), so only
+# subnets that actually overlap are compared instead of every pair of
+# devices.
+class Adjacency():
+    def __init__(self):
+        self.subnets = []
+
+    # Adds the subnets of the ipv4 interface addresses of the given device.
+    # Host addresses and default routes are skipped, as they share no link.
+    def add_device(self, dev):
+        for interface in dev.interfaces:
+            for addr in interface.addrs:
+                range = addr.range()
+                if range == None:
+                    continue
+                start, end = range
+                if start == end or (start == 0 and end == 0xffffffff):
+                    continue
+                self.subnets.append(Subnet(dev.hostname, interface, addr,
+                                           start, end))
+
+    # Returns a list of (subnet, other subnet) pairs of overlapping subnets of
+    # different hostnames. other subnet is the one that starts first.
+    def find(self):
+        return [(subnet, other) for subnet, other
+                in intervalindex.overlapping_pairs(self.subnets)
+                if subnet.hostname != other.hostname]
+
+
+################################################################################
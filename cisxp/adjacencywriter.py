@@ -0,0 +1,84 @@
+################################################################################
+# adjacencywriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import adjacency
+from cisxp import csvwriter
+from cisxp import iptools
+from cisxp import natwriter
+
+
+################################################################################
+
+
+# Writes the edge list of the subnet adjacency graph of the fleet, one row per
+# pair of interfaces of different devices with overlapping subnets. Devices
+# are added with add_device and the edges written with write.
+class AdjacencyWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+        self.adjacency = adjacency.Adjacency()
+
+        # Column identifiers.
+        self.cols = [
+            'subnet',
+            'hostname',
+            'interface',
+            'name',
+            'vrf',
+            'addr',
+            'other hostname',
+            'other interface',
+            'other name',
+            'other vrf',
+            'other addr',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'subnet'          : 'Subnet',
+            'hostname'        : 'Hostname',
+            'interface'       : 'Interface',
+            'name'            : 'Name',
+            'vrf'             : 'VRF',
+            'addr'            : 'Addr',
+            'other hostname'  : 'Other Hostname',
+            'other interface' : 'Other Interface',
+            'other name'      : 'Other Name',
+            'other vrf'       : 'Other VRF',
+            'other addr'      : 'Other Addr',
+        }
+
+    def add_device(self, device):
+        self.adjacency.add_device(device)
+
+    def populate_rows(self):
+        for subnet, other in self.adjacency.find():
+            self.rows.append({
+                'subnet'          : self.get_subnet(
+                                        max(subnet.start, other.start),
+                                        min(subnet.end, other.end)),
+                'hostname'        : subnet.hostname,
+                'interface'       : subnet.interface.name,
+                'name'            : subnet.interface.custom_name,
+                'vrf'             : subnet.vrf(),
+                'addr'            : natwriter.get_addr(subnet.addr),
+                'other hostname'  : other.hostname,
+                'other interface' : other.interface.name,
+                'other name'      : other.interface.custom_name,
+                'other vrf'       : other.vrf(),
+                'other addr'      : natwriter.get_addr(other.addr),
+            })
+
+    # Returns the subnet shared by two interfaces. Subnets are aligned, so
+    # the overlap of two of them is the smaller one.
+    def get_subnet(self, start, end):
+        cidr = 33 - (end - start + 1).bit_length()
+        return f'{iptools.int_to_addr(start)}/{cidr}'
+
+
+################################################################################
@@ -0,0 +1,333 @@
+################################################################################
+# chunkparser.py
+################################################################################
+
+
+import io
+import re
+
+
+from cisxp import ciscoparser
+from cisxp import device
+from cisxp import iptools
+from cisxp import natstream
+from cisxp import showtech
+from cisxp import trace
+
+
+################################################################################
+
+
+# A contiguous run of top level stanzas of a configuration file.
+class Chunk():
+    def __init__(self, parallel, start):
+        self.parallel = parallel    # True if parsed by a worker process
+        self.start = start          # line number of the first line
+        self.lines = []
+        self.size = 0               # characters in lines
+
+
+################################################################################
+
+
+# Parses the interface, object and nat stanzas of a chunk of a
+# configuration. Errors about interfaces and objects that are not found are
+# kept apart, since the missing definitions may be in an earlier chunk.
+class ChunkParser(ciscoparser.CiscoParser):
+    not_found_re = re.compile(r'.* "(.*)" (?:not found|used in nat).*')
+    nat_interfaces_re = re.compile(r'\s*nat\s+\((\S+?),\s*(\S+?)\).*')
+
+    def __init__(self):
+        super().__init__()
+        self.reference_errors = []      # (name, error) tuples
+        self.link = False               # linked once chunks are merged
+
+    def parse_chunk(self, filename, start, text, extract=None):
+        self.file = io.StringIO(text)
+        self.filename = filename
+        self.extract = extract          # line numbers of a capture
+        self.lines_read = start - 1     # keeps line numbers of the file
+        return self.parse()
+
+    def error(self, msg):
+        match = self.not_found_re.fullmatch(msg)
+        if match == None:
+            super().error(msg)
+            return
+        name = match.group(1)
+        if name == 'None':              # pat to an interface not found
+            interfaces = self.nat_interfaces_re.fullmatch(self.line)
+            name = interfaces.group(2) if interfaces != None else name
+        errors, self.errors = self.errors, []
+        super().error(msg)
+        self.reference_errors.append((name, self.errors[0]))
+        self.errors = errors
+
+
+################################################################################
+
+
+# Parses a single configuration file in parts. The file is cut into chunks
+# at top level stanza boundaries, where the parser indent is 0. Runs of
+# interface, name, object, object-group and nat stanzas are parsed by worker
+# processes in chunks of about chunk_size characters and the partial devices
+# are merged in file order. References a worker could not resolve because
+# their definition lies in an earlier chunk are then linked to it, exactly as
+# a sequential parse would have linked them.
+#
+# All other stanzas, such as access lists, routes and show route output, are
+# parsed afterwards in the main process into the merged device, since they
+# resolve objects to address ranges while they are read.
+class SplitParser():
+    # First tokens of the top level stanzas parsed by workers.
+    PARALLEL = ('interface', 'name', 'object', 'object-group', 'nat')
+
+    def __init__(self, chunk_size, pool):
+        self.chunk_size = chunk_size
+        self.pool = pool                # multiprocessing.Pool()
+        self.errors = []
+        self.device = None
+        self.filename = None
+        self.lines_read = 0
+        self.extract = None             # showtech.Extract() of a capture
+
+        self.interface_chunks = {}      # maps custom names to defining chunk
+        self.interfaces = {}            # maps interface names to interfaces
+        self.object_chunks = {}         # maps object names to defining chunk
+        self.chunk_numbers = {}         # maps ids of objects and nats to chunk
+        self.vrfs = {}                  # maps vrf names to merged vrfs
+
+    def parse(self, filename):
+        self.filename = filename
+        self.device = device.Device()
+        with trace.tracer.span('split', file=filename):
+            chunks = self.split(filename)
+        parallel = [(filename, chunk.start, ''.join(chunk.lines), self.extract)
+                    for chunk in chunks if chunk.parallel]
+        results = self.pool.imap(parse_chunk, parallel)
+
+        reference_errors = []
+        for number, chunk in enumerate(chunks):
+            if not chunk.parallel:
+                continue
+            chunk_device, errors, chunk_reference_errors, events = next(
+                results)
+            trace.tracer.extend(events)
+            self.errors.extend(errors)
+            with trace.tracer.span('merge', file=filename, chunk=number):
+                self.merge(number, chunk_device)
+            reference_errors.append((number, chunk_reference_errors))
+            chunk.lines = []
+        with trace.tracer.span('link', file=filename):
+            self.relink(reference_errors)
+
+        for chunk in chunks:
+            if not chunk.parallel:
+                self.parse_serial(chunk)
+        self.device.link_references()
+        return self.device
+
+    # Returns the chunks of the given file in order. Of a show tech-support
+    # capture only the extract a CiscoParser would read is split.
+    def split(self, filename):
+        chunks = []
+        chunk = None
+        self.extract = showtech.extract(filename)
+        if self.extract != None:
+            file = io.StringIO(self.extract.take_text(), newline=None)
+        else:
+            file = open(filename, 'r')
+        with file:
+            for number, line in enumerate(file, 1):
+                if line[:1].isspace() or line.strip() == '':
+                    parallel = chunk.parallel if chunk != None else False
+                    new_stanza = False
+                else:
+                    parallel = line.split(None, 1)[0] in self.PARALLEL
+                    new_stanza = True
+                if (chunk == None or parallel != chunk.parallel
+                    or (new_stanza and parallel
+                        and chunk.size >= self.chunk_size)):
+                    chunk = Chunk(parallel, number)
+                    chunks.append(chunk)
+                chunk.lines.append(line)
+                chunk.size += len(line)
+                self.lines_read = number
+        return chunks
+
+    # Parses a chunk of serial stanzas into the merged device.
+    def parse_serial(self, chunk):
+        parser = ciscoparser.CiscoParser()
+        parser.device = self.device
+        parser.link = False
+        parser.file = io.StringIO(''.join(chunk.lines))
+        parser.filename = self.filename
+        parser.lines_read = chunk.start - 1
+        parser.extract = self.extract
+        parser.parse()
+        self.errors.extend(parser.errors)
+        chunk.lines = []
+
+    # Merges the device of a chunk into the merged device. Interfaces and
+    # objects opened again in a later chunk are merged into the first one.
+    def merge(self, number, chunk_device):
+        merged = self.device
+        if merged.hostname == None:
+            merged.hostname = chunk_device.hostname
+        for interface in chunk_device.interfaces:
+            if isinstance(interface.vrf, device.VRF):
+                interface.vrf = self.get_vrf(interface.vrf.name)
+            if isinstance(interface.vlan, device.VLAN):
+                interface.vlan = merged.get_or_add_vlan(interface.vlan.id)
+            existing = self.interfaces.get(interface.name)
+            if existing == None:
+                self.interfaces[interface.name] = interface
+                merged.add_interface(interface)
+                existing = interface
+            else:
+                merge_attrs(existing, interface)
+            for collection in (existing.vrf, existing.vlan):
+                if isinstance(collection, (device.VRF, device.VLAN)):
+                    collection.add_interface(existing)
+            if existing.custom_name != None:
+                self.interface_chunks.setdefault(existing.custom_name, number)
+        for object in chunk_device.objects:
+            existing = merged.get_object(object.name)
+            if existing == None or object.name == None:
+                merged.add_object(object)
+                self.object_chunks.setdefault(object.name, number)
+                self.chunk_numbers[id(object)] = number
+            else:
+                merge_attrs(existing, object)
+            if object.nat != None:
+                self.chunk_numbers[id(object.nat)] = number
+        for nat in chunk_device.nats:
+            merged.add_nat(nat)
+            self.chunk_numbers[id(nat)] = number
+
+    def get_vrf(self, name):
+        vrf = self.vrfs.get(name)
+        if vrf == None:
+            vrf = self.vrfs[name] = self.device.get_or_add_vrf(name)
+        return vrf
+
+    # Links the references of the nat rules and object groups of each chunk
+    # to interfaces and objects defined in earlier chunks, and drops the
+    # errors about those references.
+    def relink(self, reference_errors):
+        for object in self.device.objects:
+            if object.nat != None:
+                self.relink_nat(object.nat)
+            number = self.chunk_numbers[id(object)]
+            for index, item in enumerate(object.items):
+                object.items[index] = self.relink_item(item, number)
+        for nat in self.device.nats:
+            if nat != None:
+                self.relink_nat(nat)
+        for number, errors in reference_errors:
+            for name, error in errors:
+                if not self.is_defined(name, number):
+                    self.errors.append(error)
+
+    # Returns True if an interface or object of the given name is defined in
+    # a chunk before the given chunk.
+    def is_defined(self, name, number):
+        return (self.interface_chunks.get(name, number) < number
+                or self.object_chunks.get(name, number) < number)
+
+    def relink_nat(self, nat):
+        number = self.chunk_numbers[id(nat)]
+        placeholder = nat.outside_interface
+        for attr in ('inside_interface', 'outside_interface'):
+            setattr(nat, attr, self.relink_interface(getattr(nat, attr),
+                                                     number))
+
+        interface = nat.outside_interface
+        if (interface is not placeholder
+            and isinstance(nat.outside_src, device.Object)
+            and nat.outside_src.name == placeholder.custom_name
+            and nat.outside_src.addr == None):
+            nat.outside_src.name = interface.custom_name     # interface pat
+            nat.outside_src.addr = interface.primary_addr()
+
+        unresolved = natstream.get_unresolved(self.device, nat)
+        for name, placeholders in unresolved.items():
+            if self.object_chunks.get(name, number) >= number:
+                continue
+            object = self.device.get_object(name)
+            for attr in natstream.NAT_OBJECT_ATTRS:
+                value = getattr(nat, attr)
+                if any(value is placeholder for placeholder in placeholders):
+                    setattr(nat, attr, object)
+
+    # Returns the merged interface of an interface opened again in a later
+    # chunk, or of a placeholder a worker created for an interface defined in
+    # an earlier chunk. Other interfaces are returned as they are.
+    def relink_interface(self, interface, number):
+        if (not isinstance(interface, device.Interface)
+            or interface.custom_name == 'any'):
+            return interface
+        existing = self.interfaces.get(interface.name)
+        if existing != None:
+            return existing                     # same or reopened interface
+        name = interface.name                   # nameif of a placeholder
+        if self.interface_chunks.get(name, number) < number:
+            return self.device.get_interface_by_custom_name(name)
+        return interface
+
+    # Returns the given object group item linked to the object it names, if
+    # that object is defined in a chunk before the given chunk.
+    def relink_item(self, item, number):
+        name = None
+        if isinstance(item, str):
+            name = item
+        elif isinstance(item, device.Addr) and isinstance(item.addr, str):
+            name = item.addr
+        elif isinstance(item, device.Object) and item.name != None:
+            name = item.name
+        if name == None or iptools.is_addr(name):
+            return item
+        object = self.device.get_object(name)
+        if object == None or object is item:
+            return item
+        if self.object_chunks.get(name, number) >= number:
+            return item
+        if isinstance(item, device.Addr):
+            item.addr = object
+            return item
+        return object
+
+
+################################################################################
+
+
+# Parses a chunk in a worker process and returns the (device, errors,
+# reference errors, trace events) of the chunk.
+def parse_chunk(args):
+    filename, start, text, extract = args
+    parser = ChunkParser()
+    dev = parser.parse_chunk(filename, start, text, extract)
+    return (dev, parser.errors, parser.reference_errors, trace.tracer.take())
+
+# Copies the attributes set by a later stanza of an interface or object onto
+# the first definition, as a sequential parse updating it in place would.
+def merge_attrs(existing, other):
+    for name, value in vars(other).items():
+        if name == 'addrs':
+            for addr in value:
+                existing.add_addr(addr)
+        elif name == 'items':
+            existing.items.extend(value)
+        elif value not in (None, False):
+            setattr(existing, name, value)
+
+# Parses the given file with a SplitParser using the given pool. Returns the
+# (device, errors, lines read, bytes skipped).
+def parse_split(filename, chunk_size, pool):
+    parser = SplitParser(chunk_size, pool)
+    dev = parser.parse(filename)
+    skipped = parser.extract.skipped if parser.extract != None else 0
+    return (dev, parser.errors, parser.lines_read, skipped)
+
+
+################################################################################
@@ -3,13 +3,18 @@
 ################################################################################
 
 
+import io
 import re
 
 
+from cisxp import accesslistsubparser
 from cisxp import ciscoparserbase
 from cisxp import device
 from cisxp import iptools
+from cisxp import showtech
+from cisxp import trace
 from cisxp.objectsubparser import *
+from cisxp.routesubparser import *
 
 
 ################################################################################
@@ -19,6 +24,40 @@ class CiscoParser(ciscoparserbase.CiscoParserBase):
     def __init__(self):
         super().__init__()
         self.device = device.Device()
+        self.link = True        # index object references once parsed
+        self.extract = None     # showtech.Extract() of a show tech capture
+
+    # Opens the given file for reading. Of a show tech-support capture only
+    # the running config and show route output are read.
+    def open(self, filename):
+        self.extract = showtech.extract(filename)
+        if self.extract == None:
+            super().open(filename)
+            return
+        self.file = io.StringIO(self.extract.take_text(), newline=None)
+        self.filename = filename
+
+    # Returns the bytes of the file that were not read.
+    def bytes_skipped(self):
+        return self.extract.skipped if self.extract != None else 0
+
+    # Appends an error message, with the line number of the capture when
+    # reading an extract of a show tech-support capture.
+    def error(self, msg):
+        if self.extract == None:
+            super().error(msg)
+            return
+        line_number = self.line_number
+        self.line_number = self.extract.file_line(line_number)
+        super().error(msg)
+        self.line_number = line_number
+
+    def print_line(self):
+        if self.extract == None:
+            super().print_line()
+            return
+        print(f'{self.filename}:{self.extract.file_line(self.line_number)}: '
+              f'{self.line}')
 
     def parse(self, filename=None):
         if filename != None:
@@ -31,10 +70,23 @@ class CiscoParser(ciscoparserbase.CiscoParserBase):
             (('object',),       self.parse_object),
             (('object-group',), self.parse_object),
             (('nat',),          self.parse_nat),
+            (('access-list',),  self.parse_access_list),
+            (('route',),        self.parse_route),
+            (('ip', 'route'),   self.parse_route),
+            (('ip', 'vrf'),     self.parse_vrf),
+            (('vrf', 'context'), self.parse_vrf),
+            (('vrf', 'definition'), self.parse_vrf),
+            (('vlan',),         self.parse_vlan),
+            (('show', 'route'), self.parse_show_route),
+            (('show', 'ip', 'route'), self.parse_show_route),
+            (('------------------', 'show', 'route'), self.parse_show_route),
             (('hostname',),     self.set_hostname),
         ]
 
-        self.parse_map(token_map)
+        with trace.tracer.span('parse', file=self.filename):
+            self.parse_map(token_map)
+        if self.link:
+            self.device.link_references()
         return self.device
 
     def parse_interface(self):
@@ -58,6 +110,40 @@ class CiscoParser(ciscoparserbase.CiscoParserBase):
         nat = parser.parse()
         self.device.add_nat(nat)
 
+    def parse_access_list(self):
+        if self.indent != 0:
+            return
+        parser = accesslistsubparser.AccessListSubparser(self)
+        parser.parse()
+
+    def parse_route(self):
+        if self.indent != 0:
+            return
+        parser = RouteSubparser(self)
+        parser.parse()
+
+    # Parses a vrf stanza such as 'vrf context NAME'. A line without a name is
+    # skipped.
+    def parse_vrf(self):
+        if self.indent != 0 or len(self.tokens) < 3:
+            return
+        parser = VRFSubparser(self)
+        parser.parse()
+
+    # Parses a vlan stanza such as 'vlan 10' followed by ' name USERS'. Vlan
+    # ranges such as 'vlan 10-20' and lines without an id are skipped.
+    def parse_vlan(self):
+        if (self.indent != 0 or len(self.tokens) < 2
+            or not self.tokens[1].isdigit()):
+            return
+        vlan = self.device.get_or_add_vlan(int(self.token_at(1)))
+        parser = VLANSubparser(self, vlan)
+        parser.parse()
+
+    def parse_show_route(self):
+        parser = ShowRouteSubparser(self)
+        parser.parse()
+
     def set_hostname(self):
         self.device.hostname = self.token_at(1)
 
@@ -67,7 +153,7 @@ class CiscoParser(ciscoparserbase.CiscoParserBase):
         interface = self.device.get_interface(self.token_at(1))
         interface_exists = interface != None
         if not interface_exists:
-            interface = device.Interface()
+            interface = device.Interface(self.token_at(1))
             self.device.add_interface(interface)
         return interface
 
@@ -77,7 +163,7 @@ class CiscoParser(ciscoparserbase.CiscoParserBase):
         object = self.device.get_object(self.get_object_name())
         object_exists = object != None
         if not object_exists:
-            object = device.Object()
+            object = device.Object(self.get_object_name())
             self.device.add_object(object)
         return object
 
@@ -113,6 +199,8 @@ class InterfaceSubparser():
             (('hsrp', 'version'),       lambda: None),    # bypass hsrp version
             (('hsrp',),                 self.set_hsrp),
             (('vrf', 'member'),         self.set_vrf),
+            (('vrf', 'forwarding'),     self.set_vrf),
+            (('ip', 'vrf', 'forwarding'), self.set_vrf),
             (('vlan',),                 self.set_vlan),
         ]
 
@@ -167,15 +255,49 @@ class InterfaceSubparser():
         else:
             self.parser.putback()
 
-    # Sets interface vrf.
+    # Sets interface vrf to the device vrf with the name given last on the
+    # line and adds the interface to the vrf.
     def set_vrf(self):
-        self.interface.vrf = self.parser.join_tokens(2)
-
-    # Sets interface vlan.
+        keywords = 3 if self.parser.tokens[0] == 'ip' else 2
+        if len(self.parser.tokens) <= keywords:
+            return                          # no vrf name
+        vrf_name = self.parser.tokens[-1]
+        self.interface.vrf = self.parser.device.get_or_add_vrf(vrf_name)
+        self.interface.vrf.add_interface(self.interface)
+
+    # Sets interface vlan to the device vlan with the given id and adds the
+    # interface to the vlan.
     def set_vlan(self):
-        vlan_id = int(self.parser.token_at(1))
-        vlan = device.VLAN(vlan_id)
-        self.interface.vlan = vlan
+        tokens = self.parser.tokens
+        if len(tokens) < 2 or not tokens[1].isdigit():
+            return                          # no vlan id
+        vlan_id = int(tokens[1])
+        self.interface.vlan = self.parser.device.get_or_add_vlan(vlan_id)
+        self.interface.vlan.add_interface(self.interface)
+
+
+################################################################################
+
+
+class VLANSubparser():
+    def __init__(self, parser, vlan):
+        self.parser = parser
+        self.vlan = vlan
+
+    def parse(self):
+        self.parser.next()
+
+        # stop parsing when text offset is 0
+        stop = lambda: self.parser.indent == 0
+        token_map = [
+            (('name',), self.set_name),
+        ]
+
+        self.parser.parse_map(token_map, stop, True)
+        return self.vlan
+
+    def set_name(self):
+        self.vlan.name = self.parser.join_tokens(1)
 
 
 ################################################################################
@@ -0,0 +1,76 @@
+################################################################################
+# client.py
+################################################################################
+
+
+import getopt
+import json
+import os
+import socket
+
+
+################################################################################
+
+
+# Thin client of the cisx server. Only standard library modules are imported
+# so a query does not pay for loading the parser.
+class CISXClient():
+    def __init__(self, path):
+        self.path = path        # server socket path
+
+    # Sends a single request to the server and returns its result. Raises
+    # RuntimeError if the server reports an error.
+    def request(self, command, arg=None):
+        if command == 'parse' or (command == 'load' and arg != None):
+            arg = os.path.abspath(arg)   # server may run in another directory
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.path)
+            message = json.dumps({'command': command, 'arg': arg})
+            client.sendall(message.encode('utf-8') + b'\n')
+            line = client.makefile('rb').readline()
+        if line == b'':
+            raise RuntimeError('Server closed the connection without a reply.')
+        response = json.loads(line)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+
+################################################################################
+
+
+# Returns the (socket path, request) of command line arguments holding only
+# --client and --request options, or None for any other arguments, which
+# need the full cisx command.
+def get_client_args(args):
+    try:
+        optlist, rest = getopt.getopt(args, '', ['client=', 'request='])
+    except getopt.GetoptError:
+        return None
+    opts = dict(optlist)
+    if len(rest) > 0 or '--client' not in opts:
+        return None
+    return (opts['--client'], opts.get('--request', 'stats'))
+
+# Sends a request such as 'nat fw1' to the server listening on the given
+# socket path and prints its result. Returns the exit status.
+def send_request(path, request):
+    fields = request.split(None, 1)
+    if len(fields) == 0:
+        print('Empty request.')
+        return 1
+    command = fields[0]
+    arg = fields[1] if len(fields) > 1 else None
+    try:
+        result = CISXClient(path).request(command, arg)
+    except (OSError, RuntimeError) as e:
+        print(e)
+        return 1
+    if isinstance(result, str):
+        print(result, end='')
+    elif result != None:
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+################################################################################
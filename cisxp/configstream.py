@@ -0,0 +1,121 @@
+################################################################################
+# configstream.py
+################################################################################
+
+
+################################################################################
+
+
+# Splits a stream of concatenated device configurations, such as a collector
+# piping the configurations of many devices to stdin, into one section per
+# device. A hostname line naming a different host than the current section,
+# or a ': Saved' or 'ASA Version' line once the current section holds any
+# configuration, starts a new section, as NATStreamParser does within a file.
+#
+# The stream is the file a parser reads each section from: readline returns
+# the lines of the current section and '' once the next one starts, so each
+# device is parsed as its lines arrive. Only the line starting the next
+# section is held back, so no more than one line is ever buffered.
+#
+# Given a select function, a section whose hostname is not selected ends for
+# its parser at the hostname line and is marked skipped; its remaining lines
+# are read past without being parsed.
+#
+#   stream = ConfigStream(sys.stdin)
+#   for section in stream.sections():
+#       parser.file = section
+#       parser.filename = section.name
+#       device = parser.parse()
+class ConfigStream():
+    def __init__(self, file, name='<stdin>', select=None):
+        self.file = file
+        self.stream_name = name
+        self.select = select        # select(hostname) is False to skip
+        self.line = None            # first line of the next section
+        self.eof = False            # end of the stream found
+        self.ended = True           # end of the current section found
+        self.index = 0              # number of the current section
+        self.hostname = None        # hostname of the current section
+        self.has_config = False     # current section holds configuration
+        self.size = 0               # characters read in the current section
+        self.skipped = False        # current section is of an unselected host
+
+    # Yields the stream once per section, each time positioned at the start
+    # of the next section. Lines of a section left unread are skipped.
+    def sections(self):
+        while True:
+            while not self.ended:
+                self.read_line()
+            if self.line == None:
+                self.line = self.file.readline()
+            if self.line == '':
+                self.eof = True
+                return
+            self.index += 1
+            self.ended = False
+            self.hostname = None
+            self.has_config = False
+            self.size = 0
+            self.skipped = False
+            yield self
+
+    # Returns the name of the current section, as used in error messages.
+    @property
+    def name(self):
+        return f'{self.stream_name}[{self.index}]'
+
+    # Returns the next line of the current section or '' at its end, or from
+    # the hostname line on if the section is skipped.
+    def readline(self):
+        if self.skipped:
+            return ''
+        line = self.read_line()
+        return line if not self.skipped else ''
+
+    # Returns the next line of the current section or '' at its end.
+    def read_line(self):
+        if self.ended:
+            return ''
+        if self.line != None:
+            line, self.line = self.line, None
+        else:
+            line = self.file.readline()
+        if line == '' or self.is_boundary(line):
+            self.line = line
+            self.ended = True
+            return ''
+        self.update(line)
+        self.size += len(line)
+        return line
+
+    # Returns True if the given line starts a new device.
+    def is_boundary(self, line):
+        tokens = line.split()
+        if (len(tokens) > 1 and tokens[0] == 'hostname'
+            and not line[0].isspace()):
+            return self.hostname not in (None, tokens[1])
+        if tokens[:2] == [':', 'Saved'] or tokens[:2] == ['ASA', 'Version']:
+            return self.has_config
+        return False
+
+    # Records the hostname of the current section and whether it holds any
+    # configuration. Comments, banners and the version line do not count.
+    def update(self, line):
+        tokens = line.split()
+        if len(tokens) == 0 or tokens[0] in (':', '!'):
+            return
+        if tokens[:2] == ['ASA', 'Version']:
+            return
+        if tokens[0] == 'hostname' and len(tokens) > 1:
+            self.hostname = tokens[1]
+            if self.select != None and not self.select(self.hostname):
+                self.skipped = True
+        self.has_config = True
+
+    # The stream is left open for the caller, parsers close their file when
+    # done with it.
+    def close(self):
+        pass
+
+
+################################################################################
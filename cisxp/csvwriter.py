@@ -39,13 +39,33 @@ class CSVWriter():
 
     # Writes a single row to file.
     def write_row(self, row):
+        self.file.write(self.format_row(row))
+
+    # Returns a single row as a line of text. Values holding a comma, quote
+    # or line break are quoted, as the csv module does, so free text such as
+    # descriptions keeps to its column.
+    def format_row(self, row):
         vals = []
         for col in self.cols:
             val = row.get(col, '')
             if val == None:
                 val = ''
-            vals.append(val)
-        print(*vals, sep=',', file=self.file)
+            vals.append(quote(str(val)))
+        return ','.join(vals) + '\n'
+
+
+################################################################################
+
+
+# Characters that require a value to be quoted.
+SPECIAL_CHARS = frozenset(',"\r\n')
+
+# Returns the given value quoted if it holds a comma, quote or line break,
+# with quotes doubled, else the value itself.
+def quote(val):
+    if SPECIAL_CHARS.isdisjoint(val):
+        return val
+    return '"' + val.replace('"', '""') + '"'
 
 
 ################################################################################
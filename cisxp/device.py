@@ -3,6 +3,15 @@
 ################################################################################
 
 
+from array import array
+
+
+from cisxp import iptools
+
+
+################################################################################
+
+
 class Device():
     def __init__(self):
         self.hostname = None
@@ -10,7 +19,10 @@ class Device():
         self.vlans = []
         self.vrfs = []
         self.objects = []
+        self.object_names = {}   # maps object names to objects
+        self.access_lists = []
         self.nats = []
+        self.references = {}     # maps objects to Reference lists
 
     # Adds an interface object to this device.
     def add_interface(self, interface):
@@ -34,37 +46,185 @@ class Device():
                 return interface
         return None
 
-    # Adds an Object object to this device.
+    # Adds an Object object to this device. The object should be named before
+    # it is added so it can be found with get_object.
     def add_object(self, object):
         self.objects.append(object)
+        if object.name != None:
+            self.object_names.setdefault(object.name, object)
 
     # Returns an existing Object object with the given name or None if it is
     # not found.
     def get_object(self, name):
         if name == None: return None
-        for object in self.objects:
-            if object.name == name:
-                return object
+        return self.object_names.get(name)
+
+    # Adds an AccessList object to this device.
+    def add_access_list(self, access_list):
+        self.access_lists.append(access_list)
+
+    # Returns an existing AccessList object with the given name or None if it
+    # is not found.
+    def get_access_list(self, name):
+        if name == None: return None
+        for access_list in self.access_lists:
+            if access_list.name == name:
+                return access_list
         return None
 
     # Adds a VLAN object to this device.
     def add_vlan(self, vlan):
-        pass
+        self.vlans.append(vlan)
+
+    # Returns an existing VLAN object with the given id or None if it is not
+    # found.
+    def get_vlan(self, id):
+        if id == None: return None
+        for vlan in self.vlans:
+            if vlan.id == id:
+                return vlan
+        return None
+
+    # Returns an existing VLAN object with the given id or creates a new one
+    # if one does not already exist.
+    def get_or_add_vlan(self, id):
+        vlan = self.get_vlan(id)
+        if vlan == None:
+            vlan = VLAN(id)
+            self.add_vlan(vlan)
+        return vlan
 
     # Adds a VRF object to this device.
     def add_vrf(self, vrf):
-        pass
+        self.vrfs.append(vrf)
+
+    # Returns an existing VRF object with the given name or None if it is not
+    # found.
+    def get_vrf(self, name):
+        if name == None: return None
+        for vrf in self.vrfs:
+            if vrf.name == name:
+                return vrf
+        return None
+
+    # Returns an existing VRF object with the given name or creates a new one
+    # if one does not already exist.
+    def get_or_add_vrf(self, name):
+        vrf = self.get_vrf(name)
+        if vrf == None:
+            vrf = VRF(name)
+            self.add_vrf(vrf)
+        return vrf
 
     # Adds a NAT object to this device.
     def add_nat(self, nat):
         self.nats.append(nat)
 
+    # Adds a Reference to the given Object object.
+    def add_reference(self, object, reference):
+        self.references.setdefault(object, []).append(reference)
+
+    # Returns the References to the given Object object, the nat rules,
+    # objects, object groups, access lists and routes where it is used.
+    def get_references(self, object):
+        return self.references.get(object, [])
+
+    # Indexes the references of the nat rules, objects, object groups and
+    # routes to the objects they use, once every reference is linked. A
+    # network object or route next hop given as the name of a name object
+    # references it. References of access lists are added while they are
+    # parsed and kept.
+    def link_references(self):
+        for object, references in list(self.references.items()):
+            references = [reference for reference in references
+                          if reference.kind == Reference.ACCESS_LIST]
+            if len(references) == 0:
+                del self.references[object]
+            else:
+                self.references[object] = references
+
+        for object in self.objects:
+            for item in object.items:
+                if isinstance(item, tuple):
+                    item = item[0]          # ( Object(), cidr )
+                elif isinstance(item, Addr):
+                    item = item.addr        # name object of an address
+                if isinstance(item, Object):
+                    self.add_reference(item, Reference(
+                        Reference.GROUP, object, object.name, 'member'))
+            addrs = object.addr if isinstance(object.addr, list) else [
+                object.addr]
+            for addr in addrs:
+                item = self.get_addr_object(addr)
+                if item != None and item is not object:
+                    self.add_reference(item, Reference(
+                        Reference.OBJECT, object, object.name, 'addr'))
+            if object.nat != None:
+                self.add_nat_references(object.nat, object.name)
+        line = 0
+        for nat in self.nats:
+            if nat != None:
+                line += 1
+                self.add_nat_references(nat, f'manual {line}')
+        for vrf in self.vrfs:
+            for route in vrf.routes:
+                item = self.get_object(route.next_hop)
+                if item != None:
+                    self.add_reference(item, Reference(
+                        Reference.ROUTE, route, f'{vrf.name} {route.addr}',
+                        'next hop'))
+
+    # Returns the Object object the given Addr is given as, or None if it is
+    # an address.
+    def get_addr_object(self, addr):
+        if not isinstance(addr, Addr):
+            return None
+        if isinstance(addr.addr, Object):
+            return addr.addr
+        return self.get_object(addr.addr)
+
+    def add_nat_references(self, nat, name):
+        for attr, role in Reference.NAT_ROLES:
+            object = getattr(nat, attr)
+            if isinstance(object, Object):
+                self.add_reference(object, Reference(Reference.NAT, nat,
+                                                     name, role))
+
+################################################################################
+
+
+# A use of an object by a nat rule, an object, an object group, an access
+# list or a route.
+class Reference():
+    NAT = 'nat'
+    OBJECT = 'object'
+    GROUP = 'group'
+    ACCESS_LIST = 'access-list'
+    ROUTE = 'route'
+
+    # Maps NAT attributes to the role of the object they hold.
+    NAT_ROLES = (
+        ('inside_src',      'inside src'),
+        ('outside_src',     'mapped src'),
+        ('inside_dest',     'inside dest'),
+        ('outside_dest',    'mapped dest'),
+        ('inside_service',  'inside service'),
+        ('outside_service', 'mapped service'),
+    )
+
+    def __init__(self, kind, referrer, name, role):
+        self.kind = kind            # NAT, OBJECT, GROUP, ACCESS_LIST or ROUTE
+        self.referrer = referrer    # NAT(), Object(), AccessList() or Route()
+        self.name = name            # name of the referrer in reports
+        self.role = role            # such as 'mapped src' or 'member'
+
+
 ################################################################################
 
 
 class Interface():
     def __init__(self, name=None):
-        self.name = None         # static name such as GigabitEthernet0/1
+        self.name = name         # static name such as GigabitEthernet0/1
         self.custom_name = None  # custom name defined with nameif
         self.description = None
         self.addrs = []
@@ -96,7 +256,7 @@ class Addr():
     def __init__(self, addr, cidr=32, type=4, standby=None, secondary=False):
         self.addr = addr            # str or Object
         self.cidr = cidr
-        self.type = 4               # ipv4 or ipv6
+        self.type = type            # ipv4 or ipv6
         self.standby = standby      # standby address Addr()
         self.secondary = secondary
 
@@ -116,6 +276,18 @@ class Addr():
         else:
             return f'{self.addr}/{self.cidr}'
 
+    # Returns the (start, end) integer range of this ipv4 addr or None if the
+    # addr is ipv6 or an unresolved name. If addr is a name Object the cidr is
+    # applied to the address of the object.
+    def range(self):
+        addr = self.addr
+        if isinstance(addr, Object):
+            addr = addr.addr.addr if isinstance(addr.addr, Addr) else None
+        if self.type != 4 or not iptools.is_addr(addr):
+            return None
+        cidr = self.cidr if self.cidr != None else 32
+        return iptools.cidr_to_range(addr, int(cidr))
+
 
 ################################################################################
 
@@ -124,6 +296,11 @@ class VLAN():
     def __init__(self, id=None, name=None):
         self.id = id
         self.name = name
+        self.interfaces = []        # interfaces in this vlan
+
+    def add_interface(self, interface):
+        if not any(member is interface for member in self.interfaces):
+            self.interfaces.append(interface)
 
     def __str__(self):
         return f'vlan {self.id} {self.name}'
@@ -133,30 +310,90 @@ class VLAN():
 
 
 class VRF():
+    # Name of the vrf holding the global routing table.
+    DEFAULT = 'default'
+
     def __init__(self, name=None):
         self.name = name
         self.routes = []
+        self.interfaces = []        # interfaces forwarding in this vrf
 
     def add_route(self, route):
         self.routes.append(route)
 
+    def add_interface(self, interface):
+        if not any(member is interface for member in self.interfaces):
+            self.interfaces.append(interface)
+
 
 ################################################################################
 
 
 class Route():
     def __init__(self):
-        self.source = None
-        self.addr = None
-        self.next_hop = None
+        self.source = None           # route code such as 'S', 'C' or 'O'
+        self.addr = None             # destination Addr()
+        self.next_hop = None         # next hop address str
         self.time_stamp = None
         self.interface_name = None
+        self.distance = None         # administrative distance
         self.metric = None
 
 
 ################################################################################
 
 
+class AccessList():
+    # Protocol value of entries that match any ip protocol.
+    ANY_PROTOCOL = 256
+
+    def __init__(self, name=None):
+        self.name = name
+        self.lines = []           # configuration line of each rule
+
+        # Rule table. Each rule expands to one entry for every combination of
+        # its source, destination and service ranges. Entries are stored in
+        # parallel arrays indexed by entry number, in configuration order.
+        self.rule = array('I')        # index of entry rule in lines
+        self.permit = array('B')      # 1 if permit, 0 if deny
+        self.protocol = array('H')    # ip protocol number or ANY_PROTOCOL
+        self.src_start = array('I')
+        self.src_end = array('I')
+        self.dest_start = array('I')
+        self.dest_end = array('I')
+        self.src_port_start = array('H')
+        self.src_port_end = array('H')
+        self.dest_port_start = array('H')
+        self.dest_port_end = array('H')
+
+    def __len__(self):
+        return len(self.rule)
+
+    # Adds a rule line and returns its rule index.
+    def add_rule(self, line):
+        self.lines.append(line)
+        return len(self.lines) - 1
+
+    # Adds an entry to the rule table. src and dest are (start, end) address
+    # ranges and src_port and dest_port are (start, end) port ranges.
+    def add_entry(self, rule, permit, protocol, src, dest, src_port,
+                  dest_port):
+        self.rule.append(rule)
+        self.permit.append(1 if permit else 0)
+        self.protocol.append(protocol)
+        self.src_start.append(src[0])
+        self.src_end.append(src[1])
+        self.dest_start.append(dest[0])
+        self.dest_end.append(dest[1])
+        self.src_port_start.append(src_port[0])
+        self.src_port_end.append(src_port[1])
+        self.dest_port_start.append(dest_port[0])
+        self.dest_port_end.append(dest_port[1])
+
+
+################################################################################
+
+
 class NAT():
     def __init__(self):
         # inside_interface and outside_interface are Interface objects or
@@ -221,6 +458,7 @@ class ObjectType():
     SERVICE = 'service'
     NETWORK_GROUP = 'network group'
     SERVICE_GROUP = 'service group'
+    PROTOCOL_GROUP = 'protocol group'
 
 
 ################################################################################
@@ -247,6 +485,43 @@ class Object():
     def add_item(self, item):
         self.items.append(item)
 
+    # Returns a list of (start, end) integer address ranges covered by this
+    # network object or network object group. Unresolved names and ipv6
+    # addresses are skipped.
+    def ranges(self):
+        return get_ranges(self, set())
+
+
+# Returns a list of (start, end) integer address ranges covered by the given
+# Addr, [Addr, Addr] range, Object or 'any' string. seen holds the ids of the
+# groups already visited so nested groups are only expanded once.
+def get_ranges(item, seen):
+    if isinstance(item, Addr):
+        range = item.range()
+        return [range] if range != None else []
+    elif isinstance(item, list):
+        start, end = item[0].range(), item[1].range()
+        if start == None or end == None:
+            return []
+        return [(start[0], end[1])]
+    elif isinstance(item, Object):
+        if id(item) in seen:
+            return []
+        seen.add(id(item))
+        if item.type == ObjectType.NETWORK_GROUP:
+            ranges = []
+            for group_item in item.items:
+                ranges.extend(get_ranges(group_item, seen))
+            return ranges
+        elif item.addr != None:
+            return get_ranges(item.addr, seen)
+        elif item.name == 'any':
+            return [(0, 0xffffffff)]
+        return []
+    elif item in ('any', 'any4'):
+        return [(0, 0xffffffff)]
+    return []
+
 
 ################################################################################
 
@@ -0,0 +1,187 @@
+################################################################################
+# externalsort.py
+################################################################################
+
+
+import heapq
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+
+from cisxp import iptools
+
+
+################################################################################
+
+
+# Sorts (key, value) records that may not fit in memory. Records are buffered
+# until their estimated size reaches the memory limit, then sorted and spilled
+# to a run file in a temporary directory. sorted() merges the runs with a
+# k-way heap merge, first merging groups of MERGE_FANOUT runs when there are
+# more runs than that so only a bounded number of files is open at once.
+#
+# Each record is stored with its insertion sequence number, so records with
+# equal keys keep the order they were added in and values are never compared.
+class ExternalSorter():
+    MERGE_FANOUT = 64
+    RECORD_OVERHEAD = 128       # estimated bytes of a buffered record
+
+    def __init__(self, memory_limit, temp_dir=None):
+        self.memory_limit = memory_limit
+        self.temp_dir = temp_dir
+        self.directory = None   # TemporaryDirectory() holding the runs
+        self.buffer = []
+        self.buffer_size = 0
+        self.runs = []          # filenames of the sorted runs
+        self.run_count = 0      # run files written, including merged runs
+        self.seq = 0
+
+    def add(self, key, value):
+        self.buffer.append((key, self.seq, value))
+        self.seq += 1
+        self.buffer_size += (sys.getsizeof(value) + sys.getsizeof(key)
+                             + self.RECORD_OVERHEAD)
+        if self.buffer_size >= self.memory_limit:
+            self.spill()
+
+    # Writes the buffered records as a sorted run.
+    def spill(self):
+        if len(self.buffer) == 0:
+            return
+        self.buffer.sort()
+        self.runs.append(self.write_run(self.buffer))
+        self.buffer = []
+        self.buffer_size = 0
+
+    def write_run(self, records):
+        if self.directory == None:
+            self.directory = tempfile.TemporaryDirectory(prefix='cisx-sort-',
+                                                         dir=self.temp_dir)
+        filename = os.path.join(self.directory.name,
+                                f'run{self.run_count:06d}')
+        self.run_count += 1
+        with open(filename, 'wb') as file:
+            pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+            for record in records:
+                pickler.dump(record)
+                pickler.clear_memo()
+        return filename
+
+    # Yields the records of a run file.
+    def read_run(self, filename):
+        with open(filename, 'rb') as file:
+            unpickler = pickle.Unpickler(file)
+            while True:
+                try:
+                    yield unpickler.load()
+                except EOFError:
+                    return
+
+    # Yields the values of all records in key order. Records that never
+    # exceeded the memory limit are sorted in memory without touching disk.
+    def sorted(self):
+        if len(self.runs) == 0:
+            self.buffer.sort()
+            for _key, _seq, value in self.buffer:
+                yield value
+            self.buffer = []
+            return
+        self.spill()
+        runs = self.runs
+        while len(runs) > self.MERGE_FANOUT:
+            merged = []
+            for i in range(0, len(runs), self.MERGE_FANOUT):
+                group = runs[i:i + self.MERGE_FANOUT]
+                merged.append(self.write_run(heapq.merge(
+                    *[self.read_run(run) for run in group])))
+                for run in group:
+                    os.remove(run)
+            runs = merged
+        for _key, _seq, value in heapq.merge(
+                *[self.read_run(run) for run in runs]):
+            yield value
+        self.close()
+
+    # Removes the run files.
+    def close(self):
+        if self.directory != None:
+            self.directory.cleanup()
+            self.directory = None
+        self.runs = []
+
+
+################################################################################
+
+
+# Writes the rows of a CSVWriter report sorted by the given columns. Rows are
+# formatted as they are added and only the formatted line and its sort key
+# are kept, in an ExternalSorter bounded by memory_limit bytes.
+class SortedOutput():
+    def __init__(self, file, writer, cols, memory_limit, temp_dir=None):
+        self.file = file
+        self.writer = writer
+        self.cols = [get_col(writer, col) for col in cols]
+        self.sorter = ExternalSorter(memory_limit, temp_dir)
+
+    def write(self, device):
+        writer = self.writer
+        writer.device = device
+        writer.rows = []
+        writer.populate_rows()
+        self.add_rows(writer.rows)
+        writer.rows = []
+
+    # Adds the given rows, dicts mapping the writer columns to values.
+    def add_rows(self, rows):
+        for row in rows:
+            self.sorter.add(self.get_key(row), self.writer.format_row(row))
+
+    # Returns the sort key of a row. Address columns sort by the numeric
+    # value of their first address; other columns sort as text. Empty values
+    # sort first.
+    def get_key(self, row):
+        key = []
+        for col in self.cols:
+            value = row.get(col)
+            if value == None or value == '':
+                key.append((0, 0, ''))
+            elif 'addr' in col:
+                key.append(get_addr_key(str(value)))
+            else:
+                key.append((1, 0, str(value)))
+        return tuple(key)
+
+    def close(self):
+        self.writer.write_headers()
+        for line in self.sorter.sorted():
+            self.file.write(line)
+
+
+################################################################################
+
+
+addr_re = re.compile(r'\d+\.\d+\.\d+\.\d+')
+
+# Returns the sort key of an address column value. Values starting with an
+# ipv4 address sort by that address, other values such as names and ipv6
+# addresses sort as text after them.
+def get_addr_key(value):
+    match = addr_re.match(value)
+    if match != None and iptools.is_addr(match.group()):
+        return (1, iptools.addr_to_int(match.group()), value)
+    return (2, 0, value)
+
+# Returns the column identifier of the given column identifier or display
+# name of a writer, ignoring case.
+def get_col(writer, name):
+    name = name.strip().lower()
+    for col in writer.cols:
+        if name == col or name == writer.col_names[col].lower():
+            return col
+    raise ValueError(f'Unknown column "{name}".')
+
+
+################################################################################
@@ -0,0 +1,114 @@
+################################################################################
+# groupwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import csvwriter
+from cisxp import device
+from cisxp import iptools
+from cisxp import natwriter
+from cisxp import objectwriter
+
+
+################################################################################
+
+
+# Writes the members of the object groups of each device, one row per member.
+class GroupWriter(csvwriter.CSVWriter):
+    # Object types written by this writer.
+    TYPES = (
+        device.ObjectType.NETWORK_GROUP,
+        device.ObjectType.SERVICE_GROUP,
+        device.ObjectType.PROTOCOL_GROUP,
+    )
+
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'group',
+            'type',
+            'description',
+            'member',
+            'member addr',
+            'protocol',
+            'src port',
+            'dest port',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'    : 'Hostname',
+            'group'       : 'Group',
+            'type'        : 'Type',
+            'description' : 'Description',
+            'member'      : 'Member',
+            'member addr' : 'Member Addr',
+            'protocol'    : 'Protocol',
+            'src port'    : 'Src Port',
+            'dest port'   : 'Dest Port',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        for object in self.device.objects:
+            if object.type in self.TYPES:
+                for item in object.items:
+                    self.add_member_row(object, item)
+
+    # Adds a row for the given member of a group. Named objects, nested
+    # groups and undefined object names are written by name, addresses and
+    # inline services by value.
+    def add_member_row(self, group, item):
+        self.row = {
+            'hostname'    : self.device.hostname,
+            'group'       : group.name,
+            'type'        : group.type,
+            'description' : group.description,
+        }
+        if isinstance(item, tuple):
+            item = item[0]                      # ( Object(), cidr )
+        if isinstance(item, device.Object):
+            self.row.update({
+                'member'      : item.name,
+                'member addr' : natwriter.get_object_addr(item),
+                'protocol'    : item.protocol,
+                'src port'    : objectwriter.get_port_condition(
+                    item.src_op, item.src_port),
+                'dest port'   : objectwriter.get_port_condition(
+                    item.dest_op, item.dest_port),
+            })
+        elif get_unresolved_name(item) != None:
+            self.row['member'] = get_unresolved_name(item)
+        else:
+            self.row['member addr'] = natwriter.get_addr(item)
+        self.rows.append(self.row)
+
+
+################################################################################
+
+
+# Returns the name of the given group member if it names an object that is
+# not defined, or None. Such names are kept in place of the object, or of the
+# address of a host or subnet member.
+def get_unresolved_name(item):
+    if isinstance(item, device.Addr) and item.type == 4:
+        item = item.addr
+    if not isinstance(item, str) or item in ('any', 'any4', 'any6'):
+        return None
+    if iptools.is_addr(item) or ':' in item:     # ipv4 or ipv6 address
+        return None
+    return item
+
+
+################################################################################
@@ -0,0 +1,92 @@
+################################################################################
+# hostfilter.py
+################################################################################
+
+
+import fnmatch
+import mmap
+import os
+import re
+
+
+from cisxp import showtech
+
+
+################################################################################
+
+
+# Selects devices by hostname. A pattern is a glob such as 'fw-*', matched
+# ignoring case, or a regular expression between slashes such as
+# '/^(fw|asa)-\d+$/', searched in the hostname. A hostname is selected if any
+# pattern matches it.
+#
+# match_file reads a configuration file only as far as its hostname line, so
+# files of other devices are skipped without being parsed. ConfigStream stops
+# a section of stdin at the hostname line of an unselected device.
+class HostFilter():
+    def __init__(self, patterns=()):
+        self.patterns = []          # match functions of the patterns
+        for pattern in patterns:
+            self.add_pattern(pattern)
+
+    def add_pattern(self, pattern):
+        if len(pattern) > 1 and pattern[0] == '/' and pattern[-1] == '/':
+            self.patterns.append(re.compile(pattern[1:-1]).search)
+        else:
+            self.patterns.append(re.compile(fnmatch.translate(pattern),
+                                            re.IGNORECASE).match)
+
+    # Returns True if the given hostname matches a pattern. A device without
+    # a hostname matches none.
+    def match(self, hostname):
+        if hostname == None:
+            return False
+        return any(match(hostname) != None for match in self.patterns)
+
+    # Returns True if the hostname of the given configuration file matches a
+    # pattern, or if no hostname is found near its start, in which case the
+    # device is checked once parsed.
+    def match_file(self, filename):
+        hostname = read_hostname(filename)
+        return hostname == None or self.match(hostname)
+
+
+################################################################################
+
+
+# Bytes searched for the hostname line, from the start of a configuration
+# or from the running config of a show tech-support capture.
+PROBE_BYTES = 16 * 1024
+
+# Returns the hostname of the given configuration file, or None if no top
+# level hostname line is found within its first PROBE_BYTES. The file is
+# searched with mmap, so only those pages are read. In a show tech-support
+# capture the search starts at the running config.
+def read_hostname(filename):
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            if showtech.is_capture(data):
+                start = showtech.find_running_config(data)
+                if start == -1:
+                    return None
+            position = find_hostname(data, start, start + PROBE_BYTES)
+            if position == -1:
+                return None
+            end = data.find(b'\n', position)
+            line = data[position:end if end != -1 else len(data)]
+    tokens = line.decode('utf-8', 'replace').split()
+    return tokens[1] if len(tokens) > 1 else None
+
+# Returns the position of the first top level hostname line between the
+# given positions, or -1.
+def find_hostname(data, start, end):
+    if start == 0 and showtech.starts_with(data, 0, b'hostname '):
+        return 0
+    position = data.find(b'\nhostname ', start, end)
+    return position + 1 if position != -1 else -1
+
+
+################################################################################
@@ -0,0 +1,83 @@
+################################################################################
+# interfacewriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import csvwriter
+from cisxp import natwriter
+
+
+################################################################################
+
+
+# Writes the interfaces of each device, one row per interface address.
+# Interfaces without an address get a single row.
+class InterfaceWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'interface',
+            'name',
+            'description',
+            'vlan',
+            'vrf',
+            'addr',
+            'standby addr',
+            'secondary',
+            'hsrp group',
+            'hsrp addr',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'     : 'Hostname',
+            'interface'    : 'Interface',
+            'name'         : 'Name',
+            'description'  : 'Description',
+            'vlan'         : 'VLAN',
+            'vrf'          : 'VRF',
+            'addr'         : 'Addr',
+            'standby addr' : 'Standby Addr',
+            'secondary'    : 'Secondary',
+            'hsrp group'   : 'HSRP Group',
+            'hsrp addr'    : 'HSRP Addr',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        for interface in self.device.interfaces:
+            for addr in interface.addrs or [None]:
+                self.add_interface_row(interface, addr)
+
+    def add_interface_row(self, interface, addr):
+        self.row = {
+            'hostname'    : self.device.hostname,
+            'interface'   : interface.name,
+            'name'        : interface.custom_name,
+            'description' : interface.description,
+            'vlan'        : getattr(interface.vlan, 'id', interface.vlan),
+            'vrf'         : getattr(interface.vrf, 'name', interface.vrf),
+            'hsrp group'  : interface.hsrp_group,
+            'hsrp addr'   : natwriter.get_addr(interface.hsrp_addr),
+        }
+        if addr != None:
+            self.row.update({
+                'addr'         : natwriter.get_addr(addr),
+                'standby addr' : natwriter.get_addr(addr.standby),
+                'secondary'    : natwriter.get_boolean(addr.secondary),
+            })
+        self.rows.append(self.row)
+
+
+################################################################################
@@ -0,0 +1,114 @@
+################################################################################
+# intervalindex.py
+################################################################################
+
+
+from array import array
+import bisect
+import heapq
+
+
+################################################################################
+
+
+# Maps integer points to the ids of the intervals that contain them. The
+# interval boundaries split the integer space into elementary segments, which
+# are the leaves of a segment tree. Each interval id is stored only in the
+# O(log n) tree nodes whose segments together make up the interval, so wide
+# intervals such as 'any' take a single node rather than a copy per segment.
+# A lookup finds the segment of a point with a binary search and collects the
+# ids of the nodes on its path to the root. Ids should be added in priority
+# order when the first matching interval is wanted.
+class IntervalIndex():
+    def __init__(self):
+        self.starts = array('Q')    # interval start points
+        self.ends = array('Q')      # interval end points, inclusive
+        self.ids = array('I')       # interval ids
+        self.bounds = None          # first point of each segment
+        self.size = 0               # number of leaves of the tree
+        self.nodes = None           # maps tree node to ids in ascending order
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Adds the interval [start, end] with the given id. The index must be
+    # rebuilt after intervals are added.
+    def add(self, start, end, id):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.ids.append(id)
+        self.bounds = None
+
+    # Builds the segment tree. Node 1 is the root and the children of node i
+    # are 2i and 2i + 1; leaf size + i is segment i. Only nodes holding ids
+    # are kept.
+    def build(self):
+        points = set(self.starts)
+        points.update(end + 1 for end in self.ends)
+        self.bounds = array('Q', sorted(points))
+        self.size = 1
+        while self.size < len(self.bounds):
+            self.size *= 2
+
+        nodes = {}
+        for i in range(len(self.ids)):
+            low = bisect.bisect_left(self.bounds, self.starts[i]) + self.size
+            high = (bisect.bisect_left(self.bounds, self.ends[i] + 1)
+                    + self.size)
+            while low < high:       # covers segments [low, high)
+                if low & 1:
+                    nodes.setdefault(low, []).append(self.ids[i])
+                    low += 1
+                if high & 1:
+                    high -= 1
+                    nodes.setdefault(high, []).append(self.ids[i])
+                low >>= 1
+                high >>= 1
+        self.nodes = {node: array('I', sorted(ids))
+                      for node, ids in nodes.items()}
+
+    # Returns the number of ids stored in the tree nodes.
+    def stored(self):
+        if self.bounds == None:
+            self.build()
+        return sum(len(ids) for ids in self.nodes.values())
+
+    # Returns the ids of all intervals containing point in ascending order.
+    def lookup(self, point):
+        if self.bounds == None:
+            self.build()
+        segment = bisect.bisect_right(self.bounds, point) - 1
+        if segment < 0:
+            return array('I')
+        found = []
+        node = segment + self.size
+        while node > 0:
+            ids = self.nodes.get(node)
+            if ids != None:
+                found.append(ids)
+            node >>= 1
+        if len(found) == 1:
+            return found[0]
+        return array('I', sorted(id for ids in found for id in ids))
+
+
+################################################################################
+
+
+# Yields an (item, other item) pair for every two of the given items whose
+# inclusive [start, end] ranges overlap, where other item is the one that
+# starts first. The items are sorted by start and swept once, keeping a heap
+# of the items still open, so only items that actually overlap are compared.
+def overlapping_pairs(items):
+    order = sorted(range(len(items)), key=lambda i: (items[i].start, i))
+    active = []                     # heap of (end, index) of open items
+    for i in order:
+        item = items[i]
+        while len(active) > 0 and active[0][0] < item.start:
+            heapq.heappop(active)
+        for _end, j in active:
+            yield (item, items[j])
+        heapq.heappush(active, (item.end, i))
+
+
+################################################################################
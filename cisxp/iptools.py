@@ -25,3 +25,152 @@ def mask_to_cidr(mask):
         cidr += 1
         addr = (addr << 1) & 0xffffffff
     return cidr
+
+# Returns the integer value of the given dotted ipv4 address string.
+def addr_to_int(addr):
+    bytes = addr.split('.')
+    return ((int(bytes[0]) << 24) + (int(bytes[1]) << 16)
+            + (int(bytes[2]) << 8) + int(bytes[3]))
+
+# Returns the dotted ipv4 address string of the given integer value.
+def int_to_addr(value):
+    return (f'{(value >> 24) & 0xff}.{(value >> 16) & 0xff}.'
+            f'{(value >> 8) & 0xff}.{value & 0xff}')
+
+# Returns the first and last integer addresses of the given subnet.
+def cidr_to_range(addr, cidr):
+    start = addr_to_int(addr) if isinstance(addr, str) else addr
+    size = 1 << (32 - cidr)
+    start &= ~(size - 1) & 0xffffffff
+    return (start, start + size - 1)
+
+# Returns True if the given string is a dotted ipv4 address.
+def is_addr(addr):
+    return isinstance(addr, str) and addr_re.fullmatch(addr) != None
+
+# Returns True if the given string is a dotted ipv4 address without a prefix
+# length, with every byte in range.
+def is_host_addr(addr):
+    if not is_addr(addr) or '/' in addr:
+        return False
+    return all(int(byte) <= 255 for byte in addr.split('.'))
+
+# Maps ip protocol names to protocol numbers.
+protocol_numbers = {
+    'ip'     : 0,
+    'icmp'   : 1,
+    'igmp'   : 2,
+    'ipinip' : 4,
+    'tcp'    : 6,
+    'udp'    : 17,
+    'gre'    : 47,
+    'esp'    : 50,
+    'ah'     : 51,
+    'icmp6'  : 58,
+    'eigrp'  : 88,
+    'ospf'   : 89,
+    'nos'    : 94,
+    'pim'    : 103,
+    'pcp'    : 108,
+    'snp'    : 109,
+    'sctp'   : 132,
+}
+
+# Maps port names used in configurations to port numbers.
+port_numbers = {
+    'aol'               : 5190,
+    'bgp'               : 179,
+    'biff'              : 512,
+    'bootpc'            : 68,
+    'bootps'            : 67,
+    'chargen'           : 19,
+    'cifs'              : 3020,
+    'citrix-ica'        : 1494,
+    'cmd'               : 514,
+    'ctiqbe'            : 2748,
+    'daytime'           : 13,
+    'discard'           : 9,
+    'dnsix'             : 195,
+    'domain'            : 53,
+    'echo'              : 7,
+    'exec'              : 512,
+    'finger'            : 79,
+    'ftp'               : 21,
+    'ftp-data'          : 20,
+    'gopher'            : 70,
+    'h323'              : 1720,
+    'hostname'          : 101,
+    'http'              : 80,
+    'https'             : 443,
+    'ident'             : 113,
+    'imap4'             : 143,
+    'irc'               : 194,
+    'isakmp'            : 500,
+    'kerberos'          : 88,
+    'klogin'            : 543,
+    'kshell'            : 544,
+    'ldap'              : 389,
+    'ldaps'             : 636,
+    'login'             : 513,
+    'lotusnotes'        : 1352,
+    'lpd'               : 515,
+    'mobile-ip'         : 434,
+    'nameserver'        : 42,
+    'netbios-dgm'       : 138,
+    'netbios-ns'        : 137,
+    'netbios-ssn'       : 139,
+    'nfs'               : 2049,
+    'nntp'              : 119,
+    'ntp'               : 123,
+    'pcanywhere-data'   : 5631,
+    'pcanywhere-status' : 5632,
+    'pim-auto-rp'       : 496,
+    'pop2'              : 109,
+    'pop3'              : 110,
+    'pptp'              : 1723,
+    'radius'            : 1645,
+    'radius-acct'       : 1646,
+    'rip'               : 520,
+    'rsh'               : 514,
+    'rtsp'              : 554,
+    'secureid-udp'      : 5510,
+    'sip'               : 5060,
+    'smtp'              : 25,
+    'snmp'              : 161,
+    'snmptrap'          : 162,
+    'sqlnet'            : 1521,
+    'ssh'               : 22,
+    'sunrpc'            : 111,
+    'syslog'            : 514,
+    'tacacs'            : 49,
+    'talk'              : 517,
+    'telnet'            : 23,
+    'tftp'              : 69,
+    'time'              : 37,
+    'uucp'              : 540,
+    'vxlan'             : 4789,
+    'who'               : 513,
+    'whois'             : 43,
+    'www'               : 80,
+    'xdmcp'             : 177,
+}
+
+# Returns the ip protocol number of the given protocol name or number string
+# or None if it is not known.
+def protocol_to_int(protocol):
+    if protocol == None:
+        return None
+    if protocol.isdigit():
+        return int(protocol)
+    return protocol_numbers.get(protocol)
+
+# Returns the port number of the given port name or number string or None if
+# it is not known.
+def port_to_int(port):
+    if port == None:
+        return None
+    if isinstance(port, int):
+        return port
+    if port.isdigit():
+        return int(port)
+    return port_numbers.get(port)
@@ -0,0 +1,133 @@
+################################################################################
+# memprofile.py
+################################################################################
+
+
+import gc
+import json
+import sys
+import tracemalloc
+
+
+from cisxp import device
+
+
+################################################################################
+
+
+# Profiles memory with tracemalloc at phase boundaries of each file, such as
+# after a file is parsed and after its rows are rendered and written. Each
+# checkpoint records the traced memory, the top allocation sites and the
+# number of instances of each device model class with their shallow size,
+# the size of the instance and of its attribute dict.
+#
+# Profiling is off unless started, and checkpoint() then does nothing.
+# Checkpoints are taken in the main process, so with several jobs the parse
+# checkpoint shows the device after it was received from the worker.
+class MemoryProfiler():
+    # Allocations of the profiler and of the import machinery are not shown.
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, top=10):
+        self.enabled = False
+        self.top = top              # allocation sites kept per checkpoint
+        self.file = None            # file of the last checkpoint
+        self.checkpoints = []
+
+    def start(self, frames=1):
+        tracemalloc.start(frames)
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        tracemalloc.stop()
+
+    # Records the memory in use after the given phase of the given file, or
+    # of the file of the previous checkpoint.
+    def checkpoint(self, phase, file=None):
+        if not self.enabled:
+            return
+        if file != None:
+            self.file = file
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        sites = [
+            {
+                'site'  : f'{stat.traceback[0].filename}:'
+                          f'{stat.traceback[0].lineno}',
+                'bytes' : stat.size,
+                'count' : stat.count,
+            }
+            for stat in snapshot.statistics('lineno')[:self.top]
+        ]
+        self.checkpoints.append({
+            'file'          : self.file,
+            'phase'         : phase,
+            'current bytes' : current,
+            'peak bytes'    : peak,
+            'top sites'     : sites,
+            'models'        : get_model_sizes(),
+        })
+
+    # Writes the checkpoints as json.
+    def write(self, filename):
+        with open(filename, 'w') as file:
+            json.dump({'checkpoints': self.checkpoints}, file, indent=2)
+            file.write('\n')
+
+    # Prints the largest checkpoint of each phase.
+    def print_summary(self):
+        largest = {}
+        for checkpoint in self.checkpoints:
+            phase = checkpoint['phase']
+            if (phase not in largest or checkpoint['current bytes']
+                > largest[phase]['current bytes']):
+                largest[phase] = checkpoint
+        for phase, checkpoint in largest.items():
+            print(f'{phase}: {checkpoint["current bytes"]} bytes after '
+                  f'{checkpoint["file"]}')
+            for site in checkpoint['top sites'][:3]:
+                print(f'  {site["bytes"]:>12} {site["site"]}')
+
+
+################################################################################
+
+
+# Profiler of the current process.
+profiler = MemoryProfiler()
+
+
+################################################################################
+
+
+# Returns the device model classes.
+def get_model_classes():
+    return tuple(value for value in vars(device).values()
+                 if isinstance(value, type)
+                 and value.__module__ == device.__name__)
+
+# Returns a dict mapping the name of each device model class with live
+# instances to their count and shallow size in bytes.
+def get_model_sizes():
+    classes = get_model_classes()
+    sizes = {}
+    for object in gc.get_objects():
+        cls = type(object)
+        if cls not in classes:
+            continue
+        size = sys.getsizeof(object)
+        if hasattr(object, '__dict__'):
+            size += sys.getsizeof(object.__dict__)
+        entry = sizes.setdefault(cls.__name__, {'count': 0, 'bytes': 0})
+        entry['count'] += 1
+        entry['bytes'] += size
+    return sizes
+
+
+################################################################################
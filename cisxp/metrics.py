@@ -0,0 +1,217 @@
+################################################################################
+# metrics.py
+################################################################################
+
+
+import json
+import os
+import re
+import threading
+import time
+
+
+################################################################################
+
+
+# Counters, gauges and phase durations of a run. A counter is identified by
+# its name and an optional (label name, label value) tuple, such as
+# ('type', 'Network object "" not found.') for the errors counter. All
+# modules of a process add to the module level registry; work done in pool
+# workers is added by the main process from the results the workers return.
+class Metrics():
+    PREFIX = 'cisx'
+
+    # Help text of the known counters and gauges, written to the prometheus
+    # file.
+    HELP = {
+        'files_parsed'            : 'Configuration files parsed.',
+        'files_failed'            : 'Files over budget or failing by reason.',
+        'files_skipped'           : 'Files of hosts not selected by --host.',
+        'bytes_read'              : 'Bytes of configuration read.',
+        'bytes_skipped'           : 'Bytes of show tech captures skipped.',
+        'files_extracted'         : 'Show tech captures read in part.',
+        'lines_read'              : 'Lines of configuration read.',
+        'nat_rows_written'        : 'NAT rows produced by NATWriter.',
+        'identity_nats_skipped'   : 'Identity NAT rules skipped by NATWriter.',
+        'errors'                  : 'Parsing errors by type.',
+        'cache_hits'              : 'Lookup cache hits by cache.',
+        'writer_queue_max_depth'  : 'Most devices waiting for the writer.',
+        'writer_queue_mean_depth' : 'Mean devices waiting for the writer.',
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counters = {}          # maps (name, label) to value
+        self.phases = {}            # maps phase names to seconds
+        self.gauges = {}            # maps gauge names to last values
+        self.start = time.time()
+        self.end = None
+        self.success = None
+
+    def add(self, name, value=1, label=None):
+        key = (name, label)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # Returns the value of a counter, or the sum over all its labels if label
+    # is None.
+    def get(self, name, label=None):
+        with self.lock:
+            if label != None:
+                return self.counters.get((name, label), 0)
+            return sum(value for (counter, _label), value
+                       in self.counters.items() if counter == name)
+
+    # Sets a gauge, a value that is not accumulated, such as a queue depth.
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    # Returns a context manager adding the time spent within it to a phase.
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    # Returns a function calling the given function and adding the time spent
+    # in it to a phase.
+    def timed(self, name, function):
+        def call(*args):
+            with PhaseTimer(self, name):
+                return function(*args)
+        return call
+
+    # Marks the end of the run.
+    def finish(self, success=True):
+        self.end = time.time()
+        self.success = success
+
+    def elapsed(self):
+        end = self.end if self.end != None else time.time()
+        return end - self.start
+
+    # Returns the metrics as a dict.
+    def summary(self):
+        elapsed = self.elapsed()
+        lines = self.get('lines_read')
+        parse = self.phases.get('parse', 0.0)
+        summary = {
+            'start'            : self.start,
+            'seconds'          : elapsed,
+            'success'          : self.success,
+            'lines per second' : lines / elapsed if elapsed > 0 else 0.0,
+            'parse lines per second' : lines / parse if parse > 0 else 0.0,
+            'phases'           : dict(self.phases),
+        }
+        summary.update(self.gauges)
+        with self.lock:
+            counters = sorted(self.counters.items(),
+                              key=lambda item: (item[0][0], str(item[0][1])))
+        for (name, label), value in counters:
+            if label == None:
+                summary[name] = value
+            else:
+                summary.setdefault(name, {})[label[1]] = value
+        return summary
+
+    def write_json(self, filename):
+        write_atomic(filename, json.dumps(self.summary(), indent=2) + '\n')
+
+    # Writes the metrics in the prometheus text format, for the textfile
+    # collector of the node exporter.
+    def write_prometheus(self, filename):
+        lines = []
+        def metric(name, type, help, samples):
+            name = f'{self.PREFIX}_{name}'
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type}')
+            for label, value in samples:
+                lines.append(f'{name}{format_label(label)} {value}')
+
+        with self.lock:
+            counters = dict(self.counters)
+        names = sorted(set(name for name, _label in counters))
+        for name in names:
+            samples = sorted(((label, value) for (counter, label), value
+                              in counters.items() if counter == name),
+                             key=lambda sample: str(sample[0]))
+            metric(f'{name}_total', 'counter',
+                   self.HELP.get(name, name.replace('_', ' ') + '.'), samples)
+        for name, value in sorted(self.gauges.items()):
+            metric(name, 'gauge', self.HELP.get(name, name.replace('_', ' ')
+                                                + '.'), [(None, value)])
+        summary = self.summary()
+        metric('lines_per_second', 'gauge', 'Lines read per second of run.',
+               [(None, summary['lines per second'])])
+        metric('phase_seconds', 'gauge', 'Seconds spent in each phase.',
+               [(('phase', phase), seconds) for phase, seconds
+                in sorted(self.phases.items())])
+        metric('run_seconds', 'gauge', 'Duration of the run.',
+               [(None, summary['seconds'])])
+        metric('run_success', 'gauge', '1 if the run completed.',
+               [(None, 1 if self.success else 0)])
+        metric('last_run_timestamp_seconds', 'gauge',
+               'Time the run started.', [(None, self.start)])
+        write_atomic(filename, '\n'.join(lines) + '\n')
+
+
+################################################################################
+
+
+# Adds the time spent within a with statement to a phase of a Metrics.
+class PhaseTimer():
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.metrics.add_phase(self.name, time.perf_counter() - self.start)
+        return False
+
+
+################################################################################
+
+
+# Metrics of the current run.
+registry = Metrics()
+
+
+################################################################################
+
+
+# Returns the error type of a parser error: its message with quoted names
+# removed, so errors about different objects are counted together.
+def get_error_type(error):
+    lines = error.split('\n')
+    message = lines[1].strip() if len(lines) > 1 else lines[0].strip()
+    return re.sub(r'"[^"]*"', '""', message)
+
+# Returns a prometheus label set for the given (name, value) label.
+def format_label(label):
+    if label == None:
+        return ''
+    name, value = label
+    value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    value = value.replace('\n', '\\n')
+    return f'{{{name}="{value}"}}'
+
+# Writes text to filename through a temporary file renamed over it, so
+# readers never see a partial file.
+def write_atomic(filename, text):
+    temp = f'{filename}.{os.getpid()}.tmp'
+    with open(temp, 'w') as file:
+        file.write(text)
+    os.replace(temp, filename)
+
+
+################################################################################
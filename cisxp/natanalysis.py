@@ -0,0 +1,278 @@
+################################################################################
+# natanalysis.py
+################################################################################
+
+
+from array import array
+
+
+from cisxp import natengine
+
+
+# numpy module or None if it is not installed. It is imported on first use so
+# runs that do no analysis do not pay for the import.
+numpy = None
+
+# Imports numpy and returns True if it is available.
+def import_numpy():
+    global numpy
+    if numpy == None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+    return True
+
+
+################################################################################
+
+
+# Finds overlapping and shadowed nat rules within a device. Every combination
+# of an inside source, mapped source and inside destination range of every
+# rule becomes one element of a set of parallel integer columns, so the gaps
+# of an object group are never compared as if they were covered. With
+# numpy the columns are compared a block of elements at a time against all
+# other elements; without it a sort and sweep over the inside ranges is used.
+class NATAnalysis():
+    ANY = 0                   # interface code of the 'any' interface
+    BLOCK_SIZE = 1024         # elements compared per numpy block
+
+    INSIDE_OVERLAP = 'inside overlap'
+    MAPPED_OVERLAP = 'mapped overlap'
+    SHADOWED = 'shadowed'
+
+    def __init__(self, dev, use_numpy=True):
+        self.device = dev
+        self.rules = natengine.get_nat_rules(dev)
+        self.use_numpy = use_numpy and import_numpy()
+        self.interface_codes = {'any': self.ANY}
+        self.load()
+
+    # Loads the element columns from the nat rules. Elements are stored in
+    # rule order so a lower element index always belongs to an earlier or the
+    # same rule.
+    def load(self):
+        columns = ('rule', 'inside', 'outside', 'start', 'end',
+                   'mapped_start', 'mapped_end', 'dest_start', 'dest_end',
+                   'protocol', 'port', 'static')
+        self.columns = {name: array('q') for name in columns}
+        for rule in self.rules:
+            mapped_ranges = self.ranges(rule.outside_src)
+            dest_ranges = self.ranges(rule.inside_dest)
+            for start, end in rule.inside_src:
+                for mapped in mapped_ranges:
+                    for dest in dest_ranges:
+                        self.add_element(rule, start, end, mapped, dest)
+        if self.use_numpy:
+            self.columns = {name: numpy.array(column, dtype=numpy.int64)
+                            for name, column in self.columns.items()}
+
+    # Adds one element to the columns.
+    def add_element(self, rule, start, end, mapped, dest):
+        values = {
+            'rule'         : rule.id,
+            'inside'       : self.interface_code(rule.inside_interface),
+            'outside'      : self.interface_code(rule.outside_interface),
+            'start'        : start,
+            'end'          : end,
+            'mapped_start' : mapped[0],
+            'mapped_end'   : mapped[1],
+            'dest_start'   : dest[0],
+            'dest_end'     : dest[1],
+            'protocol'     : rule.protocol if rule.protocol != None else -1,
+            'port'         : rule.real_port if rule.real_port != None else -1,
+            'static'       : 1 if rule.static else 0,
+        }
+        for name, value in values.items():
+            self.columns[name].append(value)
+
+    # Returns the given ranges merged. No ranges, as for a rule without a
+    # destination clause, stand for the whole space; ranges that cannot be
+    # resolved become a single empty range.
+    def ranges(self, ranges):
+        if ranges == None:
+            return [(0, 0xffffffff)]
+        if len(ranges) == 0:
+            return [(1, 0)]
+        return merge_ranges(ranges)
+
+    # Returns the integer code of the given interface name.
+    def interface_code(self, name):
+        return self.interface_codes.setdefault(name, len(self.interface_codes))
+
+    def __len__(self):
+        return len(self.columns['rule'])
+
+    # Returns a list of (kind, rule, rule range, other rule, other range)
+    # findings, where other rule is the earlier rule of the pair.
+    def analyze(self):
+        if self.use_numpy:
+            pairs = self.numpy_pairs()
+        else:
+            pairs = self.sweep_pairs()
+        return self.get_findings(pairs)
+
+    # Returns (kind, earlier element, later element) pairs found with numpy
+    # block comparisons.
+    def numpy_pairs(self):
+        c = self.columns
+        pairs = []
+        count = len(self)
+        for block in range(0, count, self.BLOCK_SIZE):
+            i = numpy.arange(block, min(block + self.BLOCK_SIZE, count))
+            col = lambda name: c[name][i][:, None]
+            row = lambda name: c[name][None, :]
+            later = numpy.arange(count)[None, :] > i[:, None]
+            different = row('rule') != col('rule')
+            interfaces = (
+                ((col('inside') == row('inside'))
+                 | (col('inside') == self.ANY)
+                 | (row('inside') == self.ANY))
+                & ((col('outside') == row('outside'))
+                   | (col('outside') == self.ANY)
+                   | (row('outside') == self.ANY))
+            )
+            candidates = later & different & interfaces
+
+            inside = (candidates
+                      & (col('start') <= row('end'))
+                      & (row('start') <= col('end')))
+            mapped = (candidates
+                      & ((col('static') == 1) | (row('static') == 1))
+                      & (col('mapped_start') <= col('mapped_end'))
+                      & (row('mapped_start') <= row('mapped_end'))
+                      & (col('mapped_start') <= row('mapped_end'))
+                      & (row('mapped_start') <= col('mapped_end')))
+            shadowed = (inside
+                        & ((col('inside') == row('inside'))
+                           | (col('inside') == self.ANY))
+                        & ((col('outside') == row('outside'))
+                           | (col('outside') == self.ANY))
+                        & (col('start') <= row('start'))
+                        & (row('end') <= col('end'))
+                        & (col('dest_start') <= row('dest_start'))
+                        & (row('dest_end') <= col('dest_end'))
+                        & ((col('protocol') == -1)
+                           | ((col('protocol') == row('protocol'))
+                              & (col('port') == row('port')))))
+
+            for kind, mask in ((self.INSIDE_OVERLAP, inside),
+                               (self.MAPPED_OVERLAP, mapped),
+                               (self.SHADOWED, shadowed)):
+                rows, others = numpy.nonzero(mask)
+                pairs.extend((kind, int(i[index]), int(other))
+                             for index, other in zip(rows, others))
+        return pairs
+
+    # Returns (kind, earlier element, later element) pairs found by sweeping
+    # the elements sorted by range start. Only elements whose ranges are
+    # still open at a start point are compared.
+    def sweep_pairs(self):
+        pairs = []
+        for kind, start, end in ((self.INSIDE_OVERLAP, 'start', 'end'),
+                                 (self.MAPPED_OVERLAP, 'mapped_start',
+                                  'mapped_end')):
+            starts, ends = self.columns[start], self.columns[end]
+            order = [i for i in range(len(self)) if starts[i] <= ends[i]]
+            order.sort(key=lambda i: (starts[i], -ends[i]))
+            active = []
+            for j in order:
+                active = [i for i in active if ends[i] >= starts[j]]
+                for i in active:
+                    first, second = min(i, j), max(i, j)
+                    if not self.compatible(first, second):
+                        continue
+                    if kind == self.INSIDE_OVERLAP:
+                        pairs.append((kind, first, second))
+                        if self.shadows(first, second):
+                            pairs.append((self.SHADOWED, first, second))
+                    elif (self.columns['static'][first]
+                          or self.columns['static'][second]):
+                        pairs.append((kind, first, second))
+                active.append(j)
+        return pairs
+
+    # Returns True if the elements belong to different rules with matching
+    # interface pairs.
+    def compatible(self, i, j):
+        c = self.columns
+        if c['rule'][i] == c['rule'][j]:
+            return False
+        for name in ('inside', 'outside'):
+            if (c[name][i] != c[name][j] and c[name][i] != self.ANY
+                and c[name][j] != self.ANY):
+                return False
+        return True
+
+    # Returns True if element i covers every packet matched by element j.
+    def shadows(self, i, j):
+        c = self.columns
+        return ((c['inside'][i] in (c['inside'][j], self.ANY))
+                and (c['outside'][i] in (c['outside'][j], self.ANY))
+                and c['start'][i] <= c['start'][j]
+                and c['end'][j] <= c['end'][i]
+                and c['dest_start'][i] <= c['dest_start'][j]
+                and c['dest_end'][j] <= c['dest_end'][i]
+                and (c['protocol'][i] == -1
+                     or (c['protocol'][i] == c['protocol'][j]
+                         and c['port'][i] == c['port'][j])))
+
+    # Returns the findings of the given element pairs. Overlaps are reported
+    # once per pair of rule ranges; a rule is reported as shadowed only when
+    # every one of its elements is covered by an earlier rule.
+    def get_findings(self, pairs):
+        c = self.columns
+        findings = []
+        seen = set()          # (kind, rule, range, other rule, other range)
+        covered = {}          # maps element to its first shadowing element
+
+        def add(kind, j, i):
+            key = (kind, int(c['rule'][j]), self.element_range(j, kind),
+                   int(c['rule'][i]), self.element_range(i, kind))
+            if key not in seen:
+                seen.add(key)
+                findings.append((kind, self.rules[key[1]], key[2],
+                                 self.rules[key[3]], key[4]))
+
+        for kind, i, j in sorted(pairs, key=lambda pair: (pair[1], pair[2])):
+            if kind == self.SHADOWED:
+                covered.setdefault(j, i)
+                continue
+            add(kind, j, i)
+
+        elements = {}         # maps rule id to its elements
+        for element in range(len(self)):
+            elements.setdefault(int(c['rule'][element]), []).append(element)
+        for rule_id, rule_elements in elements.items():
+            if not all(element in covered for element in rule_elements):
+                continue
+            for element in rule_elements:
+                add(self.SHADOWED, element, covered[element])
+        return findings
+
+    # Returns the inside, or mapped, (start, end) range of an element.
+    def element_range(self, element, kind=INSIDE_OVERLAP):
+        c = self.columns
+        if kind == self.MAPPED_OVERLAP:
+            return (int(c['mapped_start'][element]),
+                    int(c['mapped_end'][element]))
+        return (int(c['start'][element]), int(c['end'][element]))
+
+
+################################################################################
+
+
+# Returns the given (start, end) ranges sorted, with overlapping and adjacent
+# ranges merged.
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if len(merged) > 0 and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+################################################################################
@@ -0,0 +1,84 @@
+################################################################################
+# natcollision.py
+################################################################################
+
+
+from cisxp import device
+from cisxp import intervalindex
+from cisxp import iptools
+from cisxp import natengine
+
+
+################################################################################
+
+
+# A mapped address range published by a nat rule of a device.
+class MappedRange():
+    MAPPED_SRC = 'mapped src'
+    MAPPED_DEST = 'mapped dest'
+    FALLBACK = 'fallback'
+
+    def __init__(self, hostname, rule, kind, start, end):
+        self.hostname = hostname
+        self.rule = rule            # natengine.NATRule()
+        self.kind = kind
+        self.start = start
+        self.end = end
+
+
+################################################################################
+
+
+# Finds mapped addresses published by more than one device. The mapped ranges
+# of every device are swept once with intervalindex.overlapping_pairs(), so
+# only ranges that actually overlap are compared.
+class NATCollisions():
+    def __init__(self):
+        self.ranges = []
+
+    # Adds the mapped ranges of the nat rules of the given device. Identity
+    # rules and rules mapping to any address are skipped as they publish no
+    # address of their own.
+    def add_device(self, dev):
+        for rule in natengine.get_nat_rules(dev):
+            if rule.inside_src == rule.outside_src:
+                continue
+            self.add_ranges(dev, rule, MappedRange.MAPPED_SRC,
+                            rule.outside_src)
+            if rule.inside_dest != None and \
+               rule.inside_dest != rule.outside_dest:
+                self.add_ranges(dev, rule, MappedRange.MAPPED_DEST,
+                                rule.inside_dest)
+            if rule.nat.fallback:
+                self.add_fallback(dev, rule)
+
+    def add_ranges(self, dev, rule, kind, ranges):
+        for start, end in ranges:
+            if start == 0 and end == 0xffffffff:
+                continue
+            self.ranges.append(MappedRange(dev.hostname, rule, kind, start,
+                                           end))
+
+    # Adds the outside interface address used when the mapped pool of a
+    # dynamic rule is exhausted.
+    def add_fallback(self, dev, rule):
+        interface = rule.nat.outside_interface
+        if not isinstance(interface, device.Interface):
+            return
+        addr = interface.primary_addr()
+        if addr == None or addr.range() == None:
+            return
+        start, _end = iptools.cidr_to_range(addr.addr, 32)
+        self.ranges.append(MappedRange(dev.hostname, rule,
+                                       MappedRange.FALLBACK, start, start))
+
+    # Returns a list of (range, other range) pairs of overlapping mapped
+    # ranges of different hostnames. other range is the one that starts
+    # first.
+    def find(self):
+        return [(mapped, other) for mapped, other
+                in intervalindex.overlapping_pairs(self.ranges)
+                if mapped.hostname != other.hostname]
+
+
+################################################################################
@@ -0,0 +1,75 @@
+################################################################################
+# natcollisionwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import iptools
+from cisxp import csvwriter
+from cisxp import natcollision
+
+
+################################################################################
+
+
+# Writes the mapped nat addresses published by more than one device. Devices
+# are added with add_device and the collisions written with write.
+class NATCollisionWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+        self.collisions = natcollision.NATCollisions()
+
+        # Column identifiers.
+        self.cols = [
+            'overlap',
+            'hostname',
+            'rule',
+            'kind',
+            'mapped addr',
+            'other hostname',
+            'other rule',
+            'other kind',
+            'other mapped addr',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'overlap'           : 'Overlap',
+            'hostname'          : 'Hostname',
+            'rule'              : 'Rule',
+            'kind'              : 'Kind',
+            'mapped addr'       : 'Mapped Addr',
+            'other hostname'    : 'Other Hostname',
+            'other rule'        : 'Other Rule',
+            'other kind'        : 'Other Kind',
+            'other mapped addr' : 'Other Mapped Addr',
+        }
+
+    def add_device(self, device):
+        self.collisions.add_device(device)
+
+    def populate_rows(self):
+        for mapped, other in self.collisions.find():
+            self.rows.append({
+                'overlap'           : self.get_range(
+                                          max(mapped.start, other.start),
+                                          min(mapped.end, other.end)),
+                'hostname'          : mapped.hostname,
+                'rule'              : mapped.rule.name(),
+                'kind'              : mapped.kind,
+                'mapped addr'       : self.get_range(mapped.start, mapped.end),
+                'other hostname'    : other.hostname,
+                'other rule'        : other.rule.name(),
+                'other kind'        : other.kind,
+                'other mapped addr' : self.get_range(other.start, other.end),
+            })
+
+    def get_range(self, start, end):
+        if start == end:
+            return iptools.int_to_addr(start)
+        return f'{iptools.int_to_addr(start)} - {iptools.int_to_addr(end)}'
+
+
+################################################################################
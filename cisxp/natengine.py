@@ -0,0 +1,310 @@
+################################################################################
+# natengine.py
+################################################################################
+
+
+from cisxp import device
+from cisxp import intervalindex
+from cisxp import iptools
+
+
+################################################################################
+
+
+# A single nat rule of a device with its addresses resolved to integer ranges.
+class NATRule():
+    # Rule table sections in the order the asa evaluates them.
+    MANUAL = 1
+    AUTO = 2
+    AFTER_AUTO = 3
+
+    def __init__(self, nat, object=None, section=MANUAL, line=None):
+        self.nat = nat
+        self.object = object          # network object of an auto nat rule
+        self.section = section
+        self.line = line              # position of the rule within section
+        self.id = None                # position of the rule in the rule table
+
+        self.inside_interface = get_interface_name(nat.inside_interface)
+        self.outside_interface = get_interface_name(nat.outside_interface)
+        self.static = nat.src_type == 'static'
+        self.inside_src = get_object_ranges(nat.inside_src, nat)
+        self.outside_src = get_object_ranges(nat.outside_src, nat)
+        self.inside_dest = None
+        self.outside_dest = None
+        if nat.dest_type != None:
+            self.inside_dest = get_object_ranges(nat.inside_dest, nat)
+            self.outside_dest = get_object_ranges(nat.outside_dest, nat)
+
+        # Service translation of the port of the real host. real_port and
+        # mapped_port are None when the rule has no service clause.
+        self.protocol = None
+        self.real_port = None
+        self.mapped_port = None
+        if nat.inside_service != None and nat.outside_service != None:
+            self.protocol = iptools.protocol_to_int(get_service_protocol(nat))
+            self.real_port = get_service_port(nat.inside_service)
+            self.mapped_port = get_service_port(nat.outside_service)
+
+    # Returns the name used to identify this rule in reports.
+    def name(self):
+        if self.object != None:
+            return self.object.name
+        return f'manual {self.line}'
+
+    # Returns the number of addresses matched by the real source.
+    def size(self):
+        return sum(end - start + 1 for start, end in self.inside_src)
+
+    # Returns the key used to order auto nat rules: static before dynamic,
+    # then fewer addresses first, then by address and finally by name.
+    def auto_key(self):
+        start = min((start for start, _end in self.inside_src), default=0)
+        return (not self.static, self.size(), start, self.object.name or '')
+
+
+################################################################################
+
+
+# Translates flows with the nat rules of a device. Rules are ordered like the
+# asa rule table (manual, auto, after-auto) and indexed by interface pair and
+# by the source address range they match, so a flow only checks the rules
+# whose source range contains its source address.
+class NATEngine():
+    ANY = 'any'
+    FORWARD = 'forward'     # real to mapped, leaving the outside interface
+    REVERSE = 'reverse'     # mapped to real, entering the outside interface
+    CACHE_SIZE = 100000
+
+    def __init__(self, dev):
+        self.device = dev
+        self.rules = get_nat_rules(dev)
+        self.forward = {}   # maps (inside, outside) to index of real src
+        self.reverse = {}   # maps (outside, inside) to index of mapped src
+        self.cache = {}     # maps flows to translations
+        self.cache_hits = 0
+        self.build()
+
+    # Builds the forward and reverse interval indexes of each interface pair.
+    # Only static bidirectional rules translate in the reverse direction.
+    def build(self):
+        for rule in self.rules:
+            key = (rule.inside_interface, rule.outside_interface)
+            index = self.forward.setdefault(key, intervalindex.IntervalIndex())
+            for start, end in rule.inside_src:
+                index.add(start, end, rule.id)
+            if not rule.static or rule.nat.unidirectional:
+                continue
+            key = (rule.outside_interface, rule.inside_interface)
+            index = self.reverse.setdefault(key, intervalindex.IntervalIndex())
+            for start, end in rule.outside_src:
+                index.add(start, end, rule.id)
+        for index in list(self.forward.values()) + list(self.reverse.values()):
+            index.build()
+
+    # Returns the indexes of the given table whose interface pair matches the
+    # given ingress and egress interface names. A name of None matches every
+    # interface.
+    def get_indexes(self, table, ingress, egress):
+        indexes = []
+        for (from_name, to_name), index in table.items():
+            if (ingress == None or from_name in (ingress, self.ANY)) and \
+               (egress == None or to_name in (egress, self.ANY)):
+                indexes.append(index)
+        return indexes
+
+    # Returns a (rule, direction, src, src port, dest, dest port) translation
+    # of the given flow, or None if no rule matches. Addresses are integers
+    # and ports are integers or None.
+    def translate(self, src, dest, protocol, src_port=None, dest_port=None,
+                  ingress=None, egress=None):
+        flow = (src, dest, protocol, src_port, dest_port, ingress, egress)
+        translation = self.cache.get(flow, False)
+        if translation is not False:
+            self.cache_hits += 1
+            return translation
+
+        best = None
+        for direction, table, addr in ((self.FORWARD, self.forward, src),
+                                       (self.REVERSE, self.reverse, dest)):
+            for index in self.get_indexes(table, ingress, egress):
+                for id in index.lookup(addr):
+                    if best != None and id >= best[0].id:
+                        break
+                    if self.matches(self.rules[id], direction, src, dest,
+                                    protocol, src_port, dest_port):
+                        best = (self.rules[id], direction)
+                        break
+
+        if best != None:
+            translation = self.apply(best[0], best[1], src, dest, src_port,
+                                     dest_port)
+        else:
+            translation = None
+        if len(self.cache) >= self.CACHE_SIZE:
+            self.cache = {}
+        self.cache[flow] = translation
+        return translation
+
+    # Returns True if the given rule matches the flow in the given direction.
+    # The address the direction is indexed by has already been matched.
+    def matches(self, rule, direction, src, dest, protocol, src_port,
+                dest_port):
+        if rule.protocol != None:
+            if protocol != rule.protocol:
+                return False
+            if direction == self.FORWARD and src_port != rule.real_port:
+                return False
+            if direction == self.REVERSE and dest_port != rule.mapped_port:
+                return False
+        if rule.inside_dest != None:
+            if direction == self.FORWARD:
+                return in_ranges(dest, rule.inside_dest)
+            return in_ranges(src, rule.outside_dest)
+        return True
+
+    # Returns the translation of the flow by the given rule.
+    def apply(self, rule, direction, src, dest, src_port, dest_port):
+        if direction == self.FORWARD:
+            src = map_addr(src, rule.inside_src, rule.outside_src, rule.static)
+            if rule.inside_dest != None:
+                dest = map_addr(dest, rule.inside_dest, rule.outside_dest,
+                                True)
+            if rule.mapped_port != None:
+                src_port = rule.mapped_port
+        else:
+            dest = map_addr(dest, rule.outside_src, rule.inside_src, True)
+            if rule.inside_dest != None:
+                src = map_addr(src, rule.outside_dest, rule.inside_dest, True)
+            if rule.real_port != None:
+                dest_port = rule.real_port
+        return (rule, direction, src, src_port, dest, dest_port)
+
+
+################################################################################
+
+
+# Returns the nat rules of the given device in asa rule table order: manual
+# rules, auto rules sorted by auto_key, then manual after-auto rules.
+def get_nat_rules(dev):
+    manual, after_auto, auto = [], [], []
+    for nat in dev.nats:
+        if nat == None:
+            continue
+        if nat.after_auto:
+            after_auto.append(NATRule(nat, None, NATRule.AFTER_AUTO,
+                                      len(manual) + len(after_auto) + 1))
+        else:
+            manual.append(NATRule(nat, None, NATRule.MANUAL,
+                                  len(manual) + len(after_auto) + 1))
+    for object in dev.objects:
+        if object.nat != None:
+            auto.append(NATRule(object.nat, object, NATRule.AUTO))
+    auto.sort(key=NATRule.auto_key)
+    for line, rule in enumerate(auto, 1):
+        rule.line = line
+
+    rules = manual + auto + after_auto
+    for id, rule in enumerate(rules):
+        rule.id = id
+    return rules
+
+# Returns the name of the given nat interface.
+def get_interface_name(interface):
+    if isinstance(interface, device.Interface):
+        return interface.custom_name or interface.name
+    return interface
+
+# Returns the address ranges of the given nat address object. An object
+# standing for the outside interface maps to the interface host address only.
+def get_object_ranges(object, nat):
+    if not isinstance(object, device.Object):
+        return []
+    interface = nat.outside_interface
+    if (isinstance(interface, device.Interface)
+        and object.addr is interface.primary_addr()
+        and object.addr != None):
+        return [iptools.cidr_to_range(object.addr.addr, 32)]
+    return object.ranges()
+
+# Returns the service protocol name of the given nat.
+def get_service_protocol(nat):
+    if nat.service_protocol != None:
+        return nat.service_protocol
+    return nat.inside_service.protocol
+
+# Returns the port number translated by the given service object. Service
+# objects of manual nat give the port as a destination port.
+def get_service_port(service):
+    port = service.dest_port if service.dest_port != None else service.src_port
+    if isinstance(port, list):
+        port = port[0]
+    return iptools.port_to_int(port)
+
+# Returns True if addr is within any of the given ranges.
+def in_ranges(addr, ranges):
+    for start, end in ranges:
+        if start <= addr <= end:
+            return True
+    return False
+
+# Returns the address that addr, from the from_ranges, maps to in to_ranges.
+# Static translations map addresses one-to-one by their position within the
+# ranges, wrapping when to_ranges is smaller. Dynamic translations return the
+# first mapped address.
+def map_addr(addr, from_ranges, to_ranges, static):
+    if len(to_ranges) == 0:
+        return addr
+    if not static:
+        return to_ranges[0][0]
+    position = 0
+    for start, end in from_ranges:
+        if start <= addr <= end:
+            position += addr - start
+            break
+        position += end - start + 1
+    size = sum(end - start + 1 for start, end in to_ranges)
+    position %= size
+    for start, end in to_ranges:
+        if position <= end - start:
+            return start + position
+        position -= end - start + 1
+    return addr
+
+
+################################################################################
+
+
+# Yields (src, dest, protocol, src port, dest port, ingress, egress) flows read
+# from the given file object, one flow per line. Fields are separated by
+# whitespace or commas; ports and interface names are optional and '-' stands
+# for an unknown value. Blank lines and lines beginning with '#' are skipped.
+# Lines with missing fields or an invalid address are skipped and reported in
+# errors.
+def read_flows(file, errors):
+    filename = getattr(file, 'name', '<flows>')
+    for line_number, line in enumerate(file, 1):
+        fields = line.replace(',', ' ').split()
+        if len(fields) == 0 or fields[0].startswith('#'):
+            continue
+        msg = check_flow_fields(fields)
+        if msg != None:
+            errors.append(f'{filename}:{line_number}:\n  {msg}\n'
+                          f'  {line.strip()}')
+            continue
+        fields.extend(['-'] * (7 - len(fields)))
+        fields = [None if field == '-' else field for field in fields[:7]]
+        yield tuple(fields)
+
+# Returns the error message of the first missing or invalid field of the
+# given flow fields or None if they are valid.
+def check_flow_fields(fields):
+    if len(fields) < 3:
+        return 'Missing fields.'
+    for addr in fields[:2]:
+        if not iptools.is_host_addr(addr):
+            return f'Invalid address "{addr}".'
+    return None
+
+
+################################################################################
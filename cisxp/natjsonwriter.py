@@ -0,0 +1,256 @@
+################################################################################
+# natjsonwriter.py
+################################################################################
+
+
+import json
+import sys
+
+
+from cisxp import device
+from cisxp import iptools
+from cisxp import natwriter
+
+
+################################################################################
+
+
+# Writes nat rules as JSON Lines, one record per rule, keeping the structure
+# the csv columns flatten away: interfaces with their addresses, objects with
+# their address ranges and group members, and services with their ports.
+#
+# Records are written straight from the model as text fragments appended to
+# a buffer, which is written to the file in batches of BATCH_RECORDS records,
+# so no dicts are built. write(device) writes every rule of a device in
+# NATWriter order and write_nat(device, nat, object) writes a single rule, as
+# emitted by NATStreamParser. As with NATWriter, rules that translate nothing
+# are skipped.
+#
+# A record looks like:
+#   {"hostname": "fw1", "object": "web", "kind": "auto",
+#    "inside_interface": {"name": "inside", "interface": ..., "addr": ...},
+#    "mapped_interface": {...},
+#    "src": {"type": "static", "inside": {...}, "mapped": {...},
+#            "fallback": null},
+#    "dest": null, "service": null, "after_auto": false, ...}
+class NATJSONWriter():
+    BATCH_RECORDS = 1024
+
+    def __init__(self, file=sys.stdout, batch_records=BATCH_RECORDS):
+        self.file = file
+        self.batch_records = batch_records
+        self.buffer = []
+        self.records = 0            # records in buffer
+
+    def write(self, device):
+        for object in device.objects:
+            if object.nat != None:
+                self.write_nat(device, object.nat, object)
+        for nat in device.nats:
+            if nat != None:
+                self.write_nat(device, nat)
+
+    # Writes the record of a single nat, or of the auto nat of the given
+    # object, of the given device.
+    def write_nat(self, device, nat, object=None):
+        if self.is_identity(nat):
+            return
+        add = self.buffer.append
+        add('{"hostname": ')
+        add(get_json(device.hostname))
+        add(', "object": ')
+        add(get_json(object.name if object != None else None))
+        add(', "kind": "auto"' if object != None else ', "kind": "manual"')
+        add(', "inside_interface": ')
+        self.add_interface(nat.inside_interface)
+        add(', "mapped_interface": ')
+        self.add_interface(nat.outside_interface)
+        add(', "src": {"type": ')
+        add(get_json(nat.src_type))
+        add(', "inside": ')
+        self.add_address(nat.inside_src, set())
+        add(', "mapped": ')
+        self.add_address(nat.outside_src, set())
+        add(', "fallback": ')
+        add(get_json(natwriter.get_fallback_addr(nat)))
+        add('}, "dest": ')
+        if nat.dest_type == None:
+            add('null')
+        else:
+            add('{"type": ')
+            add(get_json(nat.dest_type))
+            add(', "inside": ')
+            self.add_address(nat.inside_dest, set())
+            add(', "mapped": ')
+            self.add_address(nat.outside_dest, set())
+            add('}')
+        add(', "service": ')
+        if nat.inside_service == None and nat.outside_service == None:
+            add('null')
+        else:
+            add('{"protocol": ')
+            add(get_json(natwriter.get_service_protocol(nat)))
+            add(', "inside": ')
+            self.add_service(nat.inside_service, set())
+            add(', "mapped": ')
+            self.add_service(nat.outside_service, set())
+            add('}')
+        add(', "after_auto": ')
+        add(get_json(nat.after_auto))
+        add(', "unidirectional": ')
+        add(get_json(nat.unidirectional))
+        add(', "no_proxy_arp": ')
+        add(get_json(nat.no_proxy_arp))
+        add(', "route_lookup": ')
+        add(get_json(nat.route_lookup))
+        add('}\n')
+        self.records += 1
+        if self.records >= self.batch_records:
+            self.flush()
+
+    # Returns True if the src and dest of the given nat map to themselves,
+    # as NATWriter.is_identity_row does for rows.
+    def is_identity(self, nat):
+        for inside, mapped in ((nat.inside_src, nat.outside_src),
+                               (nat.inside_dest, nat.outside_dest)):
+            if (natwriter.get_object_name(inside)
+                != natwriter.get_object_name(mapped)
+                or natwriter.get_object_addr(inside)
+                != natwriter.get_object_addr(mapped)):
+                return False
+        return True
+
+    def add_interface(self, interface):
+        add = self.buffer.append
+        if not isinstance(interface, device.Interface):
+            add(get_json(interface))
+            return
+        add('{"name": ')
+        add(get_json(interface.custom_name))
+        add(', "interface": ')
+        add(get_json(interface.name))
+        add(', "addr": ')
+        add(get_json(natwriter.get_interface_addr(interface)))
+        add('}')
+
+    # Adds an address, which may be an Addr, an [Addr, Addr] range, a network
+    # object or group, an (Object, cidr) group member or a keyword such as
+    # 'any' or 'interface'. seen holds the ids of the groups being written so
+    # a group nested in itself is written by name only.
+    def add_address(self, value, seen):
+        add = self.buffer.append
+        if isinstance(value, tuple):
+            value = value[0]                    # ( Object(), cidr )
+        if isinstance(value, (device.Addr, list)):
+            add('{"addr": ')
+            add(get_json(natwriter.get_addr(value)))
+            add(', "ranges": ')
+            self.add_ranges(device.get_ranges(value, set()))
+            add('}')
+        elif isinstance(value, device.Object):
+            add('{"name": ')
+            add(get_json(value.name))
+            add(', "type": ')
+            add(get_json(value.type))
+            if value.type == device.ObjectType.NETWORK_GROUP:
+                self.add_members(value, seen, self.add_address)
+            else:
+                add(', "addr": ')
+                add(get_json(natwriter.get_object_addr(value)))
+            add(', "ranges": ')
+            self.add_ranges(value.ranges())
+            add('}')
+        else:
+            add(get_json(value))
+
+    # Adds a service object or group, or a service name or port keyword.
+    def add_service(self, value, seen):
+        add = self.buffer.append
+        if not isinstance(value, device.Object):
+            add(get_json(value))
+            return
+        add('{"name": ')
+        add(get_json(value.name))
+        add(', "type": ')
+        add(get_json(value.type))
+        if value.type == device.ObjectType.SERVICE_GROUP:
+            self.add_members(value, seen, self.add_service)
+        else:
+            add(', "protocol": ')
+            add(get_json(value.protocol))
+            add(', "src_port": ')
+            self.add_port(value.src_op, value.src_port)
+            add(', "dest_port": ')
+            self.add_port(value.dest_op, value.dest_port)
+        add('}')
+
+    # Adds the members of a group with the given add function.
+    def add_members(self, group, seen, add_member):
+        add = self.buffer.append
+        add(', "members": [')
+        if id(group) not in seen:
+            seen.add(id(group))
+            for index, item in enumerate(group.items):
+                if index > 0:
+                    add(', ')
+                add_member(item, seen)
+            seen.discard(id(group))
+        add(']')
+
+    def add_port(self, op, port):
+        add = self.buffer.append
+        if port == None:
+            add('null')
+            return
+        add('{"op": ')
+        add(get_json(op))
+        if isinstance(port, list):
+            add(', "start": ')
+            add(get_json(port[0]))
+            add(', "end": ')
+            add(get_json(port[1]))
+        else:
+            add(', "port": ')
+            add(get_json(port))
+        add('}')
+
+    # Adds (start, end) integer ranges as [start address, end address] pairs.
+    def add_ranges(self, ranges):
+        add = self.buffer.append
+        add('[')
+        for index, (start, end) in enumerate(ranges):
+            if index > 0:
+                add(', ')
+            add('["')
+            add(iptools.int_to_addr(start))
+            add('", "')
+            add(iptools.int_to_addr(end))
+            add('"]')
+        add(']')
+
+    # Writes the buffered records to the file.
+    def flush(self):
+        if len(self.buffer) > 0:
+            self.file.write(''.join(self.buffer))
+        self.buffer = []
+        self.records = 0
+
+
+################################################################################
+
+
+# Returns the json text of a scalar value. Values other than None, booleans
+# and integers are written as strings.
+def get_json(value):
+    if value == None:
+        return 'null'
+    elif value is True:
+        return 'true'
+    elif value is False:
+        return 'false'
+    elif isinstance(value, int):
+        return str(value)
+    return json.dumps(value if isinstance(value, str) else str(value))
+
+
+################################################################################
@@ -0,0 +1,79 @@
+################################################################################
+# natoverlapwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import iptools
+from cisxp import csvwriter
+from cisxp import natanalysis
+
+
+################################################################################
+
+
+# Writes the overlapping and shadowed nat rules of each device.
+class NATOverlapWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'kind',
+            'rule',
+            'inside intf name',
+            'mapped intf name',
+            'range',
+            'other rule',
+            'other inside intf name',
+            'other mapped intf name',
+            'other range',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'               : 'Hostname',
+            'kind'                   : 'Kind',
+            'rule'                   : 'Rule',
+            'inside intf name'       : 'Inside Intf Name',
+            'mapped intf name'       : 'Mapped Intf Name',
+            'range'                  : 'Range',
+            'other rule'             : 'Other Rule',
+            'other inside intf name' : 'Other Inside Intf Name',
+            'other mapped intf name' : 'Other Mapped Intf Name',
+            'other range'            : 'Other Range',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        analysis = natanalysis.NATAnalysis(self.device)
+        for kind, rule, range, other, other_range in analysis.analyze():
+            self.rows.append({
+                'hostname'               : self.device.hostname,
+                'kind'                   : kind,
+                'rule'                   : rule.name(),
+                'inside intf name'       : rule.inside_interface,
+                'mapped intf name'       : rule.outside_interface,
+                'range'                  : self.get_range(range),
+                'other rule'             : other.name(),
+                'other inside intf name' : other.inside_interface,
+                'other mapped intf name' : other.outside_interface,
+                'other range'            : self.get_range(other_range),
+            })
+
+    def get_range(self, range):
+        start, end = range
+        if start == end:
+            return iptools.int_to_addr(start)
+        return f'{iptools.int_to_addr(start)} - {iptools.int_to_addr(end)}'
+
+
+################################################################################
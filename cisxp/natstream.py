@@ -0,0 +1,217 @@
+################################################################################
+# natstream.py
+################################################################################
+
+
+import re
+
+
+from cisxp import ciscoparser
+from cisxp import device
+
+
+################################################################################
+
+
+# Nat attributes that may reference named objects.
+NAT_OBJECT_ATTRS = (
+    'inside_src',
+    'outside_src',
+    'inside_dest',
+    'outside_dest',
+    'inside_service',
+    'outside_service',
+)
+
+
+################################################################################
+
+
+# A nat waiting for objects defined later in the configuration.
+class PendingNAT():
+    def __init__(self, nat, object, unresolved, errors):
+        self.nat = nat
+        self.object = object            # network object of an auto nat
+        self.unresolved = unresolved    # maps names to placeholder lists
+        self.errors = errors            # (name, error) of unresolved names
+
+
+################################################################################
+
+
+# Parses a configuration and passes each nat rule to emit as soon as every
+# object it references is known, instead of building a complete Device
+# first. emit is called as emit(device, nat, object) where object is the
+# network object of an auto nat or None for a manual nat.
+#
+# Only interfaces and objects, which later nat rules may reference, are kept.
+# Nat rules are released once emitted and access lists and routes are not
+# parsed at all. A nat referencing an object that is not yet defined is held
+# until the object appears. A new ': Saved', 'ASA Version' or hostname line
+# starts a new device, as in multi context dumps, releasing the objects of
+# the previous one, which nothing can reference anymore. Held nat rules are
+# then emitted with placeholder objects, as a complete parse would.
+#
+# Rows are emitted in configuration order rather than in NATWriter order of
+# auto nat rules first. The 'not found' errors of objects a held nat waits
+# for are held with it and reported only if the object is still undefined
+# when the device ends.
+class NATStreamParser(ciscoparser.CiscoParser):
+    not_found_re = re.compile(r'(?:Network|Service) object "(.*)" not found\.')
+
+    def __init__(self, emit):
+        super().__init__()
+        self.emit = emit
+        self.reference_errors = []  # (name, error) of the nat being parsed
+        self.pending = {}           # maps object names to PendingNAT list
+        self.nats_emitted = 0
+        self.devices_parsed = 0
+
+    def parse(self, filename=None):
+        if filename != None:
+            self.open(filename)
+
+        # maps tokens to parser methods
+        token_map = [
+            (('interface',),    self.parse_interface),
+            (('name',),         self.parse_object),
+            (('object',),       self.parse_object),
+            (('object-group',), self.parse_object),
+            (('nat',),          self.parse_nat),
+            (('hostname',),     self.set_hostname),
+            ((':', 'Saved'),    self.start_device),
+            (('ASA', 'Version'), self.start_device),
+        ]
+
+        self.parse_map(token_map)
+        self.finish_device()
+        return self.device
+
+    def parse_object(self):
+        if self.indent != 0:
+            return
+        object = self.get_or_add_object()
+        parser = ciscoparser.ObjectSubparser(self, object)
+        parser.parse()
+        self.resolve(object)
+        if object.nat != None:
+            self.add_nat(object.nat, object)
+        else:
+            self.report_reference_errors()
+
+    def parse_nat(self):
+        if self.indent != 0:
+            return
+        parser = ciscoparser.NATSubparser(self)
+        self.add_nat(parser.parse())
+
+    def set_hostname(self):
+        if self.device.hostname not in (None, self.token_at(1)):
+            self.start_device()
+        super().set_hostname()
+
+    # Starts a new device unless nothing has been parsed into the current one.
+    def start_device(self):
+        if (self.device.hostname == None and len(self.device.objects) == 0
+            and len(self.device.interfaces) == 0):
+            return
+        self.finish_device()
+        self.device = device.Device()
+
+    # Emits the nat rules still waiting for objects with their placeholders
+    # and reports the errors of the objects they wait for.
+    def finish_device(self):
+        self.report_reference_errors()
+        pending = {}
+        for entries in self.pending.values():
+            for entry in entries:
+                pending[id(entry)] = entry
+        self.pending = {}
+        for entry in pending.values():
+            self.errors.extend(error for _name, error in entry.errors)
+            self.emit_nat(entry.nat, entry.object)
+        self.devices_parsed += 1
+
+    # Holds back the error of an object that is not found, since it may be
+    # defined later; add_nat decides whether to report it.
+    def error(self, msg):
+        match = self.not_found_re.fullmatch(msg)
+        if match == None:
+            super().error(msg)
+            return
+        errors, self.errors = self.errors, []
+        super().error(msg)
+        self.reference_errors.append((match.group(1), self.errors[0]))
+        self.errors = errors
+
+    # Emits the given nat or holds it until its objects are defined.
+    def add_nat(self, nat, object=None):
+        unresolved = get_unresolved(self.device, nat)
+        errors = [(name, error) for name, error in self.reference_errors
+                  if name in unresolved]
+        self.reference_errors = [(name, error) for name, error
+                                 in self.reference_errors
+                                 if name not in unresolved]
+        self.report_reference_errors()
+        if len(unresolved) == 0:
+            self.emit_nat(nat, object)
+            return
+        entry = PendingNAT(nat, object, unresolved, errors)
+        for name in unresolved:
+            self.pending.setdefault(name, []).append(entry)
+
+    # Reports the held errors no held nat waits on.
+    def report_reference_errors(self):
+        self.errors.extend(error for _name, error in self.reference_errors)
+        self.reference_errors = []
+
+    # Emits the given nat and releases it.
+    def emit_nat(self, nat, object):
+        self.emit(self.device, nat, object)
+        self.nats_emitted += 1
+        if object != None and object.nat is nat:
+            object.nat = None
+
+    # Links the nat rules waiting for the given object to it and emits those
+    # that no longer wait for any object.
+    def resolve(self, object):
+        for entry in self.pending.pop(object.name, []):
+            placeholders = entry.unresolved.pop(object.name)
+            entry.errors = [(name, error) for name, error in entry.errors
+                            if name != object.name]
+            for attr in NAT_OBJECT_ATTRS:
+                value = getattr(entry.nat, attr)
+                if any(value is placeholder for placeholder in placeholders):
+                    setattr(entry.nat, attr, object)
+            if len(entry.unresolved) == 0:
+                self.emit_nat(entry.nat, entry.object)
+
+
+################################################################################
+
+
+# Returns a dict mapping the names of the objects referenced by the given nat
+# but not defined in the device to the list of placeholder objects the nat
+# parser created for them.
+def get_unresolved(dev, nat):
+    unresolved = {}
+    interface = nat.outside_interface
+    for attr in NAT_OBJECT_ATTRS:
+        object = getattr(nat, attr)
+        if not isinstance(object, device.Object):
+            continue
+        name = object.name
+        if (name == None and object.type == device.ObjectType.SERVICE
+            and object.protocol == None):
+            name = object.src_port          # unknown manual nat service
+        if name == None or name == 'any':
+            continue
+        if (isinstance(interface, device.Interface)
+            and name == interface.custom_name):
+            continue                        # interface pat address
+        if dev.get_object(name) is not object:
+            unresolved.setdefault(name, []).append(object)
+    return unresolved
+
+
+################################################################################
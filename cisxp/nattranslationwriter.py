@@ -0,0 +1,113 @@
+################################################################################
+# nattranslationwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import iptools
+from cisxp import csvwriter
+from cisxp import metrics
+from cisxp import natengine
+
+
+################################################################################
+
+
+# Writes the translation of each flow of a batch of flows by the nat rules of
+# every device. Flows are read in a single pass and only translated flows are
+# written.
+class NATTranslationWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+        self.engines = []
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'src',
+            'src port',
+            'dest',
+            'dest port',
+            'protocol',
+            'ingress',
+            'egress',
+            'direction',
+            'rule',
+            'mapped src',
+            'mapped src port',
+            'mapped dest',
+            'mapped dest port',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'         : 'Hostname',
+            'src'              : 'Src',
+            'src port'         : 'Src Port',
+            'dest'             : 'Dest',
+            'dest port'        : 'Dest Port',
+            'protocol'         : 'Protocol',
+            'ingress'          : 'Ingress',
+            'egress'           : 'Egress',
+            'direction'        : 'Direction',
+            'rule'             : 'Rule',
+            'mapped src'       : 'Mapped Src',
+            'mapped src port'  : 'Mapped Src Port',
+            'mapped dest'      : 'Mapped Dest',
+            'mapped dest port' : 'Mapped Dest Port',
+        }
+
+    # Adds the nat rules of a device to translate flows with.
+    def add_device(self, device):
+        self.engines.append(natengine.NATEngine(device))
+
+    # Translates and writes each flow read from the given file object. Lines
+    # with an invalid address are reported in errors and skipped.
+    def write_flows(self, flows_file, errors):
+        for flow in natengine.read_flows(flows_file, errors):
+            self.write_flow(*flow)
+        for engine in self.engines:
+            metrics.registry.add('cache_hits', engine.cache_hits,
+                                 ('cache', 'nat translate'))
+
+    # Translates and writes the given flow. Raises ValueError if src or dest
+    # is not a valid address.
+    def write_flow(self, src, dest, protocol, src_port, dest_port, ingress,
+                   egress):
+        for addr in (src, dest):
+            if not iptools.is_host_addr(addr):
+                raise ValueError(f'Invalid address "{addr}".')
+        src_value = iptools.addr_to_int(src)
+        dest_value = iptools.addr_to_int(dest)
+        protocol_value = iptools.protocol_to_int(protocol)
+        src_port_value = iptools.port_to_int(src_port)
+        dest_port_value = iptools.port_to_int(dest_port)
+        for engine in self.engines:
+            translation = engine.translate(src_value, dest_value,
+                                           protocol_value, src_port_value,
+                                           dest_port_value, ingress, egress)
+            if translation == None:
+                continue
+            rule, direction, mapped_src, mapped_src_port, mapped_dest, \
+                mapped_dest_port = translation
+            self.write_row({
+                'hostname'         : engine.device.hostname,
+                'src'              : src,
+                'src port'         : src_port,
+                'dest'             : dest,
+                'dest port'        : dest_port,
+                'protocol'         : protocol,
+                'ingress'          : ingress,
+                'egress'           : egress,
+                'direction'        : direction,
+                'rule'             : rule.name(),
+                'mapped src'       : iptools.int_to_addr(mapped_src),
+                'mapped src port'  : mapped_src_port,
+                'mapped dest'      : iptools.int_to_addr(mapped_dest),
+                'mapped dest port' : mapped_dest_port,
+            })
+
+
+################################################################################
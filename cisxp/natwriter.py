@@ -8,13 +8,28 @@ import sys
 
 from cisxp import device
 from cisxp import csvwriter
+from cisxp import memprofile
+from cisxp import metrics
+from cisxp import trace
 
 
 ################################################################################
 
 
+# Writes a row per nat rule. Only the columns in cols are computed, so a
+# writer given a few columns with select_cols skips the lookups of the others;
+# the columns compared to skip identity nats are computed when a row is
+# checked, and only until one differs.
 class NATWriter(csvwriter.CSVWriter):
-    def __init__(self, file=sys.stdout):
+    # (inside, mapped) columns that are equal in the rows of identity nats.
+    IDENTITY_COLS = [
+        ('inside src name', 'mapped src name'),
+        ('inside src addr', 'mapped src addr'),
+        ('inside dest name', 'mapped dest name'),
+        ('inside dest addr', 'mapped dest addr'),
+    ]
+
+    def __init__(self, file=sys.stdout, cols=None):
         super().__init__(file)
 
         # Column identifiers.
@@ -81,150 +96,241 @@ class NATWriter(csvwriter.CSVWriter):
             'route lookup'          : 'Route-Lookup',
         }
 
+        # Maps the identifiers of the columns taken from a nat to functions
+        # returning the value of the column for a nat.
+        self.col_values = {
+            'inside intf name' : lambda nat:
+                get_interface_name(nat.inside_interface),
+            'mapped intf name' : lambda nat:
+                get_interface_name(nat.outside_interface),
+            'inside intf addr' : lambda nat:
+                get_interface_addr(nat.inside_interface),
+            'mapped intf addr' : lambda nat:
+                get_interface_addr(nat.outside_interface),
+            'src type' : lambda nat: nat.src_type,
+            'inside src name' : lambda nat: get_object_name(nat.inside_src),
+            'mapped src name' : lambda nat: get_object_name(nat.outside_src),
+            'inside src addr' : lambda nat: get_object_addr(nat.inside_src),
+            'mapped src addr' : lambda nat: get_object_addr(nat.outside_src),
+            'fallback addr' : get_fallback_addr,
+            'dest type' : lambda nat: nat.dest_type,
+            'inside dest name' : lambda nat: get_object_name(nat.inside_dest),
+            'mapped dest name' : lambda nat: get_object_name(nat.outside_dest),
+            'inside dest addr' : lambda nat: get_object_addr(nat.inside_dest),
+            'mapped dest addr' : lambda nat: get_object_addr(nat.outside_dest),
+            'srv protocol' : get_service_protocol,
+            'inside srv name' : lambda nat:
+                get_service_name(nat.inside_service),
+            'inside srv src port' : lambda nat:
+                get_src_port(nat.inside_service),
+            'inside srv dest port' : lambda nat:
+                get_dest_port(nat.inside_service),
+            'mapped srv name' : lambda nat:
+                get_service_name(nat.outside_service),
+            'mapped srv src port' : lambda nat:
+                get_src_port(nat.outside_service),
+            'mapped srv dest port' : lambda nat:
+                get_dest_port(nat.outside_service),
+            'after auto' : lambda nat: get_boolean(nat.after_auto),
+            'unidirectional' : lambda nat: get_boolean(nat.unidirectional),
+            'no proxy arp' : lambda nat: get_boolean(nat.no_proxy_arp),
+            'route lookup' : lambda nat: get_boolean(nat.route_lookup),
+        }
+
+        self.nat_cols = []      # (col, value function) of selected nat cols
+        self.select_cols(cols if cols != None else self.cols)
+
+    # Limits the columns written and computed to the given column
+    # identifiers or display names, in the given order. Raises a ValueError
+    # for an unknown column.
+    def select_cols(self, names):
+        cols = []
+        for name in names:
+            col = self.get_col(name)
+            if col == None:
+                raise ValueError(f'Unknown column "{name.strip()}".')
+            cols.append(col)
+        self.cols = cols
+        self.nat_cols = [(col, self.col_values[col]) for col in cols
+                         if col in self.col_values]
+
+    # Returns the column identifier of the given column identifier or display
+    # name, ignoring case, or None.
+    def get_col(self, name):
+        name = name.strip().lower()
+        for col, col_name in self.col_names.items():
+            if name == col or name == col_name.lower():
+                return col
+        return None
+
     def write(self, device):
         self.device = device
         self.rows = []
-        self.populate_rows()
+        with trace.tracer.span('nat', hostname=device.hostname):
+            with trace.tracer.span('render'):
+                self.populate_rows()
+            memprofile.profiler.checkpoint('render')
+            with trace.tracer.span('write'):
+                self.write_rows()
+            memprofile.profiler.checkpoint('write')
+
+    # Writes the row of a single nat, or of the auto nat of the given object,
+    # of the given device.
+    def write_nat(self, device, nat, object=None):
+        self.device = device
+        self.rows = []
+        self.add_nat_row(nat, object)
+        self.count_rows(len(self.rows), 1 - len(self.rows))
         self.write_rows()
+        self.rows = []
 
+    # Rows are counted here and in write_nat, which produce the rows of the
+    # report, and not in add_nat_row, which the snapshot and sqlite sinks
+    # also use to build their rows.
     def populate_rows(self):
-        self.fill_auto_nat_objects()
+        rows = len(self.rows)
+        skipped = self.fill_auto_nat_objects()
+        self.count_rows(len(self.rows) - rows, skipped)
 
+    # Adds the rows of the auto nats, then the manual nats, of the device.
+    # Returns the number of identity nats skipped.
     def fill_auto_nat_objects(self):
+        skipped = 0
         network_objects = [obj for obj in self.device.objects if obj.nat != None]
         for object in network_objects:
-            self.row = {}                        # reset row
-            self.fill_auto_nat_object(object)     # add auto nat object
-            if (self.row['inside src name'] == self.row['mapped src name']
-                and self.row['inside src addr'] == self.row['mapped src addr']
-                and self.row['inside dest name'] == self.row['mapped dest name']
-                and self.row['inside dest addr'] == self.row['mapped dest addr']):
-                continue
-            self.rows.append(self.row)
+            if not self.add_nat_row(object.nat, object):
+                skipped += 1
         for nat in self.device.nats:
             if nat == None:
                 continue
-            self.row = {}
+            if not self.add_nat_row(nat):
+                skipped += 1
+        return skipped
+
+    def count_rows(self, written, skipped):
+        metrics.registry.add('nat_rows_written', written)
+        metrics.registry.add('identity_nats_skipped', skipped)
+
+    # Adds a row for the given nat, or the auto nat of the given object, to
+    # rows. Returns False if the nat translates nothing and is skipped.
+    def add_nat_row(self, nat, object=None):
+        self.row = {}                            # reset row
+        if object != None:
+            self.fill_auto_nat_object(object)    # add auto nat object
+        else:
             self.row['hostname'] = self.device.hostname
             self.set_interface_cols(nat)
-            if (self.row['inside src name'] == self.row['mapped src name']
-                and self.row['inside src addr'] == self.row['mapped src addr']
-                and self.row['inside dest name'] == self.row['mapped dest name']
-                and self.row['inside dest addr'] == self.row['mapped dest addr']):
-                continue
-            self.rows.append(self.row)
+        if self.is_identity_row(self.row, nat):
+            return False
+        self.rows.append(self.row)
+        return True
+
+    # Returns True if the src and dest of the given row of the given nat map
+    # to themselves. Identity columns missing from the row are computed from
+    # the nat and added to it.
+    def is_identity_row(self, row, nat=None):
+        for inside, mapped in self.IDENTITY_COLS:
+            if (self.get_row_value(row, nat, inside)
+                != self.get_row_value(row, nat, mapped)):
+                return False
+        return True
+
+    # Returns the value of a nat column of the row, computing it if needed.
+    def get_row_value(self, row, nat, col):
+        if col not in row and nat != None:
+            row[col] = self.col_values[col](nat)
+        return row.get(col)
 
     def fill_auto_nat_object(self, object):
         self.row['hostname'] = self.device.hostname
         self.row['object'] = object.name
         self.set_interface_cols(object.nat)
 
+    # Sets the value of each selected nat column of the row.
     def set_interface_cols(self, nat):
         if nat == None: return
-        self.row.update({
-            'inside intf name' : self.get_interface_name(nat.inside_interface),
-            'mapped intf name' : self.get_interface_name(nat.outside_interface),
-            'inside intf addr' : self.get_interface_addr(nat.inside_interface),
-            'mapped intf addr' : self.get_interface_addr(nat.outside_interface),
-            'src type' : nat.src_type,
-            'inside src name' : self.get_object_name(nat.inside_src),
-            'mapped src name' : self.get_object_name(nat.outside_src),
-            'inside src addr' : self.get_object_addr(nat.inside_src),
-            'mapped src addr' : self.get_object_addr(nat.outside_src),
-            'fallback addr' : self.get_fallback_addr(nat),
-            'dest type' : nat.dest_type,
-            'inside dest name' : self.get_object_name(nat.inside_dest),
-            'mapped dest name' : self.get_object_name(nat.outside_dest),
-            'inside dest addr' : self.get_object_addr(nat.inside_dest),
-            'mapped dest addr' : self.get_object_addr(nat.outside_dest),
-            'srv protocol' : self.get_service_protocol(nat),
-            'inside srv name' : self.get_service_name(nat.inside_service),
-            'inside srv src port' : self.get_src_port(nat.inside_service),
-            'inside srv dest port' : self.get_dest_port(nat.inside_service),
-            'mapped srv name' : self.get_service_name(nat.outside_service),
-            'mapped srv src port' : self.get_src_port(nat.outside_service),
-            'mapped srv dest port' : self.get_dest_port(nat.outside_service),
-            'after auto' : self.get_boolean(nat.after_auto),
-            'unidirectional' : self.get_boolean(nat.unidirectional),
-            'no proxy arp' : self.get_boolean(nat.no_proxy_arp),
-            'route lookup' : self.get_boolean(nat.route_lookup),
-        })
-
-    # Returns an interface name string regardless of interface class type.
-    def get_interface_name(self, interface):
-        if isinstance(interface, device.Interface):
-            return interface.custom_name
-        else:
-            return interface
+        for col, get_value in self.nat_cols:
+            self.row[col] = get_value(nat)
 
-    def get_object_name(self, object):
-        if isinstance(object, device.Object):
-            return object.name
-        else:
-            return object
-
-    def get_service_name(self, service):
-        if isinstance(service, device.Object):
-            if service.type == device.ObjectType.SERVICE:
-                return service.name
-
-    def get_service_protocol(self, nat):
-        if isinstance(nat, device.Object):
-            if nat.type == device.ObjectType.SERVICE:
-                return nat.protocol
-        elif isinstance(nat.service_protocol, str):
-            return nat.service_protocol
-        elif nat.inside_service != None:
-            return self.get_service_protocol(nat.inside_service)
-        else:
-            return nat.service_protocol
 
-    def get_src_port(self, service):
-        if isinstance(service, device.Object):
-            return self.get_port(service.src_port)
+################################################################################
 
-    def get_dest_port(self, service):
-        if isinstance(service, device.Object):
-            return self.get_port(service.dest_port)
 
-    def get_port(self, port):
-        if isinstance(port, list):
-            return f'{port[0]} - {port[1]}'
-        else:
-            return port
+# Returns an interface name string regardless of interface class type.
+def get_interface_name(interface):
+    if isinstance(interface, device.Interface):
+        return interface.custom_name
+    else:
+        return interface
 
-    def get_interface_addr(self, interface):
-        if isinstance(interface, device.Interface):
-            return self.get_addr(interface.primary_addr())
-        else:
-            return interface
-
-    def get_object_addr(self, object):
-        if isinstance(object, device.Object):
-            if object.addr != None:
-                return self.get_addr(object.addr)
-            elif object.fqdn != None:
-                return object.fqdn
-        else:
-            return object
+def get_object_name(object):
+    if isinstance(object, device.Object):
+        return object.name
+    else:
+        return object
 
-    def get_fallback_addr(self, nat):
-        if isinstance(nat, device.NAT):
-            if nat.fallback:
-                return self.get_interface_addr(nat.outside_interface)
-        else:
-            return nat
+def get_service_name(service):
+    if isinstance(service, device.Object):
+        if service.type == device.ObjectType.SERVICE:
+            return service.name
 
-    def get_addr(self, addr):
-        if isinstance(addr, device.Addr):
-            return str(addr)
-        elif isinstance(addr, list):
-            return f'{self.get_addr(addr[0])} - {self.get_addr(addr[1])}'
-        else:
-            return addr
+def get_service_protocol(nat):
+    if isinstance(nat, device.Object):
+        if nat.type == device.ObjectType.SERVICE:
+            return nat.protocol
+    elif isinstance(nat.service_protocol, str):
+        return nat.service_protocol
+    elif nat.inside_service != None:
+        return get_service_protocol(nat.inside_service)
+    else:
+        return nat.service_protocol
+
+def get_src_port(service):
+    if isinstance(service, device.Object):
+        return get_port(service.src_port)
+
+def get_dest_port(service):
+    if isinstance(service, device.Object):
+        return get_port(service.dest_port)
+
+def get_port(port):
+    if isinstance(port, list):
+        return f'{port[0]} - {port[1]}'
+    else:
+        return port
+
+def get_interface_addr(interface):
+    if isinstance(interface, device.Interface):
+        return get_addr(interface.primary_addr())
+    else:
+        return interface
+
+def get_object_addr(object):
+    if isinstance(object, device.Object):
+        if object.addr != None:
+            return get_addr(object.addr)
+        elif object.fqdn != None:
+            return object.fqdn
+    else:
+        return object
+
+def get_fallback_addr(nat):
+    if isinstance(nat, device.NAT):
+        if nat.fallback:
+            return get_interface_addr(nat.outside_interface)
+    else:
+        return nat
+
+def get_addr(addr):
+    if isinstance(addr, device.Addr):
+        return str(addr)
+    elif isinstance(addr, list):
+        return f'{get_addr(addr[0])} - {get_addr(addr[1])}'
+    else:
+        return addr
 
-    def get_boolean(self, bool):
-        return bool if bool == True else None
+def get_boolean(bool):
+    return bool if bool == True else None
 
 
 ################################################################################
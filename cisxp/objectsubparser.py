@@ -26,6 +26,8 @@ class ObjectSubparser():
             (('object', 'network'),       self.parse_network_object),
             (('object', 'service'),       self.parse_service_object),
             (('object-group', 'network'), self.parse_network_object_group),
+            (('object-group', 'service'), self.parse_service_object_group),
+            (('object-group', 'protocol'), self.parse_protocol_object_group),
         ]
         self.parser.parse_map_once(token_map, stop, True)
         return self.object
@@ -62,6 +64,14 @@ class ObjectSubparser():
         parser = NetworkObjectGroupSubparser(self.parser, self.object)
         parser.parse()
 
+    def parse_service_object_group(self):
+        parser = ServiceObjectGroupSubparser(self.parser, self.object)
+        parser.parse()
+
+    def parse_protocol_object_group(self):
+        parser = ProtocolObjectGroupSubparser(self.parser, self.object)
+        parser.parse()
+
 
 ################################################################################
 
@@ -339,7 +349,7 @@ class NetworkObjectGroupSubparser():
             address = self.parser.device.get_object(name)
             if address == None:
                 address = name
-        self.object.add_item(device.Addr(address, cidr, 6))
+        self.object.add_item(device.Addr(address, cidr, type))
 
     # Adds an object item to network object group.
     def add_object(self):
@@ -397,3 +407,142 @@ class NetworkObjectGroupSubparser():
 
 
 ################################################################################
+
+
+class ServiceObjectGroupSubparser():
+    def __init__(self, parser, object=None):
+        self.parser = parser
+        self.object = object
+        if self.object == None:
+            self.object = device.Object()
+
+    def parse(self):
+        self.object.type = device.ObjectType.SERVICE_GROUP
+        self.object.name = self.parser.token_at(2)
+        if len(self.parser.tokens) > 3:          # tcp, udp or tcp-udp
+            self.object.protocol = self.parser.token_at(3)
+
+        stop = lambda: self.parser.indent == 0
+        token_map = [
+            (('port-object',),             self.add_port),
+            (('service-object', 'object'), self.add_object),
+            (('service-object',),          self.add_service),
+            (('group-object',),            self.add_group_object),
+            (('description',),             self.set_description),
+        ]
+        self.parser.next()
+        self.parser.parse_map(token_map, stop, True)
+        return self.object
+
+    # Regular expression to match port-object property.
+    port_re = re.compile(
+        r'\s*port-object\s+(eq|neq|lt|gt|range)\s+({name})(?:\s+({name}))?\s*'
+        .format(name=iptools.name_re.pattern)
+    )
+    # Adds a port item to service object group.
+    def add_port(self):
+        match = self.parser.re_match(self.port_re)
+        if match == None:
+            return
+        self.add_port_from_match(*match.groups())
+
+    # Adds a port item to service object group from port re match. Ports are
+    # added as service objects using the protocol of the group.
+    def add_port_from_match(self, op, port, end):
+        service = device.Object(type=device.ObjectType.SERVICE)
+        service.protocol = self.object.protocol
+        service.dest_op = op
+        service.dest_port = [port, end] if op == 'range' else port
+        self.object.add_item(service)
+
+    # Regular expression to match service-object property. The destination
+    # keyword is optional in older configurations.
+    service_re = re.compile(
+        r'\s*service-object\s+({name})'
+        r'(?:\s+source\s+(eq|neq|lt|gt|range)\s+({name})(?:\s+({name}))?)?'
+        r'(?:\s+(?:destination\s+)?(eq|neq|lt|gt|range)\s+({name})'
+        r'(?:\s+({name}))?)?.*'
+        .format(name=iptools.name_re.pattern)
+    )
+    # Adds a service item to service object group.
+    def add_service(self):
+        match = self.parser.re_match(self.service_re)
+        if match == None:
+            return
+        self.add_service_from_match(*match.groups())
+
+    # Adds a service item to service object group from service re match.
+    def add_service_from_match(self, protocol, src_op, src_port, src_end,
+                               dest_op, dest_port, dest_end):
+        service = device.Object(type=device.ObjectType.SERVICE)
+        parser = ServiceObjectSubparser(self.parser, service)
+        parser.set_service_from_match(protocol, src_op, src_port, src_end,
+                                      dest_op, dest_port, dest_end)
+        self.object.add_item(service)
+
+    # Adds a service object item to service object group.
+    def add_object(self):
+        object_name = self.parser.token_at(2)
+        object = self.parser.device.get_object(object_name)
+        if object == None:
+            object = object_name
+        self.object.add_item(object)
+
+    # Adds a group object item to service object group.
+    def add_group_object(self):
+        object_name = self.parser.token_at(1)
+        object = self.parser.device.get_object(object_name)
+        if object == None:
+            object = object_name
+        self.object.add_item(object)
+
+    # Sets service object group description.
+    def set_description(self):
+        self.object.description = self.parser.join_tokens(1)
+
+
+################################################################################
+
+
+class ProtocolObjectGroupSubparser():
+    def __init__(self, parser, object=None):
+        self.parser = parser
+        self.object = object
+        if self.object == None:
+            self.object = device.Object()
+
+    def parse(self):
+        self.object.type = device.ObjectType.PROTOCOL_GROUP
+        self.object.name = self.parser.token_at(2)
+
+        stop = lambda: self.parser.indent == 0
+        token_map = [
+            (('protocol-object',), self.add_protocol),
+            (('group-object',),    self.add_group_object),
+            (('description',),     self.set_description),
+        ]
+        self.parser.next()
+        self.parser.parse_map(token_map, stop, True)
+        return self.object
+
+    # Adds a protocol item to protocol object group. Protocols are added as
+    # service objects without ports.
+    def add_protocol(self):
+        service = device.Object(type=device.ObjectType.SERVICE)
+        service.protocol = self.parser.token_at(1)
+        self.object.add_item(service)
+
+    # Adds a group object item to protocol object group.
+    def add_group_object(self):
+        object_name = self.parser.token_at(1)
+        object = self.parser.device.get_object(object_name)
+        if object == None:
+            object = object_name
+        self.object.add_item(object)
+
+    # Sets protocol object group description.
+    def set_description(self):
+        self.object.description = self.parser.join_tokens(1)
+
+
+################################################################################
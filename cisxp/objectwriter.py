@@ -0,0 +1,97 @@
+################################################################################
+# objectwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import csvwriter
+from cisxp import device
+from cisxp import natwriter
+
+
+################################################################################
+
+
+# Writes the name, network and service objects of each device. Object groups
+# are written by GroupWriter.
+class ObjectWriter(csvwriter.CSVWriter):
+    # Object types written by this writer.
+    TYPES = (
+        device.ObjectType.NAME,
+        device.ObjectType.NETWORK,
+        device.ObjectType.SERVICE,
+    )
+
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'name',
+            'type',
+            'description',
+            'addr',
+            'protocol',
+            'src port',
+            'dest port',
+            'auto nat',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'    : 'Hostname',
+            'name'        : 'Name',
+            'type'        : 'Type',
+            'description' : 'Description',
+            'addr'        : 'Addr',
+            'protocol'    : 'Protocol',
+            'src port'    : 'Src Port',
+            'dest port'   : 'Dest Port',
+            'auto nat'    : 'Auto NAT',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        for object in self.device.objects:
+            if object.type in self.TYPES:
+                self.add_object_row(object)
+
+    def add_object_row(self, object):
+        self.row = {
+            'hostname'    : self.device.hostname,
+            'name'        : object.name,
+            'type'        : object.type,
+            'description' : object.description,
+            'addr'        : natwriter.get_object_addr(object),
+            'protocol'    : object.protocol,
+            'src port'    : get_port_condition(object.src_op,
+                                               object.src_port),
+            'dest port'   : get_port_condition(object.dest_op,
+                                               object.dest_port),
+            'auto nat'    : natwriter.get_boolean(object.nat != None),
+        }
+        self.rows.append(self.row)
+
+
+################################################################################
+
+
+# Returns a service port with its operator, such as 'eq https' or
+# 'range 1024 - 65535', or None if no port is set.
+def get_port_condition(op, port):
+    if port == None:
+        return None
+    if isinstance(port, list):
+        port = f'{port[0]} - {port[1]}'
+    return f'{op} {port}' if op != None else port
+
+
+################################################################################
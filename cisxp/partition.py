@@ -0,0 +1,197 @@
+################################################################################
+# partition.py
+################################################################################
+
+
+import json
+import os
+import re
+import threading
+import zlib
+
+
+################################################################################
+
+
+# A single output file of a partitioned report.
+class Shard():
+    def __init__(self, key, filename):
+        self.key = key
+        self.filename = filename
+        self.started = False        # file created and its header written
+        self.rows = 0               # rows reserved for this shard
+        self.bytes = 0              # bytes reserved for this shard
+        self.lock = threading.Lock()
+
+
+################################################################################
+
+
+# Splits the rows of a CSVWriter report over several files. Rows are
+# partitioned per device, so all rows of a device land in the same shard:
+#   hostname    one file per hostname
+#   hash        hostnames hashed into a fixed number of buckets
+#   rows        a new file once a file holds the given number of rows
+#   bytes       a new file once a file holds the given number of bytes
+#
+# Shard files are named after the report file with the shard key inserted
+# before the extension, such as nat.fw1.csv. write() may be called from
+# several threads at once: a shard is chosen, and its space reserved, under a
+# single lock, while the rows are written under the lock of that shard only,
+# so threads writing different shards do not wait for each other.
+#
+# A shard file is opened only while rows are written to it, created on the
+# first write and appended to afterwards, so the number of open files does
+# not grow with the number of shards. Files are written in ENCODING and sizes
+# are counted in bytes of that encoding.
+class PartitionedOutput():
+    HOSTNAME = 'hostname'
+    HASH = 'hash'
+    ROWS = 'rows'
+    BYTES = 'bytes'
+    MODES = (HOSTNAME, HASH, ROWS, BYTES)
+    ENCODING = 'utf-8'
+
+    def __init__(self, filename, writer_class, args=(), mode=HOSTNAME,
+                 size=None, manifest=False):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown partition mode "{mode}".')
+        if mode != self.HOSTNAME and (size == None or size <= 0):
+            raise ValueError(f'Partition mode "{mode}" requires a size.')
+        self.filename = filename
+        self.writer_class = writer_class
+        self.args = args            # extra writer arguments after file
+        self.mode = mode
+        self.size = size
+        self.manifest = manifest    # write a manifest of the shards on close
+        self.shards = {}            # maps shard keys to shards
+        self.current = None         # shard being filled in rows/bytes mode
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        writer = self.get_writer()
+        self.header = writer.format_row(writer.col_names)
+
+    # Returns the writer of the calling thread. Writers keep per device state,
+    # so each thread formats rows with its own writer.
+    def get_writer(self):
+        writer = getattr(self.local, 'writer', None)
+        if writer == None:
+            writer = self.local.writer = self.writer_class(None, *self.args)
+        return writer
+
+    # Writes the rows of the given device to its shard.
+    def write(self, device):
+        writer = self.get_writer()
+        writer.device = device
+        writer.rows = []
+        writer.populate_rows()
+        data = ''.join(writer.format_row(row) for row in writer.rows)
+        writer.rows = []
+        if data == '':
+            return
+        shard = self.reserve(device.hostname, data.count('\n'),
+                             len(data.encode(self.ENCODING)))
+        with shard.lock:
+            mode = 'a' if shard.started else 'w'
+            with open(shard.filename, mode, encoding=self.ENCODING) as file:
+                if not shard.started:
+                    file.write(self.header)
+                    shard.started = True
+                file.write(data)
+
+    # Returns the shard for rows of the given hostname and reserves the
+    # given number of rows and bytes in it.
+    def reserve(self, hostname, rows, size):
+        with self.lock:
+            if self.mode == self.HOSTNAME:
+                shard = self.get_shard(hostname or 'unknown')
+            elif self.mode == self.HASH:
+                bucket = zlib.crc32((hostname or '').encode('utf-8'))
+                shard = self.get_shard(f'{bucket % self.size:04d}')
+            else:
+                shard = self.current
+                used, amount = (0, 0)
+                if shard != None and self.mode == self.ROWS:
+                    used, amount = (shard.rows, rows)
+                elif shard != None:
+                    used, amount = (shard.bytes, size)
+                if shard == None or (used > 0 and used + amount > self.size):
+                    shard = self.get_shard(f'{len(self.shards):04d}')
+                    self.current = shard
+            shard.rows += rows
+            shard.bytes += size
+            return shard
+
+    def get_shard(self, key):
+        shard = self.shards.get(key)
+        if shard == None:
+            base, ext = os.path.splitext(self.filename)
+            name = re.sub(r'[^\w.-]', '_', key)
+            shard = Shard(key, f'{base}.{name}{ext}')
+            self.shards[key] = shard
+        return shard
+
+    # Writes the manifest. Shard files are closed after each write.
+    def close(self):
+        if self.manifest:
+            self.write_manifest()
+
+    # Writes a json manifest listing each shard file with its key, row count
+    # and size, next to the report file.
+    def write_manifest(self):
+        base, _ext = os.path.splitext(self.filename)
+        header_bytes = len(self.header.encode(self.ENCODING))
+        manifest = {
+            'report'    : self.filename,
+            'mode'      : self.mode,
+            'size'      : self.size,
+            'columns'   : self.get_writer().cols,
+            'shards'    : [
+                {
+                    'key'   : shard.key,
+                    'file'  : shard.filename,
+                    'rows'  : shard.rows,
+                    'bytes' : shard.bytes + header_bytes,
+                }
+                for shard in self.shards.values()
+            ],
+        }
+        with open(f'{base}.manifest.json', 'w') as file:
+            json.dump(manifest, file, indent=2)
+            file.write('\n')
+
+
+################################################################################
+
+
+# Parses a partition option of the form MODE or MODE:SIZE, such as hash:16,
+# rows:1000000 or bytes:64M, into a (mode, size) tuple. Raises a ValueError
+# for an unknown mode or a missing or invalid size.
+def parse_partition(value):
+    mode, _sep, size = value.partition(':')
+    if mode not in PartitionedOutput.MODES:
+        raise ValueError(f'Unknown partition mode "{mode}".')
+    if mode == PartitionedOutput.HOSTNAME:
+        if size != '':
+            raise ValueError(f'Partition mode "{mode}" takes no size.')
+        return (mode, None)
+    if size == '':
+        raise ValueError(f'Partition mode "{mode}" requires a size.')
+    try:
+        size = parse_size(size)
+    except ValueError:
+        raise ValueError(f'Invalid partition size "{size}".') from None
+    if size <= 0:
+        raise ValueError(f'Invalid partition size "{size}".')
+    return (mode, size)
+
+# Parses a size such as 1000, 512K, 256M or 2G into a number.
+def parse_size(value):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    scale = units.get(value[-1:].upper(), 1)
+    if scale != 1:
+        value = value[:-1]
+    return int(value) * scale
+
+
+################################################################################
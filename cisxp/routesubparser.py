@@ -0,0 +1,220 @@
+################################################################################
+# routesubparser.py
+################################################################################
+
+
+import re
+
+
+from cisxp import device
+from cisxp import iptools
+
+
+################################################################################
+
+
+# Parses static route configuration lines:
+#   route IFNAME NETWORK MASK GATEWAY [DISTANCE] [track N] [tunneled]
+#   ip route [vrf NAME] NETWORK MASK {INTERFACE [GATEWAY] | GATEWAY} [DISTANCE]
+class RouteSubparser():
+    def __init__(self, parser, vrf=None):
+        self.parser = parser
+        self.vrf = vrf         # vrf of the enclosing vrf stanza, if any
+
+    def parse(self):
+        if self.parser.match('route'):
+            route = self.parse_route()
+        elif self.parser.match('ip', 'route'):
+            route = self.parse_ip_route()
+        else:
+            return None
+        return route
+
+    # Parses an asa route line. The route is added to the vrf of its
+    # interface or to the default vrf.
+    def parse_route(self):
+        tokens = self.parser.tokens
+        if len(tokens) < 5 or not iptools.is_addr(tokens[2]):
+            return None        # ipv6 route
+        route = self.new_route(tokens[2], tokens[3])
+        route.interface_name = tokens[1]
+        route.next_hop = tokens[4]
+        if len(tokens) > 5 and tokens[5].isdigit():
+            route.distance = int(tokens[5])
+
+        interface = self.parser.device.get_interface_by_custom_name(tokens[1])
+        if self.vrf != None:
+            vrf = self.vrf
+        elif interface != None and interface.vrf != None:
+            vrf = interface.vrf
+        else:
+            vrf = self.parser.device.get_or_add_vrf(device.VRF.DEFAULT)
+        vrf.add_route(route)
+        return route
+
+    # Parses an ios or nx-os ip route line.
+    def parse_ip_route(self):
+        tokens = self.parser.tokens[2:]
+        vrf = self.vrf
+        if len(tokens) > 1 and tokens[0] == 'vrf':
+            vrf = self.parser.device.get_or_add_vrf(tokens[1])
+            tokens = tokens[2:]
+        if vrf == None:
+            vrf = self.parser.device.get_or_add_vrf(device.VRF.DEFAULT)
+        if len(tokens) < 2 or not iptools.is_addr(tokens[0]):
+            return None        # ipv6 route
+
+        if '/' in tokens[0]:   # nx-os prefix/len
+            addr, cidr = tokens[0].split('/')
+            route = self.new_route(addr, None, int(cidr))
+            tokens = tokens[1:]
+        else:
+            route = self.new_route(tokens[0], tokens[1])
+            tokens = tokens[2:]
+        if len(tokens) > 0 and not iptools.is_addr(tokens[0]):
+            route.interface_name = tokens[0]
+            tokens = tokens[1:]
+        if len(tokens) > 0 and iptools.is_addr(tokens[0]):
+            route.next_hop = tokens[0]
+            tokens = tokens[1:]
+        if len(tokens) > 0 and tokens[0].isdigit():
+            route.distance = int(tokens[0])
+        vrf.add_route(route)
+        return route
+
+    # Returns a new static route to the given network.
+    def new_route(self, addr, mask, cidr=None):
+        route = device.Route()
+        route.source = 'S'
+        if cidr == None:
+            cidr = iptools.mask_to_cidr(mask)
+        route.addr = device.Addr(addr, cidr)
+        route.distance = 1
+        route.metric = 0
+        return route
+
+
+################################################################################
+
+
+# Parses a vrf stanza and the static routes it holds:
+#   vrf context NAME, vrf definition NAME or ip vrf NAME
+class VRFSubparser():
+    def __init__(self, parser):
+        self.parser = parser
+        self.vrf = None
+
+    def parse(self):
+        name = self.parser.tokens[-1]
+        self.vrf = self.parser.device.get_or_add_vrf(name)
+        self.parser.next()
+
+        stop = lambda: self.parser.indent == 0
+        token_map = [
+            (('ip', 'route'), self.parse_route),
+        ]
+        self.parser.parse_map(token_map, stop, True)
+        return self.vrf
+
+    def parse_route(self):
+        parser = RouteSubparser(self.parser, self.vrf)
+        parser.parse()
+
+
+################################################################################
+
+
+# Parses the output of 'show route' or 'show ip route' into the routes of the
+# device vrfs. Parsing stops at the next command prompt or show tech section
+# header.
+class ShowRouteSubparser():
+    def __init__(self, parser):
+        self.parser = parser
+        self.vrf = None
+        self.route = None      # last route read, for ecmp continuation lines
+
+    # Regular expression to match the end of the command output.
+    stop_re = re.compile(r'-{3,}.*|\S+#.*')
+
+    def parse(self):
+        self.vrf = self.parser.device.get_or_add_vrf(device.VRF.DEFAULT)
+        self.parser.next()
+        stop = lambda: self.stop_re.match(self.parser.line) != None
+        self.parser.parse_map([], stop, True, default=self.parse_line)
+
+    # Regular expression to match a route line.
+    route_re = re.compile(
+        r'([A-Za-z]\*?(?:\s+(?:E1|E2|N1|N2|IA|EX|L1|L2|ia|su))?\*?)\s+'
+        r'{addr}(?:\s+{addr})?\s+'
+        r'(?:\[(\d+)/(\d+)\]\s+via\s+{addr}|is\s+directly\s+connected)'
+        r'(?:,\s*(.*))?'
+        .format(addr=iptools.addr_re.pattern)
+    )
+
+    # Regular expression to match an equal cost path continuation line.
+    next_hop_re = re.compile(
+        r'\s*\[(\d+)/(\d+)\]\s+via\s+{addr}(?:,\s*(.*))?'
+        .format(addr=iptools.addr_re.pattern)
+    )
+
+    # Regular expression to match an ios vrf table header.
+    vrf_re = re.compile(r'\s*Routing Table:\s+(\S+)\s*')
+
+    def parse_line(self):
+        line = self.parser.line
+        match = self.route_re.fullmatch(line)
+        if match != None:
+            self.add_route_from_match(*match.groups())
+            return
+        match = self.next_hop_re.fullmatch(line)
+        if match != None and self.route != None:
+            self.add_next_hop_from_match(*match.groups())
+            return
+        match = self.vrf_re.fullmatch(line)
+        if match != None:
+            self.vrf = self.parser.device.get_or_add_vrf(match.group(1))
+
+    # Adds a route from route re match groups.
+    def add_route_from_match(self, source, addr, cidr, mask, _mask_cidr,
+                             distance, metric, next_hop, _next_hop_cidr,
+                             rest):
+        route = device.Route()
+        route.source = ''.join(source.split())
+        if cidr != None:
+            route.addr = device.Addr(addr, int(cidr))
+        elif mask != None:
+            route.addr = device.Addr(addr, iptools.mask_to_cidr(mask))
+        else:
+            route.addr = device.Addr(addr)
+        route.next_hop = next_hop
+        route.distance = int(distance) if distance != None else 0
+        route.metric = int(metric) if metric != None else 0
+        self.set_interface_from_rest(route, rest)
+        self.vrf.add_route(route)
+        self.route = route
+
+    # Adds an equal cost path to the last route read from next hop re match
+    # groups.
+    def add_next_hop_from_match(self, distance, metric, next_hop,
+                                _next_hop_cidr, rest):
+        route = device.Route()
+        route.source = self.route.source
+        route.addr = self.route.addr
+        route.next_hop = next_hop
+        route.distance = int(distance)
+        route.metric = int(metric)
+        self.set_interface_from_rest(route, rest)
+        self.vrf.add_route(route)
+
+    # Sets the route interface and time stamp from the text following the
+    # next hop, i.e. '1d02h, inside' or 'inside'.
+    def set_interface_from_rest(self, route, rest):
+        if rest == None:
+            return
+        fields = [field.strip() for field in rest.split(',')]
+        route.interface_name = fields[-1]
+        if len(fields) > 1:
+            route.time_stamp = fields[-2]
+
+
+################################################################################
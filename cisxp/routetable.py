@@ -0,0 +1,131 @@
+################################################################################
+# routetable.py
+################################################################################
+
+
+from cisxp import device
+from cisxp import iptools
+from cisxp import metrics
+
+
+################################################################################
+
+
+# Longest prefix match table of a single vrf. Routes are kept in one hash
+# table per prefix length, mapping the integer network address to the best
+# route of that prefix, and a lookup probes the prefix lengths present in the
+# table from longest to shortest. A lookup costs at most one dict access per
+# distinct prefix length instead of a scan of every route.
+class RouteTable():
+    def __init__(self, routes=None):
+        self.prefixes = {}     # maps prefix length to {network: Route}
+        self.lengths = []      # prefix lengths present, longest first
+        self.cache = {}        # maps looked up addresses to routes
+        self.cache_hits = 0
+        if routes != None:
+            for route in routes:
+                self.add_route(route)
+
+    # Returns a table of the routes of the given vrf. Connected routes are
+    # added for the addresses of the device interfaces belonging to the vrf
+    # so directly attached networks resolve without 'show route' output.
+    def from_vrf(vrf, dev=None):
+        table = RouteTable(vrf.routes)
+        if dev == None:
+            return table
+        for interface in dev.interfaces:
+            if interface.vrf != None:
+                vrf_name = interface.vrf.name
+            else:
+                vrf_name = device.VRF.DEFAULT
+            if vrf_name != vrf.name:
+                continue
+            for addr in interface.addrs:
+                if addr.range() == None:
+                    continue
+                table.add_route(RouteTable.connected_route(interface, addr))
+        return table
+
+    # Returns a connected route for the given interface address.
+    def connected_route(interface, addr):
+        route = device.Route()
+        route.source = 'C'
+        network = iptools.int_to_addr(addr.range()[0])
+        route.addr = device.Addr(network, addr.cidr)
+        route.interface_name = interface.custom_name or interface.name
+        route.distance = 0
+        route.metric = 0
+        return route
+
+    # Adds a route to the table. When a prefix already has a route the one
+    # with the lower administrative distance and metric is kept.
+    def add_route(self, route):
+        range = route.addr.range() if route.addr != None else None
+        if range == None:
+            return
+        cidr = int(route.addr.cidr)
+        table = self.prefixes.get(cidr)
+        if table == None:
+            table = self.prefixes[cidr] = {}
+            self.lengths = sorted(self.prefixes, reverse=True)
+        current = table.get(range[0])
+        if (current == None
+            or self.preference(route) < self.preference(current)):
+            table[range[0]] = route
+        self.cache = {}
+
+    # Returns the sort key used to choose between routes to the same prefix.
+    def preference(self, route):
+        return (route.distance or 0, route.metric or 0)
+
+    # Returns the route with the longest prefix containing the given address
+    # or None if no route matches. addr is an integer or address string.
+    # Raises ValueError if addr is not a valid address.
+    def lookup(self, addr):
+        route = self.cache.get(addr, False)
+        if route is not False:
+            self.cache_hits += 1
+            return route
+        value = addr
+        if isinstance(addr, str):
+            if not iptools.is_host_addr(addr):
+                raise ValueError(f'Invalid address "{addr}".')
+            value = iptools.addr_to_int(addr)
+        route = None
+        for cidr in self.lengths:
+            mask = (0xffffffff << (32 - cidr)) & 0xffffffff
+            route = self.prefixes[cidr].get(value & mask)
+            if route != None:
+                break
+        self.cache[addr] = route
+        return route
+
+    # Returns a list of routes, one for each address in addrs.
+    def lookup_many(self, addrs):
+        lookup = self.lookup
+        return [lookup(addr) for addr in addrs]
+
+
+################################################################################
+
+
+# Returns a list of (vrf, addr, route) tuples with the route resolving each
+# address in addrs within each vrf of the given device. If vrf_name is given
+# only that vrf is searched.
+def lookup_routes(dev, addrs, vrf_name=None):
+    results = []
+    vrfs = dev.vrfs
+    if dev.get_vrf(device.VRF.DEFAULT) == None:
+        vrfs = [device.VRF(device.VRF.DEFAULT)] + vrfs
+    for vrf in vrfs:
+        if vrf_name != None and vrf.name != vrf_name:
+            continue
+        table = RouteTable.from_vrf(vrf, dev)
+        for addr, route in zip(addrs, table.lookup_many(addrs)):
+            results.append((vrf, addr, route))
+        metrics.registry.add('cache_hits', table.cache_hits,
+                             ('cache', 'route lookup'))
+    return results
+
+
+################################################################################
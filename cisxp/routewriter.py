@@ -0,0 +1,75 @@
+################################################################################
+# routewriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import routetable
+from cisxp import csvwriter
+
+
+################################################################################
+
+
+# Writes the route resolving each address of a batch of addresses within each
+# vrf of a device.
+class RouteWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout, addrs=None):
+        super().__init__(file)
+        self.addrs = addrs if addrs != None else []
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'vrf',
+            'addr',
+            'route',
+            'source',
+            'interface',
+            'next hop',
+            'distance',
+            'metric',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'  : 'Hostname',
+            'vrf'       : 'VRF',
+            'addr'      : 'Addr',
+            'route'     : 'Route',
+            'source'    : 'Source',
+            'interface' : 'Interface',
+            'next hop'  : 'Next Hop',
+            'distance'  : 'Distance',
+            'metric'    : 'Metric',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        for vrf, addr, route in routetable.lookup_routes(self.device,
+                                                         self.addrs):
+            self.row = {
+                'hostname' : self.device.hostname,
+                'vrf'      : vrf.name,
+                'addr'     : addr,
+            }
+            if route != None:
+                self.row.update({
+                    'route'     : str(route.addr),
+                    'source'    : route.source,
+                    'interface' : route.interface_name,
+                    'next hop'  : route.next_hop,
+                    'distance'  : route.distance,
+                    'metric'    : route.metric,
+                })
+            self.rows.append(self.row)
+
+
+################################################################################
@@ -0,0 +1,239 @@
+################################################################################
+# server.py
+################################################################################
+
+
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+
+from cisxp import ciscoparser
+from cisxp import intervalindex
+from cisxp import iptools
+from cisxp import natengine
+from cisxp import natwriter
+from cisxp import routetable
+
+
+################################################################################
+
+
+# Parsed devices kept in memory between requests. Files are reparsed only
+# when their modification time changes, and the per device lookup indexes are
+# built on first use and dropped when the device is reparsed.
+class FleetState():
+    def __init__(self):
+        self.devices = {}      # maps filename to (mtime, device, errors)
+        self.indexes = {}      # maps filename to (objects, nats, rules)
+        self.cache_hits = 0
+        self.lock = threading.Lock()
+
+    # Parses the given file unless it is unchanged since it was last parsed
+    # and returns its (device, errors).
+    def parse(self, filename):
+        filename = os.path.abspath(filename)
+        mtime = os.stat(filename).st_mtime
+        with self.lock:
+            entry = self.devices.get(filename)
+            if entry != None and entry[0] == mtime:
+                self.cache_hits += 1
+                return entry[1], entry[2]
+        parser = ciscoparser.CiscoParser()
+        device = parser.parse(filename)
+        parser.close()
+        with self.lock:
+            self.devices[filename] = (mtime, device, parser.errors)
+            self.indexes.pop(filename, None)
+        return device, parser.errors
+
+    # Reparses the cached devices whose files changed since they were parsed
+    # and drops those whose files were removed.
+    def refresh(self):
+        with self.lock:
+            filenames = list(self.devices)
+        for filename in filenames:
+            if os.path.exists(filename):
+                self.parse(filename)
+            else:
+                with self.lock:
+                    self.devices.pop(filename, None)
+                    self.indexes.pop(filename, None)
+
+    # Parses every file of the given directory.
+    def load(self, directory):
+        results = []
+        for file in sorted(os.listdir(directory)):
+            if file.startswith('.'):
+                continue
+            filename = os.path.abspath(os.path.join(directory, file))
+            device, errors = self.parse(filename)
+            results.append((filename, device, errors))
+        return results
+
+    # Returns a list of (filename, device) of the devices with the given
+    # hostname, or of every device if hostname is None. Changed files are
+    # reparsed first.
+    def get_devices(self, hostname=None):
+        self.refresh()
+        with self.lock:
+            entries = list(self.devices.items())
+        return [(filename, entry[1]) for filename, entry in entries
+                if hostname == None or entry[1].hostname == hostname]
+
+    # Returns the object and nat rule indexes of the given device file.
+    def get_indexes(self, filename, device):
+        with self.lock:
+            indexes = self.indexes.get(filename)
+        if indexes != None:
+            return indexes
+        objects = intervalindex.IntervalIndex()
+        for id, object in enumerate(device.objects):
+            for start, end in object.ranges():
+                objects.add(start, end, id)
+        rules = natengine.get_nat_rules(device)
+        nats = intervalindex.IntervalIndex()
+        for rule in rules:
+            for start, end in rule.inside_src + rule.outside_src:
+                nats.add(start, end, rule.id)
+        objects.build()
+        nats.build()
+        indexes = (objects, nats, rules)
+        with self.lock:
+            self.indexes[filename] = indexes
+        return indexes
+
+    # Returns the nat rows of the devices with the given hostname as csv.
+    def nat(self, hostname=None):
+        file = io.StringIO()
+        writer = natwriter.NATWriter(file)
+        writer.write_headers()
+        for _filename, device in self.get_devices(hostname):
+            writer.write(device)
+        return file.getvalue()
+
+    # Returns the routes, objects and nat rules of every device that match
+    # the given address. Raises a ValueError for an invalid address.
+    def lookup(self, addr):
+        if addr == None or not iptools.is_host_addr(addr):
+            raise ValueError(f'Invalid address "{addr}".')
+        value = iptools.addr_to_int(addr)
+        results = []
+        for filename, device in self.get_devices():
+            objects, nats, rules = self.get_indexes(filename, device)
+            routes = routetable.lookup_routes(device, [value])
+            results.append({
+                'hostname' : device.hostname,
+                'routes'   : [{'vrf'       : vrf.name,
+                               'route'     : str(route.addr),
+                               'interface' : route.interface_name,
+                               'next hop'  : route.next_hop}
+                              for vrf, _addr, route in routes
+                              if route != None],
+                'objects'  : [device.objects[id].name
+                              for id in objects.lookup(value)],
+                'nats'     : [rules[id].name() for id in nats.lookup(value)],
+            })
+        return results
+
+
+################################################################################
+
+
+# Answers newline delimited json requests of the form
+#   {"command": COMMAND, "arg": ARG}
+# with one json response line {"ok": true, "result": ...} or
+# {"ok": false, "error": MESSAGE}.
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.dispatch(request.get('command'),
+                                              request.get('arg'))
+                response = {'ok': True, 'result': result}
+            except Exception as e:
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if self.server.stopping:
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+################################################################################
+
+
+# Unix domain socket server keeping parsed devices warm between requests.
+class CISXServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, src_dir=None):
+        remove_stale_socket(path)
+        umask = os.umask(0o177)           # socket readable by the owner only
+        try:
+            super().__init__(path, RequestHandler)
+        finally:
+            os.umask(umask)
+        self.path = path
+        self.src_dir = src_dir
+        self.state = FleetState()
+        self.stopping = False             # shutdown requested
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    # Runs the given command and returns its json serializable result.
+    def dispatch(self, command, arg):
+        if command == 'parse':
+            device, errors = self.state.parse(arg)
+            return {'hostname': device.hostname, 'errors': errors}
+        elif command == 'load':
+            results = self.state.load(arg or self.src_dir)
+            return [{'file': filename, 'hostname': device.hostname,
+                     'errors': len(errors)}
+                    for filename, device, errors in results]
+        elif command == 'devices':
+            return [{'file': filename, 'hostname': device.hostname}
+                    for filename, device in self.state.get_devices()]
+        elif command == 'nat':
+            return self.state.nat(arg)
+        elif command == 'lookup':
+            return self.state.lookup(arg)
+        elif command == 'stats':
+            return {'devices': len(self.state.devices),
+                    'cache hits': self.state.cache_hits}
+        elif command == 'shutdown':
+            self.stopping = True          # after the reply is written
+            return None
+        raise ValueError(f'Unknown command "{command}".')
+
+
+################################################################################
+
+
+# Removes the socket of a server that is no longer running. Raises an OSError
+# if a server is still listening on the path or the path is not a socket.
+def remove_stale_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f'{path}: Not a socket.')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)       # stale socket of a previous server
+            return
+    raise OSError(f'{path}: Server already running.')
+
+
+################################################################################
@@ -0,0 +1,149 @@
+################################################################################
+# showtech.py
+################################################################################
+
+
+import bisect
+import mmap
+import os
+
+
+################################################################################
+
+
+# Start of the header line of each command output of a show tech-support
+# capture, as in '------------------ show running-config ------------------'.
+HEADER = b'------------------ show '
+
+# Commands whose output is parsed, the rest of a capture is skipped.
+KEEP = (b'running-config', b'route', b'ip route')
+
+# Bytes searched for newlines at a time when counting skipped lines.
+COUNT_BYTES = 16 * 1024 * 1024
+
+# Bytes at the start of a file searched for a header line. A capture starts
+# with the output of its first commands, other files are not searched
+# further.
+PROBE_BYTES = 64 * 1024
+
+
+################################################################################
+
+
+# The parts of a show tech-support capture that are parsed: the output of
+# the show running-config command and of any show route commands, with the
+# line numbers they start at in the capture.
+class Extract():
+    def __init__(self, size):
+        self.size = size            # bytes in the capture
+        self.skipped = size         # bytes of the capture not extracted
+        self.text = ''
+        self.lines = [1]            # first extract line of each region
+        self.file_lines = [1]       # first capture line of each region
+
+    # Returns the extracted text and drops it, keeping only the line numbers,
+    # so the extract is small enough to pass to worker processes.
+    def take_text(self):
+        text, self.text = self.text, ''
+        return text
+
+    # Returns the line number in the capture of the given extract line.
+    def file_line(self, line_number):
+        index = bisect.bisect_right(self.lines, line_number) - 1
+        return self.file_lines[index] + line_number - self.lines[index]
+
+
+################################################################################
+
+
+# Returns the Extract of the given file if it is a show tech-support capture
+# holding a running config, or None for any other file. Only the first
+# PROBE_BYTES of other files are read. The capture is searched with mmap, so
+# the output of the other commands is skipped without being decoded or split
+# into lines; only the newlines before each kept region are counted to keep
+# line numbers of error messages right.
+def extract(filename):
+    with open(filename, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if find_running_config(data) == -1:
+                return None
+            return extract_regions(data, size)
+
+# Returns True if the given data starts like a capture, with a header line
+# within its first PROBE_BYTES.
+def is_capture(data):
+    return (starts_with(data, 0, HEADER)
+            or data.find(b'\n' + HEADER, 0, PROBE_BYTES) != -1)
+
+# Returns the position of the show running-config header line of the given
+# capture, or -1 if there is none or the data is not a capture.
+def find_running_config(data):
+    if not is_capture(data):
+        return -1
+    if starts_with(data, 0, HEADER + b'running-config'):
+        return 0
+    position = data.find(b'\n' + HEADER + b'running-config')
+    return position + 1 if position != -1 else -1
+
+# Returns the Extract of the kept command outputs of the given capture.
+def extract_regions(data, size):
+    result = Extract(size)
+    regions = []
+    line_number = 1                 # capture line at position
+    extract_line = 1                # extract line of the next region
+    position = 0
+    start = 0 if starts_with(data, 0, HEADER) else find_header(data, 0)
+    while start != -1:
+        end = find_header(data, start + len(HEADER))
+        stop = end if end != -1 else size
+        if get_command(data, start) in KEEP:
+            line_number += count_lines(data, position, start)
+            text = data[start:stop].decode('utf-8', 'replace')
+            if not text.endswith('\n'):
+                text += '\n'
+            if len(regions) == 0:
+                result.file_lines[0] = line_number
+            else:
+                result.lines.append(extract_line)
+                result.file_lines.append(line_number)
+            regions.append(text)
+            lines = text.count('\n')
+            extract_line += lines
+            line_number += lines
+            position = stop
+            result.skipped -= stop - start
+        start = end
+    result.text = ''.join(regions)
+    return result
+
+# Returns the position of the first header line at or after the given
+# position, or -1.
+def find_header(data, position):
+    position = data.find(b'\n' + HEADER, position - 1 if position > 0 else 0)
+    return position + 1 if position != -1 else -1
+
+# Returns the command of the header line at the given position, such as
+# b'running-config'.
+def get_command(data, position):
+    end = data.find(b'\n', position)
+    line = data[position + len(HEADER):end if end != -1 else len(data)]
+    return line.strip().rstrip(b'-').strip()
+
+# Returns True if the given bytes are at the given position.
+def starts_with(data, position, prefix):
+    return data[position:position + len(prefix)] == prefix
+
+# Returns the number of newlines between the given positions.
+def count_lines(data, start, end):
+    lines = 0
+    while start < end:
+        stop = min(start + COUNT_BYTES, end)
+        lines += data[start:stop].count(b'\n')
+        start = stop
+    return lines
+
+
+################################################################################
@@ -0,0 +1,430 @@
+################################################################################
+# snapshot.py
+################################################################################
+
+
+from array import array
+import json
+import mmap
+import struct
+import sys
+
+
+from cisxp import device
+from cisxp import natanalysis
+from cisxp import natengine
+from cisxp import natwriter
+
+
+################################################################################
+
+
+# Snapshot file layout:
+#   MAGIC                  8 bytes
+#   directory length       unsigned 64 bit little endian integer
+#   directory              json, padded to a multiple of 8 bytes
+#   columns                native arrays, each starting on an 8 byte boundary
+#
+# The directory maps each table to its row count and to the typecode, offset
+# and length of each of its columns. Strings are dictionary encoded: string
+# columns hold ids into the string table, whose 'offsets' column holds the
+# start of each string within the 'data' column. Id 0 is None and the other
+# strings are sorted so a string id can be found with a binary search.
+
+MAGIC = b'CISXSNP1'
+VERSION = 2
+STRING = 'I'          # typecode of string id columns
+INTEGER = 'q'         # typecode of integer columns, -1 when not set
+
+# Maps table names to their (column name, typecode) columns.
+TABLES = {
+    'devices' : [
+        ('hostname', STRING),
+    ],
+    'interfaces' : [
+        ('device', INTEGER),
+        ('name', STRING),
+        ('custom name', STRING),
+        ('description', STRING),
+        ('vrf', STRING),
+        ('addr', STRING),
+        ('addr start', INTEGER),
+        ('addr end', INTEGER),
+    ],
+    'objects' : [
+        ('device', INTEGER),
+        ('name', STRING),
+        ('type', STRING),
+        ('description', STRING),
+        ('addr', STRING),
+        ('addr start', INTEGER),
+        ('addr end', INTEGER),
+        ('protocol', STRING),
+        ('src port', STRING),
+        ('dest port', STRING),
+    ],
+    'group members' : [
+        ('device', INTEGER),
+        ('group', INTEGER),             # row of the group in objects
+        ('member', STRING),             # member object name or address
+        ('member start', INTEGER),
+        ('member end', INTEGER),
+    ],
+    'nats' : [
+        ('device', INTEGER),
+    ] + [(col, STRING) for col in natwriter.NATWriter().cols],
+    'nat ranges' : [
+        ('nat', INTEGER),               # row of the nat in nats
+        ('kind', STRING),               # 'inside' or 'mapped'
+        ('range start', INTEGER),
+        ('range end', INTEGER),
+    ],
+}
+
+
+################################################################################
+
+
+# Writes parsed devices to a snapshot file. Only the columns are kept in
+# memory while devices are added, so devices can be released once written.
+class SnapshotWriter():
+    def __init__(self, filename):
+        self.filename = filename
+        self.strings = {None: 0}      # maps strings to string ids
+        self.tables = {
+            table: {name: array(typecode) for name, typecode in columns}
+            for table, columns in TABLES.items()
+        }
+        self.nat_writer = natwriter.NATWriter(None)
+
+    # Returns the id of the given value in the string table.
+    def string(self, value):
+        if value != None and not isinstance(value, str):
+            value = str(value)
+        id = self.strings.get(value)
+        if id == None:
+            id = self.strings[value] = len(self.strings)
+        return id
+
+    # Appends a row of the given column values to a table.
+    def add_row(self, table, values):
+        columns = self.tables[table]
+        for name, typecode in TABLES[table]:
+            value = values.get(name)
+            if typecode == STRING:
+                columns[name].append(self.string(value))
+            else:
+                columns[name].append(-1 if value == None else value)
+        return len(columns[TABLES[table][0][0]]) - 1
+
+    def write(self, dev):
+        id = self.add_row('devices', {'hostname': dev.hostname})
+        for interface in dev.interfaces:
+            self.add_interface(id, interface)
+        for object in dev.objects:
+            self.add_object(id, object)
+        self.add_nats(id, dev)
+
+    def add_interface(self, id, interface):
+        values = get_interface_values(interface)
+        values['device'] = id
+        self.add_row('interfaces', values)
+
+    def add_object(self, id, object):
+        values = get_object_values(object)
+        values['device'] = id
+        row = self.add_row('objects', values)
+        for item in object.items:
+            self.add_group_member(id, row, item)
+
+    def add_group_member(self, id, group, item):
+        values = get_member_values(item)
+        values.update({'device': id, 'group': group})
+        self.add_row('group members', values)
+
+    # Adds the nat rows of the device in the order NATWriter writes them,
+    # each followed by a row per inside and mapped range.
+    def add_nats(self, id, dev):
+        for _object, values in get_nat_values(self.nat_writer, dev):
+            values['device'] = id
+            row = self.add_row('nats', values)
+            for kind, start, end in values['ranges']:
+                self.add_row('nat ranges', {'nat': row, 'kind': kind,
+                                            'range start': start,
+                                            'range end': end})
+
+    # Writes the directory and all columns to the snapshot file. String ids
+    # are renumbered to the sorted order of the strings first.
+    def close(self):
+        strings = [None] + sorted(string for string in self.strings
+                                  if string != None)
+        ids = array(STRING, [0]) * len(strings)
+        for id, string in enumerate(strings):
+            ids[self.strings[string]] = id
+        for table, table_columns in TABLES.items():
+            columns = self.tables[table]
+            for name, typecode in table_columns:
+                if typecode == STRING:
+                    columns[name] = array(STRING,
+                                          [ids[id] for id in columns[name]])
+
+        offsets = array('Q')
+        data = bytearray()
+        for string in strings:
+            offsets.append(len(data))
+            if string != None:
+                data.extend(string.encode('utf-8'))
+        offsets.append(len(data))
+
+        columns = [('strings', 'offsets', offsets),
+                   ('strings', 'data', array('B', data))]
+        for table, table_columns in self.tables.items():
+            for name, column in table_columns.items():
+                columns.append((table, name, column))
+
+        directory = {'version': VERSION, 'byteorder': sys.byteorder,
+                     'tables': {}}
+        offset = 0
+        for table, name, column in columns:
+            entry = directory['tables'].setdefault(table, {'columns': {}})
+            entry['rows'] = len(column)
+            entry['columns'][name] = [column.typecode, offset, len(column)]
+            offset = align(offset + len(column) * column.itemsize)
+        header = json.dumps(directory).encode('utf-8')
+        header += b' ' * (align(len(header)) - len(header))
+
+        with open(self.filename, 'wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack('<Q', len(header)))
+            file.write(header)
+            for _table, _name, column in columns:
+                data = column.tobytes()
+                file.write(data)
+                file.write(b'\0' * (align(len(data)) - len(data)))
+
+
+################################################################################
+
+
+# Reads a snapshot file through mmap. Columns are exposed as memoryviews over
+# the mapped file, so queries touch only the columns they use and no device
+# model objects are built.
+class Snapshot():
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{filename} is not a snapshot file.')
+        length, = struct.unpack_from('<Q', self.map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.directory = json.loads(bytes(self.map[start:start + length]))
+        if self.directory['version'] != VERSION:
+            raise ValueError(f'{filename} was written by another version.')
+        if self.directory['byteorder'] != sys.byteorder:
+            raise ValueError(f'{filename} was written with another byte '
+                             f'order.')
+        self.data_start = start + length
+        self.columns = {}
+        self.string_offsets = self.column('strings', 'offsets')
+        self.string_data = self.column('strings', 'data')
+
+    def close(self):
+        for view in self.columns.values():
+            view.release()
+        self.columns = {}
+        self.string_offsets = self.string_data = None
+        self.map.close()
+        self.file.close()
+
+    # Returns the number of rows of a table.
+    def rows(self, table):
+        return self.directory['tables'][table]['rows']
+
+    # Returns a memoryview of the given column.
+    def column(self, table, name):
+        view = self.columns.get((table, name))
+        if view == None:
+            typecode, offset, length = \
+                self.directory['tables'][table]['columns'][name]
+            start = self.data_start + offset
+            size = array(typecode).itemsize
+            view = memoryview(self.map)[start:start + length * size]
+            view = view.cast(typecode)
+            self.columns[(table, name)] = view
+        return view
+
+    # Returns the string of the given string id.
+    def string(self, id):
+        if id == 0:
+            return None
+        start, end = self.string_offsets[id], self.string_offsets[id + 1]
+        return bytes(self.string_data[start:end]).decode('utf-8')
+
+    # Returns the id of the given string or None if it is not in the string
+    # table.
+    def string_id(self, value):
+        if value == None:
+            return 0
+        low, high = 1, len(self.string_offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(middle) < value:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.string_offsets) - 1 and self.string(low) == value:
+            return low
+        return None
+
+    # Returns the rows of a table whose string column holds the given value.
+    def find_rows(self, table, name, value):
+        id = self.string_id(value)
+        if id == None:
+            return []
+        column = self.column(table, name)
+        return [row for row in range(len(column)) if column[row] == id]
+
+    # Returns the row index of each device with the given hostname.
+    def find_devices(self, hostname):
+        return self.find_rows('devices', 'hostname', hostname)
+
+    # Returns the given row of a table as a dict of column values.
+    def get_row(self, table, row, names=None):
+        if names == None:
+            names = self.directory['tables'][table]['columns']
+        values = {}
+        for name in names:
+            typecode = self.directory['tables'][table]['columns'][name][0]
+            value = self.column(table, name)[row]
+            if typecode == STRING:
+                value = self.string(value)
+            elif value == -1:
+                value = None
+            values[name] = value
+        return values
+
+    # Yields nat rows, optionally only those of the given hostname, as dicts
+    # mapping NATWriter columns to values.
+    def nat_rows(self, hostname=None):
+        cols = natwriter.NATWriter().cols
+        devices = self.column('nats', 'device')
+        wanted = None
+        if hostname != None:
+            wanted = set(self.find_devices(hostname))
+        for row in range(self.rows('nats')):
+            if wanted == None or devices[row] in wanted:
+                yield self.get_row('nats', row, cols)
+
+    # Returns the rows of the nats with an inside or mapped range containing
+    # the given integer address.
+    def lookup_nat_addr(self, addr):
+        nats = self.column('nat ranges', 'nat')
+        starts = self.column('nat ranges', 'range start')
+        ends = self.column('nat ranges', 'range end')
+        rows = {nats[i] for i in range(len(nats))
+                if starts[i] <= addr <= ends[i]}
+        return [self.get_row('nats', row) for row in sorted(rows)]
+
+    # Returns the rows of the objects with the given name.
+    def find_objects(self, name):
+        return [self.get_row('objects', row)
+                for row in self.find_rows('objects', 'name', name)]
+
+    # Writes the nat rows to file exactly as NATWriter would.
+    def write_nat(self, file, hostname=None, cols=None):
+        writer = natwriter.NATWriter(file, cols)
+        writer.write_headers()
+        for row in self.nat_rows(hostname):
+            writer.write_row(row)
+
+
+################################################################################
+
+
+# Returns the offset rounded up to a multiple of 8.
+def align(offset):
+    return (offset + 7) & ~7
+
+# Returns the (start, end) bounds of the given ranges or (None, None).
+def get_bounds(ranges):
+    if len(ranges) == 0:
+        return (None, None)
+    return (min(start for start, _end in ranges),
+            max(end for _start, end in ranges))
+
+
+################################################################################
+
+
+# The values of the rows of interfaces, objects, group members and nat rules,
+# shared by SnapshotWriter and sqlitewriter.SQLiteWriter so both sinks store
+# the same values. Each maps column names to values.
+
+def get_interface_values(interface):
+    addr = interface.primary_addr()
+    range = addr.range() if addr != None else None
+    start, end = range if range != None else (None, None)
+    return {
+        'name'        : interface.name,
+        'custom name' : interface.custom_name,
+        'description' : interface.description,
+        'vlan'        : getattr(interface.vlan, 'id', interface.vlan),
+        'vrf'         : getattr(interface.vrf, 'name', interface.vrf),
+        'addr'        : natwriter.get_addr(addr),
+        'addr start'  : start,
+        'addr end'    : end,
+    }
+
+def get_object_values(object):
+    start, end = get_bounds(object.ranges())
+    return {
+        'name'        : object.name,
+        'type'        : object.type,
+        'description' : object.description,
+        'addr'        : natwriter.get_object_addr(object),
+        'addr start'  : start,
+        'addr end'    : end,
+        'protocol'    : object.protocol,
+        'src port'    : natwriter.get_port(object.src_port),
+        'dest port'   : natwriter.get_port(object.dest_port),
+    }
+
+# 'member object' is the member Object, or None for an address.
+def get_member_values(item):
+    if isinstance(item, tuple):
+        item = item[0]                      # ( Object(), cidr )
+    object = item if isinstance(item, device.Object) else None
+    member = item.name if object != None else natwriter.get_addr(item)
+    start, end = get_bounds(device.get_ranges(item, set()))
+    return {
+        'member'        : member,
+        'member object' : object,
+        'member start'  : start,
+        'member end'    : end,
+    }
+
+# Yields (object, values) for each nat row of the device in the order the
+# given NATWriter writes them, where object is the network object of an auto
+# nat or None. The values of the NATWriter columns are those of its rows;
+# 'ranges' lists the merged ('inside' or 'mapped', start, end) ranges of the
+# rule, one per range so the gaps between them are kept.
+def get_nat_values(writer, dev):
+    writer.device = dev
+    writer.rows = []
+    nats = [(obj.nat, obj) for obj in dev.objects if obj.nat != None]
+    nats += [(nat, None) for nat in dev.nats if nat != None]
+    for nat, object in nats:
+        if not writer.add_nat_row(nat, object):
+            continue
+        values = dict(writer.row)
+        values['ranges'] = []
+        for kind, src in (('inside', nat.inside_src),
+                          ('mapped', nat.outside_src)):
+            ranges = natengine.get_object_ranges(src, nat)
+            values['ranges'].extend((kind, start, end) for start, end
+                                    in natanalysis.merge_ranges(ranges))
+        yield (object, values)
+    writer.rows = []
+
+
+################################################################################
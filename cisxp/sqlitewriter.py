@@ -0,0 +1,220 @@
+################################################################################
+# sqlitewriter.py
+################################################################################
+
+
+import os
+import sqlite3
+
+
+from cisxp import natwriter
+from cisxp import snapshot
+
+
+################################################################################
+
+
+# Nat columns of the nat_rules table, the NATWriter columns with their
+# spaces replaced by underscores.
+NAT_COLS = [col.replace(' ', '_') for col in natwriter.NATWriter(None).cols]
+
+# Maps table names to their column definitions. Address ranges are stored as
+# integer start and end columns, NULL when not known, so address queries can
+# use the range indexes.
+TABLES = {
+    'devices' : [
+        'id INTEGER PRIMARY KEY',
+        'hostname TEXT',
+    ],
+    'interfaces' : [
+        'device_id INTEGER REFERENCES devices(id)',
+        'name TEXT',
+        'custom_name TEXT',
+        'description TEXT',
+        'vlan TEXT',
+        'vrf TEXT',
+        'addr TEXT',
+        'addr_start INTEGER',
+        'addr_end INTEGER',
+    ],
+    'objects' : [
+        'id INTEGER PRIMARY KEY',
+        'device_id INTEGER REFERENCES devices(id)',
+        'name TEXT',
+        'type TEXT',
+        'description TEXT',
+        'addr TEXT',
+        'addr_start INTEGER',
+        'addr_end INTEGER',
+        'protocol TEXT',
+        'src_port TEXT',
+        'dest_port TEXT',
+    ],
+    'group_members' : [
+        'device_id INTEGER REFERENCES devices(id)',
+        'group_id INTEGER REFERENCES objects(id)',
+        'member TEXT',                  # member object name or address
+        'member_id INTEGER REFERENCES objects(id)',  # NULL for addresses
+        'member_start INTEGER',
+        'member_end INTEGER',
+    ],
+    'nat_rules' : [
+        'id INTEGER PRIMARY KEY',
+        'device_id INTEGER REFERENCES devices(id)',
+        'object_id INTEGER REFERENCES objects(id)',  # object of an auto nat
+    ] + [f'{col} TEXT' for col in NAT_COLS],
+    'nat_ranges' : [
+        'nat_id INTEGER REFERENCES nat_rules(id)',
+        'kind TEXT',                    # 'inside' or 'mapped'
+        'range_start INTEGER',
+        'range_end INTEGER',
+    ],
+}
+
+# Maps index names to their table and columns, created once all devices are
+# loaded.
+INDEXES = {
+    'devices_hostname'      : ('devices', 'hostname'),
+    'interfaces_device'     : ('interfaces', 'device_id'),
+    'interfaces_addr'       : ('interfaces', 'addr_start, addr_end'),
+    'objects_device'        : ('objects', 'device_id'),
+    'objects_name'          : ('objects', 'name'),
+    'objects_addr'          : ('objects', 'addr_start, addr_end'),
+    'group_members_group'   : ('group_members', 'group_id'),
+    'group_members_member'  : ('group_members', 'member'),
+    'group_members_addr'    : ('group_members', 'member_start, member_end'),
+    'nat_rules_device'      : ('nat_rules', 'device_id'),
+    'nat_ranges_nat'        : ('nat_ranges', 'nat_id'),
+    'nat_ranges_addr'       : ('nat_ranges', 'range_start, range_end'),
+}
+
+
+################################################################################
+
+
+# Writes parsed devices to normalized tables of an SQLite database, replacing
+# the database file. The rows of each device are inserted in a single
+# transaction with one executemany per table. Ids of devices, objects and nat
+# rules are assigned by the writer so group members, auto nat rules and nat
+# ranges can reference their rows within the same batch. Indexes are created
+# by close(), after all devices are loaded, which is faster than updating them
+# on every insert.
+class SQLiteWriter():
+    def __init__(self, filename):
+        self.filename = filename
+        if os.path.exists(filename):
+            os.remove(filename)
+        # the connection is used from the report threads one at a time
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode = MEMORY')
+        self.connection.execute('PRAGMA synchronous = OFF')
+        for table, columns in TABLES.items():
+            self.connection.execute(
+                f'CREATE TABLE {table} ({", ".join(columns)})')
+        self.inserts = {
+            table: f'INSERT INTO {table} VALUES '
+                   f'({", ".join("?" * len(columns))})'
+            for table, columns in TABLES.items()
+        }
+        self.nat_writer = natwriter.NATWriter(None)
+        self.device_id = 0
+        self.object_id = 0
+        self.nat_id = 0
+
+    def write(self, dev):
+        self.device_id += 1
+        rows = {table: [] for table in TABLES}
+        rows['devices'].append((self.device_id, dev.hostname))
+        object_ids = {}                 # maps ids of objects to object ids
+        for object in dev.objects:
+            self.object_id += 1
+            object_ids[id(object)] = self.object_id
+        for interface in dev.interfaces:
+            rows['interfaces'].append(self.get_interface_row(interface))
+        for object in dev.objects:
+            rows['objects'].append(self.get_object_row(object, object_ids))
+            group_id = object_ids[id(object)]
+            for item in object.items:
+                rows['group_members'].append(
+                    self.get_member_row(group_id, item, object_ids))
+        rows['nat_rules'], rows['nat_ranges'] = \
+            self.get_nat_rows(dev, object_ids)
+
+        with self.connection:
+            for table, table_rows in rows.items():
+                self.connection.executemany(self.inserts[table], table_rows)
+
+    def get_interface_row(self, interface):
+        values = snapshot.get_interface_values(interface)
+        return (
+            self.device_id,
+            values['name'],
+            values['custom name'],
+            values['description'],
+            get_text(values['vlan']),
+            get_text(values['vrf']),
+            values['addr'],
+            values['addr start'],
+            values['addr end'],
+        )
+
+    def get_object_row(self, object, object_ids):
+        values = snapshot.get_object_values(object)
+        return (
+            object_ids[id(object)],
+            self.device_id,
+            values['name'],
+            values['type'],
+            values['description'],
+            values['addr'],
+            values['addr start'],
+            values['addr end'],
+            values['protocol'],
+            get_text(values['src port']),
+            get_text(values['dest port']),
+        )
+
+    def get_member_row(self, group_id, item, object_ids):
+        values = snapshot.get_member_values(item)
+        member_id = None
+        if values['member object'] != None:
+            member_id = object_ids.get(id(values['member object']))
+        return (self.device_id, group_id, get_text(values['member']),
+                member_id, values['member start'], values['member end'])
+
+    # Returns the nat rule rows of the device in the order NATWriter writes
+    # them and the nat range rows of those rules.
+    def get_nat_rows(self, dev, object_ids):
+        cols = self.nat_writer.cols
+        rows = []
+        range_rows = []
+        for object, values in snapshot.get_nat_values(self.nat_writer, dev):
+            self.nat_id += 1
+            object_id = object_ids.get(id(object)) if object != None else None
+            rows.append((self.nat_id, self.device_id, object_id)
+                        + tuple(get_text(values.get(col)) for col in cols))
+            range_rows.extend((self.nat_id, kind, start, end)
+                              for kind, start, end in values['ranges'])
+        return rows, range_rows
+
+    # Creates the indexes and closes the database.
+    def close(self):
+        with self.connection:
+            for name, (table, columns) in INDEXES.items():
+                self.connection.execute(
+                    f'CREATE INDEX {name} ON {table} ({columns})')
+        self.connection.execute('ANALYZE')
+        self.connection.close()
+
+
+################################################################################
+
+
+# Returns the given value as text, or None.
+def get_text(value):
+    if value == None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+################################################################################
@@ -0,0 +1,205 @@
+################################################################################
+# supervisor.py
+################################################################################
+
+
+import collections
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+
+
+from cisxp import trace
+
+
+################################################################################
+
+
+# A file that could not be parsed within its budget.
+class FailedFile():
+    TIMEOUT = 'timeout'
+    MEMORY = 'memory'
+    ERROR = 'error'
+    CRASH = 'crash'
+
+    def __init__(self, filename, reason, detail, seconds):
+        self.filename = filename
+        self.reason = reason        # one of TIMEOUT, MEMORY, ERROR or CRASH
+        self.detail = detail        # message with the failing line if known
+        self.seconds = seconds
+
+    def __str__(self):
+        return (f'{self.filename}: {self.reason} after '
+                f'{self.seconds:.1f} seconds\n    {self.detail}')
+
+
+################################################################################
+
+
+# A worker process parsing a single file.
+class Worker():
+    def __init__(self, filename, process, conn, deadline):
+        self.filename = filename
+        self.process = process
+        self.conn = conn                # receiving end of the result pipe
+        self.start = time.monotonic()
+        self.deadline = deadline        # monotonic time or None
+
+
+################################################################################
+
+
+# Parses files in supervised worker processes, one process per file and at
+# most jobs at once. A worker still running after timeout seconds is killed,
+# and a worker allocating more than memory bytes fails with a MemoryError.
+# Files that time out, run out of memory, raise or crash are recorded as
+# failures and the other files are parsed as usual.
+#
+# parse is called in the worker with a filename and returns the result sent
+# back to the main process, such as the (device, errors, stats, events) of
+# cisx.parse_file.
+class Supervisor():
+    SLOWEST = 5                     # slowest files listed in the summary
+
+    def __init__(self, parse, jobs=1, timeout=None, memory=None):
+        self.parse_function = parse
+        self.jobs = jobs
+        self.timeout = timeout
+        self.memory = memory
+        self.failures = []          # FailedFile list
+        self.times = []             # (seconds, filename) of parsed files
+
+    # Yields the results of the files that were parsed, in the order they
+    # finish.
+    def parse(self, files):
+        pending = collections.deque(files)
+        running = []
+        while len(pending) > 0 or len(running) > 0:
+            while len(pending) > 0 and len(running) < self.jobs:
+                running.append(self.start_worker(pending.popleft()))
+            multiprocessing.connection.wait(
+                [worker.conn for worker in running]
+                + [worker.process.sentinel for worker in running],
+                self.get_wait_time(running))
+            for worker in list(running):
+                result = self.check_worker(worker)
+                if result == None:
+                    continue
+                running.remove(worker)
+                if result != False:
+                    yield result
+
+    def start_worker(self, filename):
+        conn, child_conn = multiprocessing.Pipe(False)
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(self.parse_function, filename, child_conn, self.memory,
+                  trace.tracer.enabled),
+            daemon=True)
+        process.start()
+        child_conn.close()
+        deadline = None
+        if self.timeout != None:
+            deadline = time.monotonic() + self.timeout
+        return Worker(filename, process, conn, deadline)
+
+    # Returns the seconds until the nearest deadline of the running workers,
+    # or None to wait without limit.
+    def get_wait_time(self, running):
+        deadlines = [worker.deadline for worker in running
+                     if worker.deadline != None]
+        if len(deadlines) == 0:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    # Returns the result of a finished worker, False if it failed or None if
+    # it is still running.
+    def check_worker(self, worker):
+        seconds = time.monotonic() - worker.start
+        if worker.conn.poll():
+            try:
+                status, value = worker.conn.recv()
+            except EOFError:
+                status, value = (FailedFile.CRASH, None)
+            self.stop_worker(worker)
+            if status == 'ok':
+                self.times.append((seconds, worker.filename))
+                return value
+            if status == FailedFile.CRASH:
+                value = f'exit code {worker.process.exitcode}'
+            self.fail(worker, status, value, seconds)
+            return False
+        if not worker.process.is_alive():
+            self.stop_worker(worker)
+            self.fail(worker, FailedFile.CRASH,
+                      f'exit code {worker.process.exitcode}', seconds)
+            return False
+        if worker.deadline != None and time.monotonic() >= worker.deadline:
+            worker.process.kill()
+            self.stop_worker(worker)
+            self.fail(worker, FailedFile.TIMEOUT,
+                      f'parsing exceeded {self.timeout} seconds', seconds)
+            return False
+        return None
+
+    def stop_worker(self, worker):
+        worker.process.join()
+        worker.conn.close()
+
+    def fail(self, worker, reason, detail, seconds):
+        self.failures.append(FailedFile(worker.filename, reason, detail,
+                                        seconds))
+
+    # Prints the failed files and the slowest parsed files.
+    def print_summary(self):
+        if len(self.failures) > 0:
+            print('Failed files:')
+            for failure in self.failures:
+                print(f'  {failure}')
+        slowest = sorted(self.times, reverse=True)[:self.SLOWEST]
+        if len(slowest) > 0:
+            print('Slowest files:')
+            for seconds, filename in slowest:
+                print(f'  {seconds:8.2f} s  {filename}')
+
+
+################################################################################
+
+
+# Parses a file in a worker process and sends back ('ok', result) or the
+# reason and detail of the failure. The address space of the worker is
+# limited to memory bytes beyond what it uses when it starts.
+def run_worker(parse, filename, conn, memory, trace_enabled):
+    trace.init_worker(trace_enabled)
+    if memory != None:
+        limit_memory(memory)
+    try:
+        message = ('ok', parse(filename))
+    except MemoryError:
+        message = (FailedFile.MEMORY, f'allocation exceeded {memory} bytes')
+    except Exception as e:
+        reason = FailedFile.ERROR
+        if isinstance(e.__cause__, MemoryError):
+            reason = FailedFile.MEMORY
+        message = (reason, str(e))
+    try:
+        conn.send(message)
+    except MemoryError:
+        conn.send((FailedFile.MEMORY, f'result exceeded {memory} bytes'))
+    conn.close()
+
+# Limits the address space of the calling process to memory bytes more than
+# it currently uses.
+def limit_memory(memory):
+    import resource
+    used = 0
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            used = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    resource.setrlimit(resource.RLIMIT_AS, (used + memory, used + memory))
+
+
+################################################################################
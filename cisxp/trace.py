@@ -0,0 +1,134 @@
+################################################################################
+# trace.py
+################################################################################
+
+
+import json
+import os
+import threading
+import time
+
+
+################################################################################
+
+
+# Records spans of work as chrome trace events, which trace viewers such as
+# chrome://tracing or perfetto show on a timeline per process and thread.
+# Tracing is off unless enabled, and span() then returns a shared span that
+# records nothing.
+#
+# Each process records into its own module level tracer. Pool workers are
+# started with init_worker(), return their events with the results of each
+# task and the main process adds them to its tracer, keeping the pid of the
+# worker that recorded them.
+class Tracer():
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.events = []
+
+    # Returns a context manager recording a span of the given name. args are
+    # shown with the span in the trace viewer.
+    def span(self, name, category='cisx', **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def add_span(self, name, category, start, end, args):
+        event = {
+            'name'  : name,
+            'cat'   : category,
+            'ph'    : 'X',
+            'ts'    : start,
+            'dur'   : end - start,
+            'pid'   : os.getpid(),
+            'tid'   : threading.get_native_id(),
+            'args'  : args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    # Returns the recorded events and forgets them.
+    def take(self):
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+    # Adds events recorded by another process.
+    def extend(self, events):
+        with self.lock:
+            self.events.extend(events)
+
+    # Writes the recorded events in the chrome trace event json format, with
+    # the main process and the workers named after their pids.
+    def write(self, filename):
+        with self.lock:
+            events = list(self.events)
+        main = os.getpid()
+        pids = sorted(set(event['pid'] for event in events) | {main})
+        for pid in pids:
+            name = 'cisx' if pid == main else f'cisx worker {pid}'
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'args': {'name': name}})
+        with open(filename, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+            file.write('\n')
+
+
+################################################################################
+
+
+# A span being recorded by a Tracer.
+class Span():
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = get_timestamp()
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.tracer.add_span(self.name, self.category, self.start,
+                             get_timestamp(), self.args)
+        return False
+
+
+# A span of a disabled Tracer.
+class NullSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+################################################################################
+
+
+# Tracer of the current process.
+tracer = Tracer()
+
+
+################################################################################
+
+
+# Returns the current time in microseconds, the unit of trace events. Wall
+# clock time is used so the spans of different processes line up.
+def get_timestamp():
+    return time.time_ns() // 1000
+
+# Initializes the tracer of a pool worker, dropping any events copied from the
+# parent process.
+def init_worker(enabled):
+    tracer.enabled = enabled
+    tracer.take()
+
+
+################################################################################
@@ -0,0 +1,61 @@
+################################################################################
+# unusedobjectwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import csvwriter
+from cisxp import natwriter
+
+
+################################################################################
+
+
+# Writes the objects and object groups of each device that no nat rule,
+# object, object group, access list or route references, found with a single
+# pass over the objects against the reference index of the device.
+class UnusedObjectWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout):
+        super().__init__(file)
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'name',
+            'type',
+            'description',
+            'addr',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname'    : 'Hostname',
+            'name'        : 'Name',
+            'type'        : 'Type',
+            'description' : 'Description',
+            'addr'        : 'Addr',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        references = self.device.references
+        for object in self.device.objects:
+            if object.name == None or object in references:
+                continue
+            self.rows.append({
+                'hostname'    : self.device.hostname,
+                'name'        : object.name,
+                'type'        : object.type,
+                'description' : object.description,
+                'addr'        : natwriter.get_object_addr(object),
+            })
+
+
+################################################################################
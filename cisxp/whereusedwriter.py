@@ -0,0 +1,65 @@
+################################################################################
+# whereusedwriter.py
+################################################################################
+
+
+import sys
+
+
+from cisxp import csvwriter
+
+
+################################################################################
+
+
+# Writes where the given objects are used on each device, one row per nat
+# rule, object, object group, access list or route referencing them, from the
+# reference index of the device.
+class WhereUsedWriter(csvwriter.CSVWriter):
+    def __init__(self, file=sys.stdout, names=()):
+        super().__init__(file)
+        self.names = names
+
+        # Column identifiers.
+        self.cols = [
+            'hostname',
+            'object',
+            'type',
+            'kind',
+            'referrer',
+            'role',
+        ]
+
+        # Column names, maps column identifier to column display name.
+        self.col_names = {
+            'hostname' : 'Hostname',
+            'object'   : 'Object',
+            'type'     : 'Type',
+            'kind'     : 'Used By',
+            'referrer' : 'Referrer',
+            'role'     : 'Role',
+        }
+
+    def write(self, device):
+        self.device = device
+        self.rows = []
+        self.populate_rows()
+        self.write_rows()
+
+    def populate_rows(self):
+        for name in self.names:
+            object = self.device.get_object(name)
+            if object == None:
+                continue
+            for reference in self.device.get_references(object):
+                self.rows.append({
+                    'hostname' : self.device.hostname,
+                    'object'   : object.name,
+                    'type'     : object.type,
+                    'kind'     : reference.kind,
+                    'referrer' : reference.name,
+                    'role'     : reference.role,
+                })
+
+
+################################################################################
@@ -0,0 +1,84 @@
+################################################################################
+# writerthread.py
+################################################################################
+
+
+import queue
+import threading
+import time
+
+
+################################################################################
+
+
+# Passes items from a producer to a handler running in a background thread
+# through a bounded queue. When the queue is full put() blocks, so a producer
+# faster than the handler is held back instead of piling items up in memory.
+#
+# The time the producer spends blocked in put() is the stall time, the time
+# the writer spends waiting in get() is its idle time: a large stall time
+# means the writer is the limit, a large idle time means the producer is. The
+# queue depth is sampled at every put().
+#
+# An exception raised by the handler stops the thread and is raised again by
+# the next put() or by close().
+class WriterThread():
+    STOP = object()                 # queued by close() to stop the thread
+
+    def __init__(self, handle, size):
+        self.handle = handle
+        self.queue = queue.Queue(size)
+        self.thread = threading.Thread(target=self.run, name='cisx-writer',
+                                       daemon=True)
+        self.error = None
+        self.items = 0
+        self.depth_total = 0        # sum of the sampled depths
+        self.max_depth = 0
+        self.stall_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.thread.start()
+
+    def put(self, item):
+        self.check_error()
+        depth = self.queue.qsize()
+        self.items += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+        start = time.perf_counter()
+        while True:
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                self.check_error()
+        self.stall_seconds += time.perf_counter() - start
+
+    def run(self):
+        while True:
+            start = time.perf_counter()
+            item = self.queue.get()
+            self.idle_seconds += time.perf_counter() - start
+            if item is self.STOP:
+                return
+            if self.error != None:
+                continue                # drain until stopped
+            try:
+                self.handle(item)
+            except BaseException as e:
+                self.error = e
+
+    # Waits for the queued items to be handled and stops the thread.
+    def close(self):
+        self.queue.put(self.STOP)
+        self.thread.join()
+        self.check_error()
+
+    def check_error(self):
+        if self.error != None:
+            raise self.error
+
+    def mean_depth(self):
+        return self.depth_total / self.items if self.items > 0 else 0.0
+
+
+################################################################################
@@ -5,5 +5,48 @@ CONFIGURATION_DIRECTORY = 'dump'
 # The name of the NAT output file.
 NAT_CSV_FILE = 'nat.csv'
 
+# The name of the interface output file.
+INTERFACE_CSV_FILE = 'interfaces.csv'
+
+# The name of the object output file.
+OBJECT_CSV_FILE = 'objects.csv'
+
+# The name of the object group output file.
+GROUP_CSV_FILE = 'groups.csv'
+
 # The name of the error log file.
 ERROR_LOG = 'error.log'
+
+# The name of the access-list match output file.
+ACL_MATCH_CSV_FILE = 'acl_match.csv'
+
+# The name of the route lookup output file.
+ROUTE_LOOKUP_CSV_FILE = 'route_lookup.csv'
+
+# The name of the nat translation output file.
+NAT_TRANSLATE_CSV_FILE = 'nat_translate.csv'
+
+# The name of the nat overlap output file.
+NAT_OVERLAP_CSV_FILE = 'nat_overlap.csv'
+
+# The name of the nat mapped address collision output file.
+NAT_COLLISION_CSV_FILE = 'nat_collision.csv'
+
+# The name of the subnet adjacency edge list output file.
+ADJACENCY_CSV_FILE = 'adjacency.csv'
+
+# The maximum number of bytes of rows held in memory by --sort-by before
+# sorted runs are spilled to temporary files.
+SORT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# The name of the memory profile output file.
+MEMORY_PROFILE_FILE = 'memprofile.json'
+
+# The name of the NAT JSON Lines output file.
+NAT_JSONL_FILE = 'nat.jsonl'
+
+# The name of the object where-used output file.
+WHERE_USED_CSV_FILE = 'where_used.csv'
+
+# The name of the unused object output file.
+UNUSED_CSV_FILE = 'unused.csv'
@@ -0,0 +1,63 @@
+################################################################################
+# test_device.py
+################################################################################
+
+
+import unittest
+
+
+from cisxp import device
+from tests import util
+
+
+################################################################################
+
+
+CONFIG = '''\
+hostname fw
+name 10.1.5.5 srv5
+name 10.1.5.8 srv8
+name 10.1.5.9 srv9
+name 10.1.0.254 gw
+interface Gi0/0
+ nameif inside
+ ip address 10.1.0.1 255.255.0.0
+object network x
+ host srv5
+access-list acl extended permit ip host srv8 any
+route inside 10.2.0.0 255.255.0.0 gw 1
+'''
+
+
+################################################################################
+
+
+class ReferencesTest(unittest.TestCase):
+    def setUp(self):
+        self.device = util.parse_config(CONFIG)
+
+    # Returns the (kind, name, role) of the references to the named object.
+    def get_references(self, name):
+        object = self.device.get_object(name)
+        return [(reference.kind, reference.name, reference.role)
+                for reference in self.device.get_references(object)]
+
+    def test_network_object_addr(self):
+        self.assertEqual(self.get_references('srv5'),
+                         [(device.Reference.OBJECT, 'x', 'addr')])
+
+    def test_access_list(self):
+        self.assertEqual([kind for kind, _name, _role
+                          in self.get_references('srv8')],
+                         [device.Reference.ACCESS_LIST])
+
+    def test_route_next_hop(self):
+        self.assertEqual(self.get_references('gw'),
+                         [(device.Reference.ROUTE, 'default 10.2.0.0/16',
+                           'next hop')])
+
+    def test_unused(self):
+        self.assertEqual(self.get_references('srv9'), [])
+
+
+################################################################################
@@ -0,0 +1,75 @@
+################################################################################
+# test_flows.py
+################################################################################
+
+
+import os
+import tempfile
+import unittest
+
+
+from cisxp import accesslistmatcher
+from cisxp import natengine
+
+
+################################################################################
+
+
+FLOWS = '''\
+# src dest protocol src-port dest-port
+
+10.0.0.1 10.0.0.2 tcp 1024 443
+10.0.0.1 10.0.0.2
+10.0.0.1,10.0.0.x,udp
+10.0.0.1
+10.0.0.3 10.0.0.4 icmp
+'''
+
+
+class ReadFlowsTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as file:
+            file.write(FLOWS)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    # Returns the (line number, message) of each of the given errors.
+    def get_errors(self, errors):
+        results = []
+        for error in errors:
+            location, msg, _line = error.split('\n')
+            self.assertTrue(location.startswith(self.filename + ':'))
+            results.append((int(location.split(':')[-2]), msg.strip()))
+        return results
+
+    def test_access_list_flows(self):
+        errors = []
+        flows = accesslistmatcher.read_flows(self.filename, errors)
+        self.assertEqual(flows, [
+            ('10.0.0.1', '10.0.0.2', 'tcp', '1024', '443'),
+            ('10.0.0.3', '10.0.0.4', 'icmp', '0', '0'),
+        ])
+        self.assertEqual(self.get_errors(errors), [
+            (4, 'Missing fields.'),
+            (5, 'Invalid address "10.0.0.x".'),
+            (6, 'Missing fields.'),
+        ])
+
+    def test_nat_flows(self):
+        errors = []
+        with open(self.filename) as file:
+            flows = list(natengine.read_flows(file, errors))
+        self.assertEqual(flows, [
+            ('10.0.0.1', '10.0.0.2', 'tcp', '1024', '443', None, None),
+            ('10.0.0.3', '10.0.0.4', 'icmp', None, None, None, None),
+        ])
+        self.assertEqual(self.get_errors(errors), [
+            (4, 'Missing fields.'),
+            (5, 'Invalid address "10.0.0.x".'),
+            (6, 'Missing fields.'),
+        ])
+
+
+################################################################################
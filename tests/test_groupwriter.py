@@ -0,0 +1,44 @@
+################################################################################
+# test_groupwriter.py
+################################################################################
+
+
+import unittest
+
+
+from cisxp import groupwriter
+from tests import util
+
+
+################################################################################
+
+
+CONFIG = '''\
+hostname fw
+object network web
+ host 10.1.2.3
+object-group network servers
+ network-object host 10.1.2.4
+ network-object object web
+ network-object object missing-object
+ group-object missing-group
+'''
+
+
+class GroupWriterTest(unittest.TestCase):
+    def test_unresolved_members(self):
+        writer = groupwriter.GroupWriter(None)
+        writer.device = util.parse_config(CONFIG)
+        writer.rows = []
+        writer.populate_rows()
+        members = [(row.get('member'), row.get('member addr'))
+                   for row in writer.rows]
+        self.assertEqual(members, [
+            (None, '10.1.2.4'),
+            ('web', '10.1.2.3'),
+            ('missing-object', None),
+            ('missing-group', None),
+        ])
+
+
+################################################################################
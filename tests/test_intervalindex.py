@@ -0,0 +1,70 @@
+################################################################################
+# test_intervalindex.py
+################################################################################
+
+
+import random
+import types
+import unittest
+
+
+from cisxp import intervalindex
+
+
+################################################################################
+
+
+class IntervalIndexTest(unittest.TestCase):
+    def test_lookup(self):
+        rand = random.Random(1)
+        intervals = []
+        index = intervalindex.IntervalIndex()
+        for id in range(500):
+            if rand.random() < 0.3:
+                start, end = 0, 0xffffffff
+            else:
+                start = rand.randrange(1 << 32)
+                end = min(start + rand.randrange(1 << 24), 0xffffffff)
+            intervals.append((start, end))
+            index.add(start, end, id)
+        for _ in range(1000):
+            start, end = rand.choice(intervals)
+            point = rand.choice((rand.randrange(1 << 32), start, end,
+                                 end + 1, start - 1))
+            expected = [id for id, (start, end) in enumerate(intervals)
+                        if start <= point <= end]
+            self.assertEqual(list(index.lookup(point)), expected)
+
+    # Half of the intervals cover every address, as access list entries with
+    # an 'any' source do, and overlap every segment of the other half.
+    def test_wide_intervals_size(self):
+        count = 16000
+        index = intervalindex.IntervalIndex()
+        for id in range(count):
+            if id % 2 == 1:
+                index.add(0, 0xffffffff, id)
+            else:
+                index.add(id << 8, (id << 8) + 255, id)
+        index.build()
+        self.assertLessEqual(index.stored(), count * 4)
+        self.assertEqual(len(index.lookup(0x100)), count // 2)
+        self.assertEqual(len(index.lookup(0x200)), count // 2 + 1)
+
+    def test_overlapping_pairs(self):
+        rand = random.Random(2)
+        items = []
+        for id in range(200):
+            start = rand.randrange(1000)
+            end = start + rand.randrange(50)
+            items.append(types.SimpleNamespace(id=id, start=start, end=end))
+        found = set()
+        for item, other in intervalindex.overlapping_pairs(items):
+            self.assertLessEqual((other.start, other.id),
+                                 (item.start, item.id))
+            found.add((min(item.id, other.id), max(item.id, other.id)))
+        expected = {(a.id, b.id) for a in items for b in items
+                    if a.id < b.id and a.start <= b.end and b.start <= a.end}
+        self.assertEqual(found, expected)
+
+
+################################################################################
@@ -0,0 +1,73 @@
+################################################################################
+# test_natanalysis.py
+################################################################################
+
+
+import unittest
+
+
+from cisxp import natanalysis
+from tests import util
+
+
+################################################################################
+
+
+CONFIG = '''\
+hostname fw
+interface Gi0/0
+ nameif inside
+ ip address 10.1.0.1 255.255.0.0
+interface Gi0/1
+ nameif outside
+ ip address 203.0.113.1 255.255.255.0
+object network real
+ subnet 10.1.1.0 255.255.255.0
+object network real2
+ subnet 10.1.2.0 255.255.255.0
+object network d1
+ host 10.0.0.1
+object network d5
+ host 10.0.0.5
+object network d9
+ host 10.0.0.9
+object-group network gaps
+ network-object object d1
+ network-object object d9
+nat (inside,outside) source static real real destination static gaps gaps
+nat (inside,outside) source static real real destination static d5 d5
+nat (inside,outside) source static real2 gaps
+nat (inside,outside) source static real2 d5
+'''
+
+
+################################################################################
+
+
+# A group with a gap between its ranges must not be compared as the single
+# range spanning it.
+class GapsTest(unittest.TestCase):
+    def get_findings(self, use_numpy):
+        dev = util.parse_config(CONFIG)
+        analysis = natanalysis.NATAnalysis(dev, use_numpy)
+        return [(kind, rule.name(), other.name())
+                for kind, rule, _range, other, _other_range
+                in analysis.analyze()]
+
+    def check(self, use_numpy):
+        findings = self.get_findings(use_numpy)
+        self.assertIn(('inside overlap', 'manual 2', 'manual 1'), findings)
+        self.assertNotIn(('shadowed', 'manual 2', 'manual 1'), findings)
+        self.assertNotIn(('mapped overlap', 'manual 4', 'manual 3'),
+                         findings)
+
+    def test_sweep(self):
+        self.check(False)
+
+    def test_numpy(self):
+        if not natanalysis.import_numpy():
+            self.skipTest('numpy is not installed')
+        self.check(True)
+
+
+################################################################################
@@ -0,0 +1,84 @@
+################################################################################
+# test_partition.py
+################################################################################
+
+
+import os
+import resource
+import tempfile
+import unittest
+
+
+from cisxp import csvwriter
+from cisxp import device
+from cisxp import partition
+
+
+################################################################################
+
+
+# Writes one row naming the device, with a description of three byte
+# characters.
+class HostWriter(csvwriter.CSVWriter):
+    def __init__(self, file=None):
+        super().__init__(file)
+        self.cols = ['hostname', 'description']
+        self.col_names = {'hostname': 'Hostname',
+                          'description': 'Description'}
+
+    def populate_rows(self):
+        self.rows.append({'hostname': self.device.hostname,
+                          'description': '–' * 10})
+
+
+# Returns a device with the given hostname.
+def get_device(hostname):
+    dev = device.Device()
+    dev.hostname = hostname
+    return dev
+
+
+################################################################################
+
+
+class PartitionedOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, 'report.csv')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    # More shards than the process may have files open.
+    def test_many_shards(self):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(64, hard), hard))
+        try:
+            output = partition.PartitionedOutput(self.filename, HostWriter)
+            for i in range(200):
+                output.write(get_device(f'fw{i}'))
+            output.close()
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        with open(os.path.join(self.dir.name, 'report.fw7.csv'),
+                  encoding='utf-8') as file:
+            self.assertEqual(file.read(),
+                             'Hostname,Description\nfw7,' + '–' * 10 + '\n')
+
+    # The size limit of bytes mode counts encoded bytes.
+    def test_bytes(self):
+        row = ('fw0,' + '–' * 10 + '\n').encode('utf-8')
+        output = partition.PartitionedOutput(
+            self.filename, HostWriter, mode=partition.PartitionedOutput.BYTES,
+            size=len(row) * 3)
+        for i in range(9):
+            output.write(get_device('fw0'))
+        output.close()
+        header = len('Hostname,Description\n')
+        for i in range(3):
+            size = os.path.getsize(
+                os.path.join(self.dir.name, f'report.{i:04d}.csv'))
+            self.assertEqual(size, header + len(row) * 3)
+
+
+################################################################################
@@ -0,0 +1,89 @@
+################################################################################
+# test_server.py
+################################################################################
+
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+
+from cisxp import client
+from cisxp import server
+
+
+################################################################################
+
+
+CONFIG = '''\
+hostname {hostname}
+object network web
+ host 10.1.0.5
+ nat (inside,outside) static 192.0.2.5
+'''
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cisx.sock')
+        self.config = os.path.join(self.dir, 'fw.cfg')
+        self.write_config('fw1')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_config(self, hostname, mtime=None):
+        with open(self.config, 'w') as file:
+            file.write(CONFIG.format(hostname=hostname))
+        if mtime != None:
+            os.utime(self.config, (mtime, mtime))
+
+    def start(self):
+        fleet_server = server.CISXServer(self.path)
+        thread = threading.Thread(target=fleet_server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(fleet_server.server_close)
+        self.addCleanup(fleet_server.shutdown)
+        return client.CISXClient(self.path)
+
+    def test_invalid_lookup(self):
+        cisx_client = self.start()
+        for addr in ('10.1.0.x', '10.1.0.256', '10.1.0.0/24', None):
+            with self.assertRaisesRegex(RuntimeError, 'Invalid address'):
+                cisx_client.request('lookup', addr)
+
+    def test_reload(self):
+        cisx_client = self.start()
+        self.write_config('fw1', 1000)
+        cisx_client.request('parse', self.config)
+        self.write_config('fw2', 2000)
+        result = cisx_client.request('lookup', '10.1.0.5')
+        self.assertEqual([entry['hostname'] for entry in result], ['fw2'])
+        self.assertIn('fw2', cisx_client.request('nat'))
+
+    def test_running_server(self):
+        self.start()
+        with self.assertRaisesRegex(OSError, 'already running'):
+            server.CISXServer(self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_stale_socket(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(self.path)
+        cisx_client = self.start()
+        self.assertEqual(cisx_client.request('stats')['devices'], 0)
+
+    def test_not_a_socket(self):
+        with open(self.path, 'w') as file:
+            file.write('data')
+        with self.assertRaisesRegex(OSError, 'Not a socket'):
+            server.CISXServer(self.path)
+        self.assertTrue(os.path.isfile(self.path))
+
+
+################################################################################
@@ -0,0 +1,90 @@
+################################################################################
+# test_snapshot.py
+################################################################################
+
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+
+from cisxp import iptools
+from cisxp import snapshot
+from cisxp import sqlitewriter
+from tests import util
+
+
+################################################################################
+
+
+CONFIG = '''\
+hostname fw
+interface Gi0/0
+ nameif inside
+ ip address 10.1.0.1 255.255.0.0
+interface Gi0/1
+ nameif outside
+ ip address 203.0.113.1 255.255.255.0
+object network real
+ subnet 10.1.1.0 255.255.255.0
+object network d1
+ host 10.0.0.1
+object network d9
+ host 10.0.0.9
+object-group network gaps
+ network-object object d1
+ network-object object d9
+nat (inside,outside) source static real gaps
+'''
+
+
+################################################################################
+
+
+# The mapped ranges of a group with gaps are stored one per range, so an
+# address in a gap matches no nat rule.
+class NATRangesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.device = util.parse_config(CONFIG)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_snapshot(self):
+        filename = os.path.join(self.dir, 'fw.snap')
+        writer = snapshot.SnapshotWriter(filename)
+        writer.write(self.device)
+        writer.close()
+        reader = snapshot.Snapshot(filename)
+        try:
+            for addr, count in (('10.0.0.1', 1), ('10.0.0.5', 0),
+                                ('10.0.0.9', 1), ('10.1.1.7', 1)):
+                rows = reader.lookup_nat_addr(iptools.addr_to_int(addr))
+                self.assertEqual(len(rows), count, addr)
+        finally:
+            reader.close()
+
+    def test_sqlite(self):
+        filename = os.path.join(self.dir, 'fw.db')
+        writer = sqlitewriter.SQLiteWriter(filename)
+        writer.write(self.device)
+        writer.close()
+        connection = sqlite3.connect(filename)
+        try:
+            ranges = connection.execute(
+                'SELECT kind, range_start, range_end FROM nat_ranges '
+                'ORDER BY kind, range_start').fetchall()
+        finally:
+            connection.close()
+        value = iptools.addr_to_int
+        self.assertEqual(ranges, [
+            ('inside', value('10.1.1.0'), value('10.1.1.255')),
+            ('mapped', value('10.0.0.1'), value('10.0.0.1')),
+            ('mapped', value('10.0.0.9'), value('10.0.0.9')),
+        ])
+
+
+################################################################################
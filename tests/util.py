@@ -0,0 +1,27 @@
+################################################################################
+# util.py
+################################################################################
+
+
+import os
+import tempfile
+
+
+from cisxp import ciscoparser
+
+
+################################################################################
+
+
+# Returns the Device parsed from the given configuration text.
+def parse_config(text):
+    fd, filename = tempfile.mkstemp(suffix='.cfg')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+        return ciscoparser.CiscoParser().parse(filename)
+    finally:
+        os.remove(filename)
+
+
+################################################################################